@@ -3,25 +3,31 @@
 
 import os
 import sys
-import threading
-import time
-from flask import Flask, send_from_directory, jsonify, send_file
 
 # Add py_manager to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'py_manager'))
 
-# Import our modules
-import py_process
-import py_logger
-from py_api import vg_app, vg_socketio, vf_status_update_loop
+import py_startup  # Starts the startup clock, standard library only
+
+# Pick the serving mode first: gevent/eventlet must patch before other imports
+with py_startup.vf_phase('import: serving mode and patching'):
+    import py_serve
+    py_serve.vf_patch()
+
+import threading
+import time
+
+with py_startup.vf_phase('import: flask'):
+    from flask import Flask, send_from_directory, jsonify, send_file
 
-try:
-    import py_telegram_bot
-except ImportError as e:
-    print(f"DEBUG: Failed to import py_telegram_bot: {e}")
-    import traceback
-    traceback.print_exc()
-    py_telegram_bot = None
+# Import our modules (the Telegram bot is imported only when enabled)
+with py_startup.vf_phase('import: process manager'):
+    import py_process
+    import py_logger
+    import py_reload
+with py_startup.vf_phase('import: api routes'):
+    import py_api
+    from py_api import vg_app, vg_socketio, vf_status_update_loop
 
 # Get the absolute path to py_manager directory
 vg_py_manager_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'py_manager')
@@ -90,7 +96,16 @@ def debug_info():
         'current_dir': os.getcwd()
     }, indent=2)
 
-def vf_start_all_in_one():
+def vf_import_telegram_bot():
+    """Import the Telegram bot module on demand, None if its dependencies are missing"""
+    try:
+        import py_telegram_bot
+        return py_telegram_bot
+    except ImportError as e:
+        print(f"DEBUG: Failed to import py_telegram_bot: {e}")
+        return None
+
+def vf_start_all_in_one(vf_profile_startup=False):
     """Start the all-in-one server"""
     
     print("="*60)
@@ -112,17 +127,21 @@ def vf_start_all_in_one():
             print(f"✓ Found: {file}")
     
     # Load configurations
-    if not py_process.vf_load_config():
+    with py_startup.vf_phase('init: configuration and API'):
+        vf_loaded = py_api.vf_init()
+    if not vf_loaded:
         print("Failed to load process configuration!")
         return
     
     print("✓ Configuration loaded")
     
-    # Start the process monitor thread
-    vf_monitor_thread = threading.Thread(target=py_process.vf_monitor_processes)
-    vf_monitor_thread.daemon = True
-    vf_monitor_thread.start()
-    print("✓ Process monitor started")
+    # Start the process exit supervisor
+    with py_startup.vf_phase('init: supervisor'):
+        vf_mode = py_process.vf_start_supervisor()
+    print(f"✓ Process supervisor started ({vf_mode} mode)")
+    with py_startup.vf_phase('init: config watcher'):
+        vf_watch_mode = py_reload.vf_start_watcher(py_process.vg_config['manager_settings'])
+    print(f"✓ Config watcher started ({vf_watch_mode} mode)")
     
     # Start status update thread for WebSocket
     vf_update_thread = threading.Thread(target=vf_status_update_loop)
@@ -138,6 +157,8 @@ def vf_start_all_in_one():
     vf_telegram_config = vf_config.get('telegram', {})
     vf_telegram_enabled = vf_telegram_config.get('enabled', True)
     if vf_telegram_enabled and vf_telegram_config.get('token'):
+        with py_startup.vf_phase('import: telegram bot'):
+            py_telegram_bot = vf_import_telegram_bot()
         if py_telegram_bot:
             vf_token = vf_telegram_config['token']
             vf_chat_ids = vf_telegram_config.get('allowed_chat_ids', [])
@@ -168,16 +189,20 @@ def vf_start_all_in_one():
     print(f"\nPress Ctrl+C to stop the server")
     print("="*60 + "\n")
     
+    py_startup.vf_finish()
+    if vf_profile_startup:
+        py_startup.vf_print_report()
+    
     # Run the Flask app with SocketIO
     try:
-        vg_socketio.run(
+        py_serve.vf_run(
+            vg_socketio,
             vg_app,
-            host='0.0.0.0',
-            port=55000,
-            debug=False,
+            '0.0.0.0',
+            55000,
+            False,
             use_reloader=False,  # Disable reloader to prevent double startup
-            log_output=True,      # Enable logging to see requests
-            allow_unsafe_werkzeug=True # Allow unsafe werkzeug for PM2
+            log_output=True      # Enable logging to see requests
         )
     except KeyboardInterrupt:
         print("\n\nShutting down...")
@@ -186,4 +211,4 @@ def vf_start_all_in_one():
         print("Server stopped gracefully")
 
 if __name__ == '__main__':
-    vf_start_all_in_one()
+    vf_start_all_in_one('--profile-startup' in sys.argv)
@@ -38,6 +38,27 @@ def vf_create_package():
         'py_manager/py_logger.py': 'py_manager/py_logger.py',
         'py_manager/py_manager.py': 'py_manager/py_manager.py',
         'py_manager/py_script_manager.py': 'py_manager/py_script_manager.py',
+        'py_manager/py_reaper.py': 'py_manager/py_reaper.py',
+        'py_manager/py_scheduler.py': 'py_manager/py_scheduler.py',
+        'py_manager/py_metrics.py': 'py_manager/py_metrics.py',
+        'py_manager/py_timeseries.py': 'py_manager/py_timeseries.py',
+        'py_manager/py_limits.py': 'py_manager/py_limits.py',
+        'py_manager/py_logpipe.py': 'py_manager/py_logpipe.py',
+        'py_manager/py_logrotate.py': 'py_manager/py_logrotate.py',
+        'py_manager/py_logindex.py': 'py_manager/py_logindex.py',
+        'py_manager/py_logsearch.py': 'py_manager/py_logsearch.py',
+        'py_manager/py_logfanout.py': 'py_manager/py_logfanout.py',
+        'py_manager/py_statusfeed.py': 'py_manager/py_statusfeed.py',
+        'py_manager/py_serve.py': 'py_manager/py_serve.py',
+        'py_manager/py_respcache.py': 'py_manager/py_respcache.py',
+        'py_manager/py_httpstream.py': 'py_manager/py_httpstream.py',
+        'py_manager/py_bulk.py': 'py_manager/py_bulk.py',
+        'py_manager/py_depgraph.py': 'py_manager/py_depgraph.py',
+        'py_manager/py_registry.py': 'py_manager/py_registry.py',
+        'py_manager/py_configstore.py': 'py_manager/py_configstore.py',
+        'py_manager/py_reload.py': 'py_manager/py_reload.py',
+        'py_manager/py_startup.py': 'py_manager/py_startup.py',
+        'py_manager/py_adopt.py': 'py_manager/py_adopt.py',
         'py_manager/py_manager.html': 'py_manager/py_manager.html',
         'py_manager/py_interface.js': 'py_manager/py_interface.js',
         'py_manager/py_manager.css': 'py_manager/py_manager.css',
@@ -0,0 +1,364 @@
+#!/usr/bin/env python
+"""
+Load test for the Python Manager API server
+
+Runs two phases against a running server and prints one report:
+
+  websocket  Opens --clients Socket.IO connections (Engine.IO v4 over a
+             raw WebSocket), keeps them alive answering pings and counts
+             how many connect and how many are still open at the end.
+  rest       Fires GET requests from --workers threads for --duration
+             seconds while the WebSocket clients are held open, and
+             reports requests/s, error count and p50/p95/p99 latency.
+
+Only the standard library is used so the script runs on any host that
+runs the manager. Compare serving modes by starting the server with
+PY_MANAGER_ASYNC_MODE=threading and then =gevent and running the same
+command against each:
+
+    python deploy/load_test.py --port 55000 --clients 2000 --workers 64
+"""
+
+import argparse
+import base64
+import http.client
+import json
+import os
+import selectors
+import socket
+import struct
+import sys
+import threading
+import time
+
+def vf_percentile(ag_values, vf_percent):
+    """Nearest-rank percentile of a sorted list"""
+    if not ag_values:
+        return 0.0
+    vf_rank = max(0, min(len(ag_values) - 1, int(round(vf_percent / 100.0 * len(ag_values))) - 1))
+    return ag_values[vf_rank]
+
+def vf_summarize(ag_latencies):
+    """Latency summary in milliseconds"""
+    ag_sorted = sorted(ag_latencies)
+    return {
+        'count': len(ag_sorted),
+        'p50_ms': round(vf_percentile(ag_sorted, 50) * 1000, 1),
+        'p95_ms': round(vf_percentile(ag_sorted, 95) * 1000, 1),
+        'p99_ms': round(vf_percentile(ag_sorted, 99) * 1000, 1),
+        'max_ms': round(ag_sorted[-1] * 1000, 1) if ag_sorted else 0.0
+    }
+
+# ---------------------------------------------------------------------------
+# Minimal WebSocket client (text frames only, enough for Engine.IO)
+# ---------------------------------------------------------------------------
+
+def vf_ws_send(vf_sock, vf_text):
+    """Send one masked text frame"""
+    vf_payload = vf_text.encode('utf-8')
+    vf_mask = os.urandom(4)
+    vf_length = len(vf_payload)
+
+    if vf_length < 126:
+        vf_header = struct.pack('!BB', 0x81, 0x80 | vf_length)
+    elif vf_length < 65536:
+        vf_header = struct.pack('!BBH', 0x81, 0x80 | 126, vf_length)
+    else:
+        vf_header = struct.pack('!BBQ', 0x81, 0x80 | 127, vf_length)
+
+    vf_masked = bytes(vf_byte ^ vf_mask[vf_pos % 4] for vf_pos, vf_byte in enumerate(vf_payload))
+    vf_sock.sendall(vf_header + vf_mask + vf_masked)
+
+def vf_ws_parse(vf_buffer):
+    """Split complete frames off a receive buffer, returns ([(opcode, payload)], rest)"""
+    ag_frames = []
+    while len(vf_buffer) >= 2:
+        vf_opcode = vf_buffer[0] & 0x0F
+        vf_length = vf_buffer[1] & 0x7F
+        vf_pos = 2
+        if vf_length == 126:
+            if len(vf_buffer) < 4:
+                break
+            vf_length = struct.unpack('!H', vf_buffer[2:4])[0]
+            vf_pos = 4
+        elif vf_length == 127:
+            if len(vf_buffer) < 10:
+                break
+            vf_length = struct.unpack('!Q', vf_buffer[2:10])[0]
+            vf_pos = 10
+        if len(vf_buffer) < vf_pos + vf_length:
+            break
+        ag_frames.append((vf_opcode, vf_buffer[vf_pos:vf_pos + vf_length]))
+        vf_buffer = vf_buffer[vf_pos + vf_length:]
+    return ag_frames, vf_buffer
+
+def vf_ws_connect(vf_host, vf_port, vf_path, vf_timeout):
+    """Open a WebSocket, returns (socket, leftover bytes after the handshake)"""
+    vf_sock = socket.create_connection((vf_host, vf_port), timeout=vf_timeout)
+    vf_key = base64.b64encode(os.urandom(16)).decode('ascii')
+    vf_request = (
+        f"GET {vf_path} HTTP/1.1\r\n"
+        f"Host: {vf_host}:{vf_port}\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {vf_key}\r\n"
+        "Sec-WebSocket-Version: 13\r\n\r\n"
+    )
+    vf_sock.sendall(vf_request.encode('ascii'))
+
+    vf_data = b''
+    while b'\r\n\r\n' not in vf_data:
+        vf_chunk = vf_sock.recv(4096)
+        if not vf_chunk:
+            raise ConnectionError('closed during handshake')
+        vf_data += vf_chunk
+
+    vf_head, vf_rest = vf_data.split(b'\r\n\r\n', 1)
+    if b' 101 ' not in vf_head.split(b'\r\n', 1)[0]:
+        raise ConnectionError(vf_head.split(b'\r\n', 1)[0].decode('latin-1'))
+    return vf_sock, vf_rest
+
+def vf_socketio_connect(vf_host, vf_port, vf_timeout):
+    """Open an Engine.IO v4 WebSocket and join the default Socket.IO namespace"""
+    vf_sock, vf_buffer = vf_ws_connect(vf_host, vf_port, '/socket.io/?EIO=4&transport=websocket', vf_timeout)
+
+    vf_opened = False
+    vf_deadline = time.time() + vf_timeout
+    while time.time() < vf_deadline:
+        ag_frames, vf_buffer = vf_ws_parse(vf_buffer)
+        for vf_opcode, vf_payload in ag_frames:
+            if vf_opcode == 0x8:
+                raise ConnectionError('closed by server')
+            vf_text = vf_payload.decode('utf-8', errors='ignore')
+            if vf_text.startswith('0') and not vf_opened:
+                vf_opened = True
+                vf_ws_send(vf_sock, '40')      # Socket.IO CONNECT
+            elif vf_text.startswith('40'):
+                vf_sock.settimeout(None)
+                return vf_sock, vf_buffer      # Namespace joined
+            elif vf_text.startswith('44'):
+                raise ConnectionError(f'connect refused: {vf_text[2:]}')
+            elif vf_text == '2':
+                vf_ws_send(vf_sock, '3')
+        vf_chunk = vf_sock.recv(65536)
+        if not vf_chunk:
+            raise ConnectionError('closed during Socket.IO connect')
+        vf_buffer += vf_chunk
+
+    raise TimeoutError('Socket.IO connect timed out')
+
+def vf_hold_clients(ag_clients, vf_stop, vf_stats):
+    """Keep connected clients alive: answer pings, discard events, count drops"""
+    vf_selector = selectors.DefaultSelector()
+    for vf_sock, vf_buffer in ag_clients:
+        vf_sock.setblocking(False)
+        vf_selector.register(vf_sock, selectors.EVENT_READ, {'buffer': vf_buffer})
+
+    while not vf_stop.is_set() and vf_selector.get_map():
+        for vf_key, _ in vf_selector.select(timeout=0.5):
+            vf_sock = vf_key.fileobj
+            try:
+                vf_chunk = vf_sock.recv(65536)
+            except BlockingIOError:
+                continue
+            except OSError:
+                vf_chunk = b''
+
+            vf_closed = not vf_chunk
+            ag_frames, vf_key.data['buffer'] = vf_ws_parse(vf_key.data['buffer'] + vf_chunk)
+            for vf_opcode, vf_payload in ag_frames:
+                vf_stats['messages'] += 1
+                if vf_opcode == 0x8:
+                    vf_closed = True
+                elif vf_payload == b'2':
+                    try:
+                        vf_sock.setblocking(True)
+                        vf_ws_send(vf_sock, '3')
+                        vf_sock.setblocking(False)
+                    except OSError:
+                        vf_closed = True
+
+            if vf_closed:
+                vf_stats['dropped'] += 1
+                vf_selector.unregister(vf_sock)
+                vf_sock.close()
+
+    vf_stats['open_at_end'] = len(vf_selector.get_map())
+    for vf_key in list(vf_selector.get_map().values()):
+        vf_key.fileobj.close()
+    vf_selector.close()
+
+def vf_open_clients(vf_args):
+    """Connect --clients Socket.IO clients with --connect-workers threads"""
+    ag_clients = []
+    ag_latencies = []
+    vf_errors = {}
+    vf_lock = threading.Lock()
+    vf_remaining = [vf_args.clients]
+
+    def vf_worker():
+        while True:
+            with vf_lock:
+                if vf_remaining[0] <= 0:
+                    return
+                vf_remaining[0] -= 1
+            vf_start = time.perf_counter()
+            try:
+                vf_client = vf_socketio_connect(vf_args.host, vf_args.port, vf_args.timeout)
+            except (OSError, ConnectionError, TimeoutError) as e:
+                with vf_lock:
+                    vf_name = type(e).__name__
+                    vf_errors[vf_name] = vf_errors.get(vf_name, 0) + 1
+                continue
+            with vf_lock:
+                ag_latencies.append(time.perf_counter() - vf_start)
+                ag_clients.append(vf_client)
+
+    ag_threads = [threading.Thread(target=vf_worker, daemon=True) for _ in range(vf_args.connect_workers)]
+    for vf_thread in ag_threads:
+        vf_thread.start()
+    for vf_thread in ag_threads:
+        vf_thread.join()
+
+    return ag_clients, ag_latencies, vf_errors
+
+# ---------------------------------------------------------------------------
+# REST load
+# ---------------------------------------------------------------------------
+
+def vf_run_rest(vf_args):
+    """Hammer --path from --workers threads for --duration seconds"""
+    ag_latencies = []
+    vf_errors = {}
+    vf_lock = threading.Lock()
+    vf_deadline = time.time() + vf_args.duration
+    vf_headers = {'Authorization': f'Bearer {vf_args.token}'} if vf_args.token else {}
+
+    def vf_worker():
+        ag_local = []
+        vf_local_errors = {}
+        while time.time() < vf_deadline:
+            vf_start = time.perf_counter()
+            try:
+                vf_conn = http.client.HTTPConnection(vf_args.host, vf_args.port, timeout=vf_args.timeout)
+                vf_conn.request('GET', vf_args.path, headers=vf_headers)
+                vf_response = vf_conn.getresponse()
+                vf_response.read()
+                vf_conn.close()
+                if vf_response.status >= 400:
+                    vf_name = f'HTTP {vf_response.status}'
+                    vf_local_errors[vf_name] = vf_local_errors.get(vf_name, 0) + 1
+                    continue
+            except (OSError, http.client.HTTPException) as e:
+                vf_name = type(e).__name__
+                vf_local_errors[vf_name] = vf_local_errors.get(vf_name, 0) + 1
+                continue
+            ag_local.append(time.perf_counter() - vf_start)
+
+        with vf_lock:
+            ag_latencies.extend(ag_local)
+            for vf_name, vf_count in vf_local_errors.items():
+                vf_errors[vf_name] = vf_errors.get(vf_name, 0) + vf_count
+
+    vf_started = time.time()
+    ag_threads = [threading.Thread(target=vf_worker, daemon=True) for _ in range(vf_args.workers)]
+    for vf_thread in ag_threads:
+        vf_thread.start()
+    for vf_thread in ag_threads:
+        vf_thread.join()
+    vf_elapsed = time.time() - vf_started
+
+    vf_result = vf_summarize(ag_latencies)
+    vf_result['requests_per_second'] = round(len(ag_latencies) / vf_elapsed, 1) if vf_elapsed else 0.0
+    vf_result['errors'] = vf_errors
+    return vf_result
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def vf_get_server_mode(vf_args):
+    """Ask the server which serving mode it runs in (None if unknown)"""
+    try:
+        vf_conn = http.client.HTTPConnection(vf_args.host, vf_args.port, timeout=vf_args.timeout)
+        vf_conn.request('GET', '/api/health')
+        vf_data = json.loads(vf_conn.getresponse().read() or b'{}')
+        vf_conn.close()
+        return (vf_data.get('data') or {}).get('async_mode')
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+
+def vf_parse_args(ag_argv):
+    """Parse command line arguments"""
+    vf_parser = argparse.ArgumentParser(description='Load test the Python Manager API server')
+    vf_parser.add_argument('--host', default='127.0.0.1')
+    vf_parser.add_argument('--port', type=int, default=55000)
+    vf_parser.add_argument('--token', default='', help='API auth token if auth is enabled')
+    vf_parser.add_argument('--clients', type=int, default=500, help='Socket.IO clients to hold open')
+    vf_parser.add_argument('--connect-workers', type=int, default=50, help='Threads opening clients')
+    vf_parser.add_argument('--workers', type=int, default=32, help='Concurrent REST workers')
+    vf_parser.add_argument('--duration', type=float, default=10.0, help='REST phase length in seconds')
+    vf_parser.add_argument('--path', default='/api/scripts/status', help='REST endpoint to request')
+    vf_parser.add_argument('--timeout', type=float, default=10.0, help='Per-request/connect timeout')
+    vf_parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    return vf_parser.parse_args(ag_argv)
+
+def vf_main(ag_argv=None):
+    """Run the WebSocket and REST phases and print the report"""
+    vf_args = vf_parse_args(ag_argv)
+    vf_report = {'target': f'{vf_args.host}:{vf_args.port}', 'async_mode': vf_get_server_mode(vf_args)}
+
+    # Phase 1: connect and hold Socket.IO clients
+    ag_clients = []
+    vf_hold_stats = {'messages': 0, 'dropped': 0, 'open_at_end': 0}
+    vf_stop = threading.Event()
+    vf_holder = None
+    if vf_args.clients > 0:
+        vf_started = time.time()
+        ag_clients, ag_connect_latencies, vf_connect_errors = vf_open_clients(vf_args)
+        vf_report['websocket'] = vf_summarize(ag_connect_latencies)
+        vf_report['websocket'].update({
+            'requested': vf_args.clients,
+            'connected': len(ag_clients),
+            'connect_seconds': round(time.time() - vf_started, 1),
+            'errors': vf_connect_errors
+        })
+        vf_holder = threading.Thread(target=vf_hold_clients, args=(ag_clients, vf_stop, vf_hold_stats), daemon=True)
+        vf_holder.start()
+
+    # Phase 2: REST load while the clients stay connected
+    if vf_args.workers > 0 and vf_args.duration > 0:
+        vf_report['rest'] = vf_run_rest(vf_args)
+        vf_report['rest']['path'] = vf_args.path
+
+    if vf_holder is not None:
+        vf_stop.set()
+        vf_holder.join()
+        vf_report['websocket'].update({
+            'still_open': vf_hold_stats['open_at_end'],
+            'dropped': vf_hold_stats['dropped'],
+            'messages_received': vf_hold_stats['messages']
+        })
+
+    if vf_args.json:
+        print(json.dumps(vf_report, indent=2))
+        return vf_report
+
+    print(f"Target: {vf_report['target']} (serving mode: {vf_report['async_mode'] or 'unknown'})")
+    if 'websocket' in vf_report:
+        vf_ws = vf_report['websocket']
+        print(f"WebSocket: {vf_ws['connected']}/{vf_ws['requested']} connected in {vf_ws['connect_seconds']}s, "
+              f"{vf_ws['still_open']} still open, {vf_ws['dropped']} dropped")
+        print(f"  connect p50={vf_ws['p50_ms']}ms p95={vf_ws['p95_ms']}ms p99={vf_ws['p99_ms']}ms max={vf_ws['max_ms']}ms")
+        if vf_ws['errors']:
+            print(f"  errors: {vf_ws['errors']}")
+    if 'rest' in vf_report:
+        vf_rest = vf_report['rest']
+        print(f"REST {vf_rest['path']}: {vf_rest['count']} ok, {vf_rest['requests_per_second']} req/s")
+        print(f"  latency p50={vf_rest['p50_ms']}ms p95={vf_rest['p95_ms']}ms p99={vf_rest['p99_ms']}ms max={vf_rest['max_ms']}ms")
+        if vf_rest['errors']:
+            print(f"  errors: {vf_rest['errors']}")
+    return vf_report
+
+if __name__ == '__main__':
+    vf_main(sys.argv[1:])
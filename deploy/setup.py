@@ -88,6 +88,27 @@ def vf_copy_files(vf_source_dir, vf_target_dir):
         'py_logger.py',
         'py_manager.py',
         'py_script_manager.py',
+        'py_reaper.py',
+        'py_scheduler.py',
+        'py_metrics.py',
+        'py_timeseries.py',
+        'py_limits.py',
+        'py_logpipe.py',
+        'py_logrotate.py',
+        'py_logindex.py',
+        'py_logsearch.py',
+        'py_logfanout.py',
+        'py_statusfeed.py',
+        'py_serve.py',
+        'py_respcache.py',
+        'py_httpstream.py',
+        'py_bulk.py',
+        'py_depgraph.py',
+        'py_registry.py',
+        'py_configstore.py',
+        'py_reload.py',
+        'py_startup.py',
+        'py_adopt.py',
         'py_manager.html',
         'py_interface.js',
         'py_manager.css',
@@ -0,0 +1,261 @@
+"""Re-attach running children after a manager restart
+
+Off unless manager_settings.adopt_children is true. Children then
+outlive the manager: they run in their own session and write their
+output into a named pipe (logs/fifo/<id>.fifo) they hold open for
+reading and writing. While no manager is reading, output collects in the
+pipe buffer and never fails with EPIPE, but once the buffer (64 KB on
+Linux) is full the child blocks on its next write until a manager reads
+again. A new manager opens the pipe again and carries on logging.
+
+Every process change is appended to children.state as one JSON line:
+
+    {"op": "set", "id": ..., "pid": ..., "create_time": ..., "cmd_hash": ...}
+    {"op": "remove", "id": ...}
+
+On startup the file is replayed. A PID is only adopted if the process
+still exists with the same creation time (not a reused PID) and the same
+command line hash, and its script is still configured; anything else is
+dropped. The file is then rewritten with the survivors.
+"""
+
+import hashlib
+import json
+import os
+import signal
+import subprocess
+import threading
+
+import psutil
+
+# Global variables
+vg_enabled = False          # Opt-in with adopt_children, needs named pipes (not on Windows)
+vg_lock = threading.Lock()
+vg_state_path = os.path.join(os.path.dirname(__file__), 'logs', 'children.state')
+vg_fifo_dir = os.path.join(os.path.dirname(__file__), 'logs', 'fifo')
+vg_state_fd = None          # Append-only descriptor of vg_state_path
+vg_unknown_returncode = 255 # Exit status of an adopted process cannot be collected
+vg_stats = {
+    'adopted': 0,
+    'dropped': 0,
+    'records': 0
+}
+
+class AdoptedProcess:
+    """Popen-like handle for a child started by an earlier manager
+
+    It is no longer our child, so its exit status cannot be collected:
+    returncode becomes vg_unknown_returncode once it is gone.
+    """
+
+    def __init__(self, vf_ps_process, ag_args):
+        self.vf_ps_process = vf_ps_process
+        self.pid = vf_ps_process.pid
+        self.args = ag_args
+        self.stdout = None
+        self.returncode = None
+
+    def poll(self):
+        if self.returncode is None:
+            try:
+                vf_alive = self.vf_ps_process.is_running() and self.vf_ps_process.status() != psutil.STATUS_ZOMBIE
+            except psutil.Error:
+                vf_alive = False
+            if not vf_alive:
+                self.returncode = vg_unknown_returncode
+        return self.returncode
+
+    def wait(self, timeout=None):
+        try:
+            self.vf_ps_process.wait(timeout)
+        except psutil.TimeoutExpired:
+            if self.poll() is None:
+                raise subprocess.TimeoutExpired(self.args, timeout)
+        except psutil.Error:
+            pass
+        return self.poll()
+
+    def send_signal(self, vf_signum):
+        if self.poll() is None:
+            try:
+                self.vf_ps_process.send_signal(vf_signum)
+            except psutil.Error:
+                pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+def vf_configure(vf_settings):
+    """Apply adoption settings from manager_settings"""
+    global vg_enabled
+    vg_enabled = hasattr(os, 'mkfifo') and vf_settings.get('adopt_children', False)
+
+def vf_command_hash(ag_cmd):
+    """Short hash identifying a command line"""
+    return hashlib.sha256(json.dumps(list(ag_cmd)).encode('utf-8')).hexdigest()[:16]
+
+def vf_fifo_path(vf_script_id):
+    """Path of a script's output pipe"""
+    return os.path.join(vg_fifo_dir, f"{vf_script_id}.fifo")
+
+def vf_open_reader(vf_fifo):
+    """Unbuffered reader on a pipe's read end, in blocking mode"""
+    vf_fd = os.open(vf_fifo, os.O_RDONLY | os.O_NONBLOCK)  # Plain O_RDONLY waits for a writer
+    os.set_blocking(vf_fd, True)  # py_logpipe's mux switches it back itself
+    return open(vf_fd, 'rb', buffering=0)
+
+def vf_open_output(vf_script_id):
+    """Fresh output pipe for a new child, returns (child_fd, reader)
+
+    child_fd is opened for reading and writing so that the child never
+    sees EPIPE while no manager is reading. The caller passes it as
+    stdout and closes it after the fork.
+    """
+    os.makedirs(vg_fifo_dir, exist_ok=True)
+    vf_fifo = vf_fifo_path(vf_script_id)
+    try:
+        os.unlink(vf_fifo)  # Never share a pipe with an older instance
+    except FileNotFoundError:
+        pass
+    os.mkfifo(vf_fifo, 0o600)
+
+    vf_child_fd = os.open(vf_fifo, os.O_RDWR)
+    try:
+        return vf_child_fd, vf_open_reader(vf_fifo)
+    except OSError:
+        os.close(vf_child_fd)
+        raise
+
+def vf_remove_output(vf_script_id):
+    """Unlink a script's output pipe once its child is gone (open readers keep working)"""
+    try:
+        os.unlink(vf_fifo_path(vf_script_id))
+    except FileNotFoundError:
+        pass
+    except OSError as vf_error:
+        print(f"Error removing output pipe of {vf_script_id}: {vf_error}")
+
+def vf_append(vf_record):
+    """Append one record to the state file"""
+    global vg_state_fd
+    vf_line = (json.dumps(vf_record) + '\n').encode('utf-8')
+    with vg_lock:
+        try:
+            if vg_state_fd is None:
+                os.makedirs(os.path.dirname(vg_state_path), exist_ok=True)
+                vg_state_fd = os.open(vg_state_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            os.write(vg_state_fd, vf_line)  # No fsync: it only has to survive the manager
+            vg_stats['records'] += 1
+        except OSError as vf_error:
+            print(f"Error writing child state: {vf_error}")
+
+def vf_record(vf_script_id, vf_pid, ag_cmd, vf_start_time):
+    """Remember a newly started child"""
+    if not vg_enabled:
+        return
+    try:
+        vf_create_time = psutil.Process(vf_pid).create_time()
+    except psutil.Error:
+        return  # Already gone, the reaper reports it
+    vf_append({
+        'op': 'set',
+        'id': vf_script_id,
+        'pid': vf_pid,
+        'create_time': vf_create_time,
+        'cmd_hash': vf_command_hash(ag_cmd),
+        'start_time': vf_start_time
+    })
+
+def vf_forget(vf_script_id):
+    """Forget a child that exited or was stopped"""
+    if vg_enabled:
+        vf_append({'op': 'remove', 'id': vf_script_id})
+
+def vf_read_state():
+    """Replay the state file into {script_id: entry}"""
+    vf_state = {}
+    try:
+        with open(vg_state_path, 'r') as vf_file:
+            for vf_line in vf_file:
+                try:
+                    vf_record = json.loads(vf_line)
+                except ValueError:
+                    break  # Torn last line from a crash
+                if vf_record['op'] == 'remove':
+                    vf_state.pop(vf_record['id'], None)
+                else:
+                    vf_state[vf_record['id']] = vf_record
+    except FileNotFoundError:
+        pass
+    return vf_state
+
+def vf_validate(vf_entry):
+    """psutil process for a state entry if it is still that child, else None"""
+    try:
+        vf_ps_process = psutil.Process(vf_entry['pid'])
+        if vf_ps_process.create_time() != vf_entry['create_time']:
+            return None  # PID reused by another process
+        if vf_ps_process.status() == psutil.STATUS_ZOMBIE:
+            return None
+        if vf_command_hash(vf_ps_process.cmdline()) != vf_entry['cmd_hash']:
+            return None
+    except (psutil.Error, KeyError):
+        return None
+    return vf_ps_process
+
+def vf_collect(vf_is_configured):
+    """Find surviving children of the previous manager
+
+    Returns [(script_id, AdoptedProcess, reader or None, state entry)] and
+    rewrites the state file with only those. reader is None if the output
+    pipe is gone.
+    """
+    global vg_state_fd
+    if not vg_enabled:
+        return []
+
+    ag_adopted = []
+    for vf_script_id, vf_entry in vf_read_state().items():
+        vf_ps_process = vf_validate(vf_entry) if vf_is_configured(vf_script_id) else None
+        if vf_ps_process is None:
+            vg_stats['dropped'] += 1
+            continue
+
+        vf_reader = None
+        try:
+            vf_reader = vf_open_reader(vf_fifo_path(vf_script_id))
+        except OSError as vf_error:
+            print(f"Output of {vf_script_id} cannot be re-attached: {vf_error}")
+
+        vf_process = AdoptedProcess(vf_ps_process, vf_ps_process.cmdline())
+        ag_adopted.append((vf_script_id, vf_process, vf_reader, vf_entry))
+        vg_stats['adopted'] += 1
+
+    # Compact: start over with the adopted children only
+    with vg_lock:
+        if vg_state_fd is not None:
+            os.close(vg_state_fd)
+            vg_state_fd = None
+        try:
+            os.makedirs(os.path.dirname(vg_state_path), exist_ok=True)
+            vf_tmp_path = vg_state_path + '.tmp'
+            with open(vf_tmp_path, 'w') as vf_file:
+                for _, _, _, vf_entry in ag_adopted:
+                    vf_file.write(json.dumps(vf_entry) + '\n')
+            os.replace(vf_tmp_path, vg_state_path)
+        except OSError as vf_error:
+            print(f"Error writing child state: {vf_error}")
+
+    return ag_adopted
+
+def vf_get_stats():
+    """Get adoption counters"""
+    return {
+        'enabled': vg_enabled,
+        'adopted': vg_stats['adopted'],
+        'dropped': vg_stats['dropped'],
+        'records': vg_stats['records']
+    }
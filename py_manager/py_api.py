@@ -1,8 +1,16 @@
-from flask import Flask, jsonify, request
-from flask_socketio import SocketIO, emit
-from flask_cors import CORS
+import py_startup  # Starts the startup clock
+import py_serve
+py_serve.vf_patch()  # gevent/eventlet must patch before anything else is imported
+
+from flask import Flask, Response, jsonify, request
+from flask_socketio import SocketIO, emit, join_room, leave_room
+import hashlib
+import hmac
 import json
+import math
+import re
 import os
+import sys
 import threading
 import time
 from datetime import datetime
@@ -11,13 +19,31 @@ from datetime import datetime
 import py_process
 import py_logger
 import py_script_manager
+import py_reaper
+import py_metrics
+import py_timeseries
+import py_limits
+import py_logpipe
+import py_logsearch
+import py_logfanout
+import py_statusfeed
+import py_respcache
+import py_httpstream
+import py_bulk
+import py_depgraph
+import py_registry
+import py_configstore
+import py_reload
+import py_adopt
 
 # Global variables
 vg_app = Flask(__name__)
-vg_socketio = None
+vg_socketio = SocketIO()  # Bound to vg_app by vf_init()
 vg_config = None
+vg_initialized = False
 vg_update_thread = None
 vg_running = True
+vg_stream_token_ttl = 60  # Seconds a stream token can be used to connect
 
 def vf_load_api_config():
     """Load API configuration"""
@@ -32,81 +58,191 @@ def vf_load_api_config():
         print(f"Error loading API config: {vf_error}")
         return False
 
+def vf_submit_bulk_job(vf_action, ag_default_ids):
+    """Run a bulk job for a request and answer with its per-script results
+
+    With async=1 the job runs in the background and the answer is the job
+    summary (202) to follow at /api/jobs/<job_id>.
+    """
+    vf_data = request.get_json(silent=True) or {}
+    ag_script_ids = vf_data.get('script_ids') or ag_default_ids
+    vf_parallelism = vf_data.get('parallelism')
+    vf_timeout = vf_data.get('timeout')
+    
+    if vf_parallelism is not None and (type(vf_parallelism) is not int or not 1 <= vf_parallelism <= py_bulk.vg_max_parallelism):
+        return vf_api_response(False, vf_error=f'parallelism must be an integer from 1 to {py_bulk.vg_max_parallelism}', vf_status_code=400)
+    if vf_timeout is not None and (type(vf_timeout) not in (int, float) or not 0 < vf_timeout <= py_bulk.vg_max_stop_timeout):
+        return vf_api_response(False, vf_error=f'timeout must be a number of seconds above 0 and at most {py_bulk.vg_max_stop_timeout}', vf_status_code=400)
+    
+    def vf_on_done(vf_job):
+        vf_summary = py_bulk.vf_get_summary(vf_job)
+        py_logger.vf_write_manager_log(
+            'API',
+            f"{vf_action.capitalize()} all scripts via API: {vf_summary['succeeded']} ok, {vf_summary['failed']} failed"
+        )
+        vf_safe_emit_update()
+    
+    vf_job = py_bulk.vf_submit(
+        vf_action, ag_script_ids,
+        vf_parallelism=vf_parallelism,
+        vf_timeout=vf_timeout,
+        vf_on_done=vf_on_done
+    )
+    
+    if request.args.get('async', '0') in ('1', 'true'):
+        return vf_api_response(True, py_bulk.vf_get_summary(vf_job), vf_status_code=202)
+    
+    py_bulk.vf_wait(vf_job)
+    return vf_api_response(True, py_bulk.vf_get_summary(vf_job, vf_include_results=True))
+
 @vg_app.route('/api/scripts/start-all', methods=['POST'])
 def route_start_all_scripts():
-    """Start all enabled scripts"""
+    """Start all enabled scripts (or the given script_ids) as a bulk job"""
     if not vf_check_auth():
-        return vf_api_response(False, error='Unauthorized', vf_status_code=401)
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
     
-    ag_results = []
-    for vf_script in py_process.vg_config['scripts']:
-        if vf_script['enabled'] and vf_script['id'] not in py_process.vg_processes:
-            vf_result = py_process.vf_start_script(vf_script['id'])
-            ag_results.append({
-                'script_id': vf_script['id'],
-                'result': vf_result
-            })
-    
-    py_logger.vf_write_manager_log('API', f'Start all scripts via API: {len(ag_results)} scripts')
-    
-    return vf_api_response(True, {'results': ag_results})
+    return vf_submit_bulk_job('start', py_registry.vf_ids(vf_enabled=True, vf_status='stopped'))
 
 @vg_app.route('/api/scripts/stop-all', methods=['POST'])
 def route_stop_all_scripts():
-    """Stop all running scripts"""
+    """Stop all running scripts (or the given script_ids) as a bulk job"""
     if not vf_check_auth():
-        return vf_api_response(False, error='Unauthorized', vf_status_code=401)
-    
-    ag_results = []
-    for vf_script_id in list(py_process.vg_processes.keys()):
-        vf_result = py_process.vf_stop_script(vf_script_id)
-        ag_results.append({
-            'script_id': vf_script_id,
-            'result': vf_result
-        })
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
     
-    py_logger.vf_write_manager_log('API', f'Stop all scripts via API: {len(ag_results)} scripts')
-    
-    return vf_api_response(True, {'results': ag_results})
+    return vf_submit_bulk_job('stop', py_registry.vf_running_ids())
 
-# Load configurations
-vf_load_api_config()
-py_process.vf_load_config()
+@vg_app.route('/api/jobs', methods=['GET'])
+def route_list_jobs():
+    """List recent bulk jobs"""
+    if not vf_check_auth():
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
+    
+    return vf_api_response(True, {'jobs': py_bulk.vf_list_jobs()})
 
-# Configure Flask app
-vg_app.config['SECRET_KEY'] = vg_config['api_settings']['secret_key']
+@vg_app.route('/api/jobs/<job_id>', methods=['GET'])
+def route_get_job(job_id):
+    """Get a bulk job's progress and results (stream=1 streams progress as NDJSON)"""
+    if not vf_check_auth():
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
+    
+    vf_job = py_bulk.vf_get_job(job_id)
+    if vf_job is None:
+        return vf_api_response(False, vf_error='Job not found', vf_status_code=404)
+    
+    if request.args.get('stream', '0') in ('1', 'true'):
+        # One progress event per line as scripts finish, then the summary line
+        vf_after = request.args.get('after', 0, type=int)
+        
+        def vf_generate():
+            for vf_event in py_bulk.vf_iter_events(vf_job, vf_after):
+                yield json.dumps(vf_event) + '\n'
+            yield json.dumps({'summary': py_bulk.vf_get_summary(vf_job)}) + '\n'
+        
+        return Response(vf_generate(), mimetype='application/x-ndjson')
+    
+    return vf_api_response(True, py_bulk.vf_get_summary(vf_job, vf_include_results=True))
+
+@vg_app.route('/api/groups', methods=['GET'])
+def route_list_groups():
+    """List groups with their scripts and start stages"""
+    if not vf_check_auth():
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
+    
+    ag_groups = []
+    ag_scripts = py_registry.vf_list()
+    for vf_group in py_registry.vf_groups():
+        ag_script_ids = py_registry.vf_ids(vf_group=vf_group)
+        ag_stages, vf_error = py_depgraph.vf_resolve_stages(ag_scripts, ag_script_ids)
+        ag_groups.append({
+            'group': vf_group,
+            'script_ids': ag_script_ids,
+            'running': sum(1 for vf_script_id in ag_script_ids if py_process.vf_is_process_running(vf_script_id)),
+            'stages': ag_stages,
+            'error': vf_error
+        })
+    
+    return vf_api_response(True, {'groups': ag_groups})
 
-# Initialize CORS
-CORS(vg_app, origins=vg_config['api_settings']['cors_origins'])
+@vg_app.route('/api/groups/<group>/start', methods=['POST'])
+def route_start_group(group):
+    """Start a group's enabled scripts stage by stage as a bulk job"""
+    if not vf_check_auth():
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
+    
+    if group not in py_registry.vf_groups():
+        return vf_api_response(False, vf_error='Group not found', vf_status_code=404)
+    
+    return vf_submit_bulk_job('start', py_registry.vf_ids(vf_group=group, vf_enabled=True, vf_status='stopped'))
 
-# Initialize SocketIO
-"""
-vg_socketio = SocketIO(
-    vg_app, 
-    cors_allowed_origins=vg_config['api_settings']['cors_origins'],
-    ping_timeout=vg_config['websocket_settings']['ping_timeout'],
-    ping_interval=vg_config['websocket_settings']['ping_interval']
-)
-"""
-# Initialize SocketIO with explicit CORS settings
-vg_socketio = SocketIO(
-    vg_app, 
-    cors_allowed_origins="*",  # Allow all origins for now
-    async_mode='threading'
-)
+@vg_app.route('/api/groups/<group>/stop', methods=['POST'])
+def route_stop_group(group):
+    """Stop a group's running scripts in reverse stage order as a bulk job"""
+    if not vf_check_auth():
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
+    
+    if group not in py_registry.vf_groups():
+        return vf_api_response(False, vf_error='Group not found', vf_status_code=404)
+    
+    return vf_submit_bulk_job('stop', py_registry.vf_ids(vf_group=group, vf_status='running'))
 
 # Log callback for real-time updates
 def vf_on_log_update(script_id, message):
     """Callback for log updates from py_process"""
-    if vg_socketio:
-        vg_socketio.emit('log_update', {
-            'script_id': script_id,
-            'message': message
-        })
+    py_logfanout.vf_publish(script_id, message)
 
-# Register callback
-py_process.vf_set_log_callback(vf_on_log_update)
-py_logger.vf_set_log_callback(vf_on_log_update)
+def vf_emit_to(vf_event, vf_payload, vf_to, vf_skip_sids=None):
+    """Send an event to a room or a single client"""
+    vg_socketio.emit(vf_event, vf_payload, to=vf_to, skip_sid=vf_skip_sids)
+
+def vf_emit_status_delta(vf_event, vf_payload):
+    """Send a status delta to Socket.IO clients and to SSE/long-poll sessions"""
+    vg_socketio.emit(vf_event, vf_payload)
+    py_httpstream.vf_on_status_delta(vf_payload)
+
+def vf_init():
+    """Load configurations, bind CORS and Socket.IO and wire module callbacks (idempotent)
+
+    Importing this module only defines the routes, entry points call
+    this before serving.
+    """
+    global vg_initialized
+    if vg_initialized:
+        return True
+    
+    # Load configurations
+    if not vf_load_api_config() or not py_process.vf_init():
+        return False
+    
+    # Configure Flask app
+    vg_app.config['SECRET_KEY'] = vg_config['api_settings']['secret_key']
+    
+    # Initialize CORS (only needed here, so imported here)
+    from flask_cors import CORS
+    CORS(vg_app, origins=vg_config['api_settings']['cors_origins'])
+    
+    # Initialize SocketIO with explicit CORS settings
+    vg_socketio.init_app(
+        vg_app,
+        cors_allowed_origins="*",  # Allow all origins for now
+        async_mode=py_serve.vf_get_async_mode()
+    )
+    
+    py_logfanout.vf_set_emitter(vf_emit_to)
+    py_statusfeed.vf_set_emitter(vf_emit_status_delta)
+    py_logfanout.vf_configure(vg_config['websocket_settings'])
+    py_httpstream.vf_configure(vg_config['websocket_settings'])
+    py_httpstream.vf_set_snapshot_provider(lambda: vf_get_status_snapshot())
+    py_bulk.vf_configure(py_process.vg_config['manager_settings'])
+    py_bulk.vf_set_emitter(lambda vf_event, vf_payload: vg_socketio.emit(vf_event, vf_payload))
+    py_reload.vf_set_emitter(lambda vf_event, vf_payload: vg_socketio.emit(vf_event, vf_payload))
+    py_respcache.vf_configure(vg_config['api_settings'])
+    
+    # Register callback
+    py_process.vf_set_log_callback(vf_on_log_update)
+    py_logger.vf_set_log_callback(vf_on_log_update)
+    
+    vg_initialized = True
+    return True
 
 # Middleware for optional authentication
 def vf_check_auth():
@@ -120,6 +256,23 @@ def vf_check_auth():
     
     return False
 
+def vf_sign_stream_token(vf_expires):
+    """Signature of a stream token, keyed with the API auth token"""
+    vf_key = vg_config['api_settings']['auth_token'].encode('utf-8')
+    return hmac.new(vf_key, f"stream:{vf_expires}".encode('ascii'), hashlib.sha256).hexdigest()
+
+def vf_make_stream_token():
+    """Short-lived token for clients that cannot send headers (EventSource)"""
+    vf_expires = int(time.time()) + vg_stream_token_ttl
+    return f"{vf_expires}.{vf_sign_stream_token(vf_expires)}"
+
+def vf_check_stream_token(vf_token):
+    """Check a stream token from the query string: signed by us and not expired"""
+    vf_expires, _, vf_signature = (vf_token or '').partition('.')
+    if not vf_expires.isdigit() or int(vf_expires) < time.time():
+        return False
+    return hmac.compare_digest(vf_signature, vf_sign_stream_token(int(vf_expires)))
+
 def vf_api_response(vf_success, vf_data=None, vf_error=None, vf_status_code=200):
     """Standardized API response format"""
     vf_response = {
@@ -135,55 +288,86 @@ def vf_api_response(vf_success, vf_data=None, vf_error=None, vf_status_code=200)
     
     return jsonify(vf_response), vf_status_code
 
+def vf_cached_api_response(vf_key, vf_version, vf_build):
+    """Successful API response served from the response cache
+
+    vf_build() returns the response data and only runs when vf_version
+    differs from the cached one. The timestamp is added per response, as
+    in vf_api_response. Adds an ETag, answers a matching If-None-Match
+    with 304 and compresses when the client accepts it.
+    """
+    def vf_serialize():
+        # Same layout as vf_api_response (keys sorted), cut before the timestamp
+        return ('{"data":' + vg_app.json.dumps(vf_build()) + ',"success":true,"timestamp":').encode('utf-8')
+    
+    vf_entry = py_respcache.vf_get_entry(vf_key, vf_version, vf_serialize)
+    vf_suffix = (json.dumps(datetime.now().isoformat()) + '}\n').encode('utf-8')
+    vf_encoding = py_respcache.vf_choose_encoding(request.headers.get('Accept-Encoding'), len(vf_entry['body']))
+    vf_headers = {
+        'ETag': py_respcache.vf_get_etag(vf_entry, vf_encoding),
+        'Vary': 'Accept-Encoding',
+        'Cache-Control': 'no-cache'  # Browsers revalidate with If-None-Match every time
+    }
+    
+    if py_respcache.vf_matches(vf_entry, request.headers.get('If-None-Match')):
+        py_respcache.vf_note_not_modified()
+        return Response(status=304, headers=vf_headers)
+    
+    if vf_encoding:
+        vf_headers['Content-Encoding'] = vf_encoding
+    return Response(py_respcache.vf_get_body(vf_entry, vf_encoding, vf_suffix), mimetype='application/json', headers=vf_headers)
+
 # REST API Routes
 
 @vg_app.route('/api/health', methods=['GET'])
 def route_health():
     """Health check endpoint"""
-    return vf_api_response(True, {'status': 'healthy', 'version': '1.0.0'})
+    return vf_api_response(True, {'status': 'healthy', 'version': '1.0.0', 'async_mode': py_serve.vf_get_async_mode()})
 
 @vg_app.route('/api/scripts', methods=['GET'])
 def route_get_scripts():
     """Get all configured scripts"""
     if not vf_check_auth():
-        return vf_api_response(False, error='Unauthorized', vf_status_code=401)
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
     
-    ag_scripts = py_process.vg_config['scripts']
-    return vf_api_response(True, {'scripts': ag_scripts})
+    return vf_cached_api_response(
+        ('scripts',),
+        py_process.vg_config_version,
+        lambda: {'scripts': py_process.vg_config['scripts']}
+    )
 
 @vg_app.route('/api/scripts/status', methods=['GET'])
 def route_get_all_status():
     """Get status of all scripts"""
     if not vf_check_auth():
-        return vf_api_response(False, error='Unauthorized', vf_status_code=401)
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
     
-    ag_status = py_process.vf_get_all_status()
-    return vf_api_response(True, {'status': ag_status})
+    return vf_cached_api_response(
+        ('status',),
+        py_process.vf_get_status_version(),
+        lambda: {'status': py_process.vf_get_all_status()}
+    )
 
 @vg_app.route('/api/scripts/<script_id>/status', methods=['GET'])
 def route_get_script_status(script_id):
     """Get status of specific script"""
     if not vf_check_auth():
-        return vf_api_response(False, error='Unauthorized', vf_status_code=401)
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
     
-    ag_all_status = py_process.vf_get_all_status()
-    vf_script_status = None
+    if not py_registry.vf_exists(script_id):
+        return vf_api_response(False, vf_error='Script not found', vf_status_code=404)
     
-    for vf_status in ag_all_status:
-        if vf_status['id'] == script_id:
-            vf_script_status = vf_status
-            break
-    
-    if vf_script_status:
-        return vf_api_response(True, {'status': vf_script_status})
-    else:
-        return vf_api_response(False, error='Script not found', vf_status_code=404)
+    return vf_cached_api_response(
+        ('status', script_id),
+        py_process.vf_get_status_version(),
+        lambda: {'status': py_process.vf_get_script_status(script_id)}
+    )
 
 @vg_app.route('/api/scripts/<script_id>/start', methods=['POST'])
 def route_start_script(script_id):
     """Start a script"""
     if not vf_check_auth():
-        return vf_api_response(False, error='Unauthorized', vf_status_code=401)
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
     
     vf_result = py_process.vf_start_script(script_id)
     
@@ -196,13 +380,13 @@ def route_start_script(script_id):
     if vf_result['success']:
         return vf_api_response(True, vf_result)
     else:
-        return vf_api_response(False, error=vf_result.get('error'), vf_status_code=400)
+        return vf_api_response(False, vf_error=vf_result.get('error'), vf_status_code=400)
 
 @vg_app.route('/api/scripts/<script_id>/stop', methods=['POST'])
 def route_stop_script(script_id):
     """Stop a script"""
     if not vf_check_auth():
-        return vf_api_response(False, error='Unauthorized', vf_status_code=401)
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
     
     vf_result = py_process.vf_stop_script(script_id)
     
@@ -215,13 +399,13 @@ def route_stop_script(script_id):
     if vf_result['success']:
         return vf_api_response(True, vf_result)
     else:
-        return vf_api_response(False, error=vf_result.get('error'), vf_status_code=400)
+        return vf_api_response(False, vf_error=vf_result.get('error'), vf_status_code=400)
 
 @vg_app.route('/api/scripts/<script_id>/restart', methods=['POST'])
 def route_restart_script(script_id):
     """Restart a script"""
     if not vf_check_auth():
-        return vf_api_response(False, error='Unauthorized', vf_status_code=401)
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
     
     vf_result = py_process.vf_restart_script(script_id)
     
@@ -234,44 +418,230 @@ def route_restart_script(script_id):
     if vf_result['success']:
         return vf_api_response(True, vf_result)
     else:
-        return vf_api_response(False, error=vf_result.get('error'), vf_status_code=400)
+        return vf_api_response(False, vf_error=vf_result.get('error'), vf_status_code=400)
 
 @vg_app.route('/api/scripts/<script_id>/logs', methods=['GET'])
 def route_get_script_logs(script_id):
     """Get logs for a script"""
     if not vf_check_auth():
-        return vf_api_response(False, error='Unauthorized', vf_status_code=401)
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
     
     vf_lines = request.args.get('lines', 100, type=int)
-    ag_logs = py_logger.vf_read_recent_logs(script_id, vf_lines)
+    vf_from_line = request.args.get('from_line', type=int)
+    vf_before_line = request.args.get('before', type=int)
+    
+    def vf_build():
+        # Paged read by line number: from_line reads forward, before reads the page above a line
+        vf_page = py_logger.vf_read_log_page(script_id, vf_lines, vf_from_line, vf_before_line)
+        ag_logs = vf_page['lines']
+        
+        if vf_from_line is None and vf_before_line is None and len(ag_logs) < vf_lines:
+            # Live file is short (just rotated), fill up from rotated segments
+            ag_logs = py_logger.vf_read_recent_logs(script_id, vf_lines)
+        
+        return {
+            'logs': ag_logs,
+            'script_id': script_id,
+            'first_line': vf_page['first_line'],
+            'next_line': vf_page['next_line'],
+            'total_lines': vf_page['total_lines'],
+            'has_older': vf_page['has_older']
+        }
+    
+    # A rotation changes the inode, an append the size
+    return vf_cached_api_response(
+        ('logs', script_id, vf_lines, vf_from_line, vf_before_line),
+        py_logger.vf_get_log_version(script_id),
+        vf_build
+    )
+
+@vg_app.route('/api/logs/search', methods=['GET'])
+def route_search_logs():
+    """Search script logs (words, or a regex with regex=1)"""
+    if not vf_check_auth():
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
+    
+    vf_query = request.args.get('q', '')
+    vf_script_id = request.args.get('script')
+    vf_since = request.args.get('since', type=float)
+    vf_cursor = request.args.get('cursor')
+    vf_regex = request.args.get('regex', '0') in ('1', 'true')
+    vf_limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+    
+    if not vf_query:
+        return vf_api_response(False, vf_error='q is required', vf_status_code=400)
+    
+    vf_targets = py_process.vf_get_log_targets()
+    if vf_script_id:
+        if vf_script_id not in vf_targets:
+            return vf_api_response(False, vf_error='Script ID not found', vf_status_code=404)
+        ag_targets = [(vf_script_id, vf_targets[vf_script_id])]
+    else:
+        ag_targets = sorted(vf_targets.items())
+    
+    try:
+        py_logsearch.vf_compile_query(vf_query, vf_regex)
+    except re.error as vf_error:
+        return vf_api_response(False, vf_error=f'Invalid regex: {vf_error}', vf_status_code=400)
+    
+    if request.args.get('stream', '0') in ('1', 'true'):
+        # One JSON object per line as matches are found, then a summary line
+        def vf_generate():
+            vf_count = 0
+            vf_last = None
+            for vf_match in py_logsearch.vf_search_iter(ag_targets, vf_query, vf_regex, vf_since, vf_cursor):
+                if vf_count >= vf_limit:
+                    break
+                vf_count += 1
+                vf_last = vf_match
+                yield json.dumps(vf_match) + '\n'
+            vf_next = vf_last['cursor'] if vf_last and vf_count >= vf_limit else None
+            yield json.dumps({'done': True, 'count': vf_count, 'next_cursor': vf_next}) + '\n'
+        
+        return Response(vf_generate(), mimetype='application/x-ndjson')
+    
+    return vf_api_response(True, py_logsearch.vf_search(ag_targets, vf_query, vf_regex, vf_since, vf_cursor, vf_limit))
+
+@vg_app.route('/api/stream/token', methods=['POST'])
+def route_stream_token():
+    """Issue a short-lived token to open /api/stream with (EventSource cannot send headers)"""
+    if not vf_check_auth():
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
+    
+    return vf_api_response(True, {'token': vf_make_stream_token(), 'expires_in': vg_stream_token_ttl})
+
+@vg_app.route('/api/stream', methods=['GET'])
+def route_stream():
+    """Server-Sent Events stream of status deltas and log frames"""
+    if not vf_check_auth() and not vf_check_stream_token(request.args.get('token')):
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
+    
+    vf_session, vf_error = py_httpstream.vf_open_session(
+        request.args.get('topics', 'status'),
+        request.args.get('level'),
+        request.args.get('match'),
+        vf_streaming=True,
+        vf_regex=request.args.get('regex')
+    )
+    if vf_error:
+        return vf_api_response(False, vf_error=vf_error, vf_status_code=400)
+    
+    return Response(
+        py_httpstream.vf_stream(vf_session),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}  # No proxy buffering
+    )
+
+@vg_app.route('/api/poll', methods=['GET'])
+def route_poll():
+    """Long-poll for status deltas and log frames (pass back the returned client ID)"""
+    if not vf_check_auth():
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
+    
+    vf_topics = request.args.get('topics', 'status')
+    vf_timeout = max(0.0, min(request.args.get('timeout', 25, type=float), 60.0))
+    vf_status, ag_script_ids, vf_error = py_httpstream.vf_parse_topics(vf_topics)
+    if vf_error:
+        return vf_api_response(False, vf_error=vf_error, vf_status_code=400)
+    
+    vf_session = py_httpstream.vf_get_session(request.args.get('client', ''))
+    vf_reset = vf_session is None and bool(request.args.get('client'))
+    
+    if vf_session is not None and (vf_session['status'] != vf_status or vf_session['script_ids'] != ag_script_ids):
+        # Topics changed: start over with a session for the new list
+        py_httpstream.vf_close_session(vf_session['id'])
+        vf_session = None
+    
+    if vf_session is None:
+        vf_session, vf_error = py_httpstream.vf_open_session(
+            vf_topics, request.args.get('level'), request.args.get('match'), vf_regex=request.args.get('regex')
+        )
+        if vf_error:
+            return vf_api_response(False, vf_error=vf_error, vf_status_code=400)
+    
+    ag_events = py_httpstream.vf_take_events(vf_session, vf_timeout)
+    
+    return vf_api_response(True, {
+        'client': vf_session['id'],
+        'reset': vf_reset,  # Session expired: events restart from a full snapshot
+        'events': [{'event': vf_event, 'data': vf_payload} for vf_event, vf_payload in ag_events]
+    })
+
+@vg_app.route('/api/scripts/<script_id>/metrics', methods=['GET'])
+def route_get_script_metrics(script_id):
+    """Get CPU/memory history for a script"""
+    if not vf_check_auth():
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
+    
+    vf_from = request.args.get('from', type=float)
+    vf_to = request.args.get('to', type=float)
+    vf_step = request.args.get('step', type=float)
     
-    return vf_api_response(True, {'logs': ag_logs, 'script_id': script_id})
+    if any(vf_value is not None and not math.isfinite(vf_value) for vf_value in (vf_from, vf_to, vf_step)):
+        return vf_api_response(False, vf_error='from, to and step must be finite numbers', vf_status_code=400)
+    if vf_step is not None and vf_step <= 0:
+        return vf_api_response(False, vf_error='step must be positive', vf_status_code=400)
+    if vf_from is not None and vf_to is not None and vf_from > vf_to:
+        return vf_api_response(False, vf_error='from must not be after to', vf_status_code=400)
+    
+    vf_history = py_timeseries.vf_query(script_id, vf_from, vf_to, vf_step)
+    vf_history['script_id'] = script_id
+    
+    return vf_api_response(True, vf_history)
 
 @vg_app.route('/api/manager/logs', methods=['GET'])
 def route_get_manager_logs():
     """Get manager logs"""
     if not vf_check_auth():
-        return vf_api_response(False, error='Unauthorized', vf_status_code=401)
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
     
     vf_lines = request.args.get('lines', 100, type=int)
-    ag_logs = py_logger.vf_read_recent_logs(None, vf_lines)
     
-    return vf_api_response(True, {'logs': ag_logs})
+    return vf_cached_api_response(
+        ('manager_logs', vf_lines),
+        py_logger.vf_get_log_version(),
+        lambda: {'logs': py_logger.vf_read_recent_logs(None, vf_lines)}
+    )
+
+@vg_app.route('/api/manager/supervisor', methods=['GET'])
+def route_get_supervisor_stats():
+    """Get supervisor, metrics, resource limit and log pipeline statistics"""
+    if not vf_check_auth():
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
+    
+    return vf_api_response(True, {
+        'supervisor': py_reaper.vf_get_stats(),
+        'metrics': py_metrics.vf_get_stats(),
+        'limits': py_limits.vf_get_info(),
+        'log_reader': py_logpipe.vf_get_reader_info(),
+        'log_pipeline': py_logpipe.vf_get_stats(),
+        'manager_log': py_logger.vf_get_writer_stats(),
+        'log_search': py_logsearch.vf_get_stats(),
+        'log_fanout': py_logfanout.vf_get_stats(),
+        'status_feed': py_statusfeed.vf_get_stats(),
+        'response_cache': py_respcache.vf_get_stats(),
+        'http_streams': py_httpstream.vf_get_stats(),
+        'registry': py_registry.vf_get_stats(),
+        'config_store': py_configstore.vf_get_stats(),
+        'config_reload': py_reload.vf_get_stats(),
+        'adoption': py_adopt.vf_get_stats(),
+        'startup': py_startup.vf_get_report()
+    })
 
 @vg_app.route('/api/config/reload', methods=['POST'])
 def route_reload_config():
-    """Reload configuration"""
+    """Reload configuration, starting, stopping and restarting only changed scripts"""
     if not vf_check_auth():
-        return vf_api_response(False, error='Unauthorized', vf_status_code=401)
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
     
-    vf_success = py_process.vf_load_config()
+    vf_result = py_reload.vf_reload('api')
     
-    if vf_success:
+    if vf_result['success']:
         py_logger.vf_write_manager_log('API', 'Configuration reloaded via API')
         vf_safe_emit_update()
-        return vf_api_response(True, {'message': 'Configuration reloaded'})
+        return vf_api_response(True, {'message': 'Configuration reloaded', 'summary': vf_result['summary']})
     else:
-        return vf_api_response(False, error='Failed to reload configuration', vf_status_code=500)
+        return vf_api_response(False, vf_error='Failed to reload configuration', vf_status_code=500)
 
 # Script Management Routes
 
@@ -279,16 +649,16 @@ def route_reload_config():
 def route_add_script():
     """Add a new script"""
     if not vf_check_auth():
-        return vf_api_response(False, error='Unauthorized', vf_status_code=401)
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
     
     vf_data = request.get_json()
     if not vf_data or 'path' not in vf_data:
-        return vf_api_response(False, error='Script path is required', vf_status_code=400)
+        return vf_api_response(False, vf_error='Script path is required', vf_status_code=400)
     
     # Validate script path
     vf_validation = py_script_manager.vf_validate_script_path(vf_data['path'])
     if not vf_validation['valid']:
-        return vf_api_response(False, error=vf_validation['error'], vf_status_code=400)
+        return vf_api_response(False, vf_error=vf_validation['error'], vf_status_code=400)
     
     # Add script
     vf_result = py_script_manager.vf_add_script(
@@ -301,66 +671,88 @@ def route_add_script():
     )
     
     if vf_result['success']:
-        # Reload config in process manager
-        py_process.vf_load_config()
         vf_safe_emit_update()
         py_logger.vf_write_manager_log('API', f'Added new script: {vf_result["script"]["name"]}')
         return vf_api_response(True, vf_result)
     else:
-        return vf_api_response(False, error=vf_result['error'], vf_status_code=400)
+        return vf_api_response(False, vf_error=vf_result['error'], vf_status_code=400)
+
+@vg_app.route('/api/scripts/add-batch', methods=['POST'])
+def route_add_scripts_batch():
+    """Add many scripts in one configuration change"""
+    if not vf_check_auth():
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
+    
+    vf_data = request.get_json(silent=True)
+    if not vf_data or not isinstance(vf_data.get('scripts'), list):
+        return vf_api_response(False, vf_error='scripts list is required', vf_status_code=400)
+    
+    vf_result = py_script_manager.vf_add_scripts(vf_data['scripts'])
+    
+    if vf_result['success']:
+        vf_safe_emit_update()
+        py_logger.vf_write_manager_log('API', f'Added {len(vf_result["scripts"])} scripts in a batch')
+        return vf_api_response(True, vf_result)
+    else:
+        return vf_api_response(False, vf_result, vf_error=vf_result['error'], vf_status_code=400)
 
 @vg_app.route('/api/scripts/<script_id>/remove', methods=['DELETE'])
 def route_remove_script(script_id):
     """Remove a script"""
     if not vf_check_auth():
-        return vf_api_response(False, error='Unauthorized', vf_status_code=401)
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
+    
+    # Refuse before stopping anything if other scripts depend on it
+    ag_dependents = py_script_manager.vf_get_dependents(script_id)
+    if ag_dependents:
+        return vf_api_response(False, vf_error=f"Script is required by {', '.join(ag_dependents)}", vf_status_code=400)
     
     # Stop script if running
-    if script_id in py_process.vg_processes:
+    if py_registry.vf_get_process(script_id) is not None:
         py_process.vf_stop_script(script_id)
     
     # Remove from config
+    vf_log_path = py_process.vf_get_log_targets().get(script_id)
     vf_result = py_script_manager.vf_remove_script(script_id)
     
     if vf_result['success']:
-        # Reload config
-        py_process.vf_load_config()
+        py_timeseries.vf_drop(script_id)
+        if vf_log_path:
+            py_logsearch.vf_forget(vf_log_path)
         vf_safe_emit_update()
         py_logger.vf_write_manager_log('API', f'Removed script: {script_id}')
         return vf_api_response(True, {'message': 'Script removed'})
     else:
-        return vf_api_response(False, error=vf_result['error'], vf_status_code=400)
+        return vf_api_response(False, vf_error=vf_result['error'], vf_status_code=400)
 
 @vg_app.route('/api/scripts/<script_id>/update', methods=['PUT'])
 def route_update_script(script_id):
     """Update script configuration"""
     if not vf_check_auth():
-        return vf_api_response(False, error='Unauthorized', vf_status_code=401)
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
     
     vf_data = request.get_json()
     if not vf_data:
-        return vf_api_response(False, error='No update data provided', vf_status_code=400)
+        return vf_api_response(False, vf_error='No update data provided', vf_status_code=400)
     
     vf_result = py_script_manager.vf_update_script(script_id, vf_data)
     
     if vf_result['success']:
-        # Reload config
-        py_process.vf_load_config()
         vf_safe_emit_update()
         py_logger.vf_write_manager_log('API', f'Updated script: {script_id}')
         return vf_api_response(True, {'message': 'Script updated'})
     else:
-        return vf_api_response(False, error=vf_result['error'], vf_status_code=400)
+        return vf_api_response(False, vf_error=vf_result['error'], vf_status_code=400)
 
 @vg_app.route('/api/browse/directory', methods=['POST'])
 def route_browse_directory():
     """Browse directory for Python files"""
     if not vf_check_auth():
-        return vf_api_response(False, error='Unauthorized', vf_status_code=401)
+        return vf_api_response(False, vf_error='Unauthorized', vf_status_code=401)
     
     vf_data = request.get_json()
     if not vf_data or 'directory' not in vf_data:
-        return vf_api_response(False, error='Directory path is required', vf_status_code=400)
+        return vf_api_response(False, vf_error='Directory path is required', vf_status_code=400)
     
     vf_result = py_script_manager.vf_list_python_files(vf_data['directory'])
     
@@ -368,7 +760,7 @@ def route_browse_directory():
         # Return the files directly in the data field for cleaner API response
         return vf_api_response(True, {'files': vf_result['files']})
     else:
-        return vf_api_response(False, error=vf_result['error'], vf_status_code=400)
+        return vf_api_response(False, vf_error=vf_result['error'], vf_status_code=400)
 
 # WebSocket Events
 
@@ -378,36 +770,79 @@ def handle_connect():
     print(f"Client connected: {request.sid}")
     emit('connected', {'message': 'Connected to Python Manager'})
     
-    # Send initial status
-    ag_status = py_process.vf_get_all_status()
-    emit('status_update', {'status': ag_status})
+    # Full snapshot once, then only status_delta messages
+    emit('status_update', vf_get_status_snapshot())
 
 @vg_socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
     print(f"Client disconnected: {request.sid}")
+    py_logfanout.vf_unsubscribe(request.sid)
 
 @vg_socketio.on('request_status')
 def handle_status_request():
-    """Handle status request from client"""
-    ag_status = py_process.vf_get_all_status()
-    emit('status_update', {'status': ag_status})
+    """Handle status request from client (also used to resync after a missed delta)"""
+    emit('status_update', vf_get_status_snapshot())
 
 @vg_socketio.on('subscribe_logs')
 def handle_subscribe_logs(data):
-    """Subscribe to log updates for a specific script"""
+    """Subscribe to log updates for a script, optionally filtered by level/match"""
+    data = data or {}
     vf_script_id = data.get('script_id')
-    # Implementation for log streaming would go here
-    emit('log_subscription', {'subscribed': vf_script_id})
+    if not vf_script_id:
+        emit('log_subscription', {'success': False, 'error': 'script_id is required'})
+        return
+    
+    # Unfiltered subscribers share the script's room
+    for vf_room in py_logfanout.vf_unsubscribe(request.sid, vf_script_id):
+        leave_room(vf_room)
+    
+    vf_result = py_logfanout.vf_subscribe(request.sid, vf_script_id, data.get('level'), data.get('match'), vf_regex=data.get('regex'))
+    if not vf_result['success']:
+        emit('log_subscription', {'success': False, 'script_id': vf_script_id, 'error': vf_result['error']})
+        return
+    
+    if vf_result['room']:
+        join_room(vf_result['room'])
+    
+    emit('log_subscription', {
+        'success': True,
+        'subscribed': vf_script_id,
+        'subscriptions': py_logfanout.vf_get_subscriptions(request.sid)
+    })
+
+@vg_socketio.on('log_ack')
+def handle_log_ack(data):
+    """Client processed log_update frames up to a sequence number"""
+    data = data or {}
+    if data.get('script_id') is not None and isinstance(data.get('seq'), int):
+        py_logfanout.vf_ack(request.sid, data['script_id'], data['seq'])
+
+@vg_socketio.on('unsubscribe_logs')
+def handle_unsubscribe_logs(data):
+    """Stop log updates for one script, or all when no script_id is given"""
+    vf_script_id = (data or {}).get('script_id')
+    
+    for vf_room in py_logfanout.vf_unsubscribe(request.sid, vf_script_id):
+        leave_room(vf_room)
+    
+    emit('log_subscription', {
+        'success': True,
+        'unsubscribed': vf_script_id,
+        'subscriptions': py_logfanout.vf_get_subscriptions(request.sid)
+    })
+
+def vf_get_status_snapshot():
+    """Full status snapshot with its sequence number, brought up to date first"""
+    vf_emit_status_update()
+    return py_statusfeed.vf_get_full()
 
 def vf_emit_status_update():
-    """Emit status update to all connected clients"""
+    """Broadcast what changed since the last status update"""
     try:
-        ag_status = py_process.vf_get_all_status()
-        vg_socketio.emit('status_update', {'status': ag_status}, broadcast=True)
+        py_statusfeed.vf_refresh_if_changed(py_process.vf_get_status_version(), py_process.vf_get_all_status)
     except Exception as vf_error:
-        # Silently fail if not in request context
-        pass
+        print(f"Error emitting status update: {vf_error}")
 
 def vf_safe_emit_update():
     """Safely emit update, handling context issues"""
@@ -430,14 +865,20 @@ def vf_status_update_loop():
             print(f"Error in status update loop: {vf_error}")
             time.sleep(5)
 
-def vf_start_api():
+def vf_start_api(vf_profile_startup=False):
     """Start the API server"""
     global vg_update_thread
     
-    # Start the monitor thread
-    vf_monitor_thread = threading.Thread(target=py_process.vf_monitor_processes)
-    vf_monitor_thread.daemon = True
-    vf_monitor_thread.start()
+    with py_startup.vf_phase('init: configuration and API'):
+        if not vf_init():
+            print("Failed to load configuration!")
+            return
+    
+    # Start the exit supervisor
+    with py_startup.vf_phase('init: supervisor'):
+        py_process.vf_start_supervisor()
+    with py_startup.vf_phase('init: config watcher'):
+        py_reload.vf_start_watcher(py_process.vg_config['manager_settings'])
     
     # Start status update thread
     vg_update_thread = threading.Thread(target=vf_status_update_loop)
@@ -447,13 +888,18 @@ def vf_start_api():
     # Log API startup
     py_logger.vf_write_manager_log('API', 'API server started')
     
+    py_startup.vf_finish()
+    if vf_profile_startup:
+        py_startup.vf_print_report()
+    
     # Run the Flask app with SocketIO
-    vg_socketio.run(
+    py_serve.vf_run(
+        vg_socketio,
         vg_app,
-        host=vg_config['api_settings']['host'],
-        port=vg_config['api_settings']['port'],
-        debug=vg_config['api_settings']['debug']
+        vg_config['api_settings']['host'],
+        vg_config['api_settings']['port'],
+        vg_config['api_settings']['debug']
     )
 
 if __name__ == '__main__':
-    vf_start_api()
\ No newline at end of file
+    vf_start_api('--profile-startup' in sys.argv)
\ No newline at end of file
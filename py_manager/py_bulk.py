@@ -0,0 +1,266 @@
+"""Bulk start/stop jobs
+
+A bulk operation runs in the background as a job with an ID. Its
+scripts are split into stages by py_depgraph (depends_on/start_stage).
+Starts go stage by stage, each stage on a pool of vg_start_parallelism
+workers, and a stage counts as done once its scripts passed their ready
+checks; scripts whose dependencies failed are not started. Stops run
+the stages in reverse through py_process.vf_stop_scripts, which signals
+every target of a stage at once and waits against one shared deadline.
+
+Each finished script appends a progress event to the job, which callers
+can read back, wait on or stream, and which is also broadcast to
+Socket.IO clients.
+
+The last vg_max_jobs jobs are kept for inspection.
+"""
+
+import collections
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import py_depgraph
+import py_process
+import py_registry
+
+# Global variables
+vg_emitter = None          # Called as emitter(event, payload) to broadcast progress
+vg_lock = threading.Lock()
+vg_jobs = collections.OrderedDict()  # job ID -> job dict, oldest first
+vg_max_jobs = 50
+vg_start_parallelism = 8   # Scripts started at the same time
+vg_stop_timeout = 10       # Seconds stopped scripts get before SIGKILL
+vg_max_parallelism = 64    # Upper bound for a request's parallelism
+vg_max_stop_timeout = 3600 # Upper bound for a request's timeout in seconds
+
+def vf_set_emitter(callback):
+    """Set the function used to broadcast progress"""
+    global vg_emitter
+    vg_emitter = callback
+
+def vf_configure(vf_settings):
+    """Apply bulk operation settings from manager_settings"""
+    global vg_start_parallelism, vg_stop_timeout
+    vg_start_parallelism = max(1, int(vf_settings.get('bulk_start_parallelism', vg_start_parallelism)))
+    vg_stop_timeout = vf_settings.get('bulk_stop_timeout_seconds', vg_stop_timeout)
+
+def vf_new_job(vf_action, ag_script_ids):
+    """Create and register a job"""
+    vf_job = {
+        'id': uuid.uuid4().hex[:12],
+        'action': vf_action,
+        'state': 'running',
+        'script_ids': list(ag_script_ids),
+        'stages': [list(ag_script_ids)],
+        'results': {},
+        'events': [],
+        'succeeded': 0,
+        'failed': 0,
+        'created': time.time(),
+        'finished': None,
+        'cond': threading.Condition()
+    }
+
+    with vg_lock:
+        vg_jobs[vf_job['id']] = vf_job
+        while len(vg_jobs) > vg_max_jobs:
+            vg_jobs.popitem(last=False)
+    return vf_job
+
+def vf_record(vf_job, vf_script_id, vf_result):
+    """Store one script's result and publish a progress event"""
+    with vf_job['cond']:
+        vf_job['results'][vf_script_id] = vf_result
+        if vf_result.get('success'):
+            vf_job['succeeded'] += 1
+        else:
+            vf_job['failed'] += 1
+        vf_event = {
+            'job_id': vf_job['id'],
+            'seq': len(vf_job['events']) + 1,
+            'script_id': vf_script_id,
+            'result': vf_result,
+            'done': len(vf_job['results']),
+            'total': len(vf_job['script_ids'])
+        }
+        vf_job['events'].append(vf_event)
+        vf_job['cond'].notify_all()
+
+    if vg_emitter is not None:
+        vg_emitter('job_progress', vf_event)
+
+def vf_finish(vf_job):
+    """Mark a job as done and wake everyone waiting on it"""
+    with vf_job['cond']:
+        vf_job['state'] = 'done'
+        vf_job['finished'] = time.time()
+        vf_job['cond'].notify_all()
+
+    if vg_emitter is not None:
+        vg_emitter('job_done', vf_get_summary(vf_job))
+
+def vf_start_one(vf_script_id):
+    """Start a script and wait for its ready check"""
+    vf_script = py_process.vf_get_script_config(vf_script_id) or {}
+    if py_process.vf_is_process_running(vf_script_id):
+        return {"success": True, "message": f"Script {vf_script_id} already running"}
+
+    vf_log_path = py_process.vf_get_log_targets().get(vf_script_id)
+    vf_log_offset = py_depgraph.vf_get_log_offset(vf_log_path) if vf_log_path else 0
+
+    vf_result = py_process.vf_start_script(vf_script_id)
+    if not vf_result['success'] or not vf_script.get('ready_check'):
+        return vf_result
+
+    vf_ready, vf_error = py_depgraph.vf_wait_ready(
+        vf_script, lambda: py_process.vf_is_process_running(vf_script_id), vf_log_path, vf_log_offset
+    )
+    if not vf_ready:
+        return {"success": False, "pid": vf_result.get('pid'), "error": f"Not ready: {vf_error}"}
+    return dict(vf_result, ready=True)
+
+def vf_run_start(vf_job, vf_parallelism):
+    """Start the job's stages in order, each on a bounded worker pool"""
+    vf_failed = set()
+
+    def vf_run_one(vf_script_id):
+        try:
+            vf_result = vf_start_one(vf_script_id)
+        except Exception as vf_error:
+            vf_result = {"success": False, "error": str(vf_error)}
+        if not vf_result['success']:
+            vf_failed.add(vf_script_id)
+        vf_record(vf_job, vf_script_id, vf_result)
+
+    with ThreadPoolExecutor(max_workers=vf_parallelism, thread_name_prefix='py-bulk-start') as vf_pool:
+        for ag_stage in vf_job['stages']:
+            ag_ready = []
+            for vf_script_id in ag_stage:
+                vf_script = py_process.vf_get_script_config(vf_script_id) or {}
+                ag_blocked = [vf_dep for vf_dep in py_depgraph.vf_get_dependencies(vf_script) if vf_dep in vf_failed]
+                if ag_blocked:
+                    vf_failed.add(vf_script_id)
+                    vf_record(vf_job, vf_script_id, {"success": False, "error": f"Dependency not ready: {', '.join(ag_blocked)}"})
+                else:
+                    ag_ready.append(vf_script_id)
+            list(vf_pool.map(vf_run_one, ag_ready))
+
+def vf_run_stop(vf_job, vf_timeout):
+    """Stop the job's stages in reverse order, each with one shared deadline"""
+    for ag_stage in reversed(vf_job['stages']):
+        py_process.vf_stop_scripts(
+            ag_stage, vf_timeout,
+            vf_progress=lambda vf_script_id, vf_result: vf_record(vf_job, vf_script_id, vf_result)
+        )
+
+def vf_run_job(vf_job, vf_parallelism, vf_timeout, vf_on_done):
+    """Job thread body"""
+    try:
+        if vf_job['action'] == 'start':
+            vf_run_start(vf_job, vf_parallelism)
+        else:
+            vf_run_stop(vf_job, vf_timeout)
+    except Exception as vf_error:
+        print(f"Bulk {vf_job['action']} job {vf_job['id']} failed: {vf_error}")
+    finally:
+        vf_finish(vf_job)
+        if vf_on_done is not None:
+            vf_on_done(vf_job)
+
+def vf_submit(vf_action, ag_script_ids, vf_parallelism=None, vf_timeout=None, vf_on_done=None):
+    """Run a bulk 'start' or 'stop' in the background, returns the job"""
+    vf_job = vf_new_job(vf_action, ag_script_ids)
+    vf_parallelism = max(1, int(vf_parallelism or vg_start_parallelism))
+    vf_timeout = vg_stop_timeout if vf_timeout is None else vf_timeout
+
+    # Starts also bring up dependencies that are not running yet
+    ag_unknown = []
+    if vf_action == 'stop':
+        # Processes removed from the config can still be stopped, first of all
+        ag_unknown = [vf_script_id for vf_script_id in vf_job['script_ids'] if not py_registry.vf_exists(vf_script_id)]
+    ag_stages, vf_error = py_depgraph.vf_resolve_stages(
+        py_registry.vf_list(),
+        [vf_script_id for vf_script_id in vf_job['script_ids'] if py_registry.vf_exists(vf_script_id) or vf_action == 'start'],
+        py_process.vf_is_process_running if vf_action == 'start' else None
+    )
+    if ag_unknown and not vf_error:
+        ag_stages.append(ag_unknown)
+    if vf_error:
+        for vf_script_id in vf_job['script_ids']:
+            vf_record(vf_job, vf_script_id, {"success": False, "error": vf_error})
+        vf_finish(vf_job)
+        return vf_job
+
+    vf_job['stages'] = ag_stages
+    vf_job['script_ids'] = [vf_script_id for ag_stage in ag_stages for vf_script_id in ag_stage]
+
+    if not vf_job['script_ids']:
+        vf_finish(vf_job)
+        return vf_job
+
+    threading.Thread(
+        target=vf_run_job,
+        args=(vf_job, vf_parallelism, vf_timeout, vf_on_done),
+        name=f"py-bulk-{vf_action}",
+        daemon=True
+    ).start()
+    return vf_job
+
+def vf_get_job(vf_job_id):
+    """Look up a job by ID"""
+    with vg_lock:
+        return vg_jobs.get(vf_job_id)
+
+def vf_wait(vf_job, vf_timeout=None):
+    """Block until a job is done, returns False on timeout"""
+    with vf_job['cond']:
+        return vf_job['cond'].wait_for(lambda: vf_job['state'] == 'done', vf_timeout)
+
+def vf_iter_events(vf_job, vf_after=0, vf_idle_timeout=30):
+    """Yield progress events after seq vf_after as they happen, until the job is done"""
+    vf_next = vf_after
+    while True:
+        with vf_job['cond']:
+            vf_job['cond'].wait_for(
+                lambda: len(vf_job['events']) > vf_next or vf_job['state'] == 'done',
+                vf_idle_timeout
+            )
+            ag_events = vf_job['events'][vf_next:]
+            vf_done = vf_job['state'] == 'done'
+
+        for vf_event in ag_events:
+            yield vf_event
+        vf_next += len(ag_events)
+
+        if vf_done:
+            return
+
+def vf_get_summary(vf_job, vf_include_results=False):
+    """Job state and counters, optionally with per-script results"""
+    with vf_job['cond']:
+        vf_summary = {
+            'job_id': vf_job['id'],
+            'action': vf_job['action'],
+            'state': vf_job['state'],
+            'total': len(vf_job['script_ids']),
+            'stages': vf_job['stages'],
+            'done': len(vf_job['results']),
+            'succeeded': vf_job['succeeded'],
+            'failed': vf_job['failed'],
+            'created': vf_job['created'],
+            'finished': vf_job['finished']
+        }
+        if vf_include_results:
+            vf_summary['results'] = [
+                {'script_id': vf_script_id, 'result': vf_result}
+                for vf_script_id, vf_result in vf_job['results'].items()
+            ]
+    return vf_summary
+
+def vf_list_jobs():
+    """Summaries of kept jobs, newest first"""
+    with vg_lock:
+        ag_jobs = list(vg_jobs.values())
+    return [vf_get_summary(vf_job) for vf_job in reversed(ag_jobs)]
@@ -0,0 +1,251 @@
+"""Configuration store with write-behind persistence
+
+The configuration in memory is authoritative. A change is a list of
+records ({'op': 'add', 'script': {...}}, {'op': 'update', 'id': ...,
+'fields': {...}} or {'op': 'remove', 'id': ...}) applied to a copy of
+the script list, which then replaces the current one and is handed to
+the listener (py_process), so readers never see a half-applied change.
+
+Each change is appended to config.journal and fsynced before it is
+acknowledged. config.json itself is rewritten vg_write_delay seconds
+later, once for all changes made meanwhile, through a temp file and an
+atomic rename, after which the journal is emptied. Loading replays any
+journal records left by a crash on top of config.json.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import py_scheduler
+
+# Global variables
+vg_lock = threading.RLock()
+vg_config = None            # Authoritative configuration
+vg_config_path = os.path.join(os.path.dirname(__file__), 'config.json')
+vg_journal_path = os.path.join(os.path.dirname(__file__), 'config.journal')
+vg_listener = None          # Called with the new configuration after every load or change
+vg_write_delay = 0.5        # Seconds changes are collected before config.json is rewritten
+vg_timer = None             # Pending write-behind timer
+vg_disk_signature = None    # (inode, mtime, size) of config.json as last read or written
+vg_stats = {
+    'changes': 0,
+    'records': 0,
+    'writes': 0,
+    'replayed': 0,
+    'write_errors': 0
+}
+
+def vf_set_listener(callback):
+    """Set the function told about every new configuration"""
+    global vg_listener
+    vg_listener = callback
+
+def vf_configure(vf_settings):
+    """Apply persistence settings from manager_settings"""
+    global vg_write_delay
+    vg_write_delay = max(0, vf_settings.get('config_write_delay_seconds', vg_write_delay))
+
+def vf_read_signature():
+    """Identity of config.json on disk, None if missing"""
+    try:
+        vf_stat = os.stat(vg_config_path)
+    except OSError:
+        return None
+    return (vf_stat.st_ino, vf_stat.st_mtime_ns, vf_stat.st_size)
+
+def vf_disk_changed():
+    """Check if config.json was changed by someone else since it was last read or written"""
+    return vf_read_signature() != vg_disk_signature
+
+def vf_read_journal():
+    """Records of all complete journal lines, a torn last line is ignored"""
+    ag_records = []
+    try:
+        with open(vg_journal_path, 'r') as vf_file:
+            for vf_line in vf_file:
+                try:
+                    ag_records.extend(json.loads(vf_line)['records'])
+                except (ValueError, KeyError):
+                    break  # Crash while appending, nothing after it was acknowledged
+    except FileNotFoundError:
+        pass
+    return ag_records
+
+def vf_apply_records(ag_scripts, ag_records):
+    """New script list with the records applied, the input is not changed"""
+    ag_result = list(ag_scripts)
+    vf_index = {vf_script['id']: vf_pos for vf_pos, vf_script in enumerate(ag_result)}
+    vf_removed = False
+
+    for vf_record in ag_records:
+        if vf_record['op'] == 'remove':
+            vf_pos = vf_index.pop(vf_record['id'], None)
+            if vf_pos is not None:
+                ag_result[vf_pos] = None
+                vf_removed = True
+            continue
+
+        if vf_record['op'] == 'update':
+            # Merged into a copy of the entry as it is when the change applies
+            vf_pos = vf_index.get(vf_record['id'])
+            if vf_pos is not None:
+                ag_result[vf_pos] = dict(ag_result[vf_pos], **vf_record['fields'])
+            continue
+
+        # An add replaces an entry with the same ID, so a replay is harmless
+        vf_script = vf_record['script']
+        vf_pos = vf_index.get(vf_script['id'])
+        if vf_pos is None:
+            vf_index[vf_script['id']] = len(ag_result)
+            ag_result.append(vf_script)
+        else:
+            ag_result[vf_pos] = vf_script
+
+    if vf_removed:
+        ag_result = [vf_script for vf_script in ag_result if vf_script is not None]
+    return ag_result
+
+def vf_load():
+    """Read config.json, replay the journal and publish it, returns the config or None"""
+    global vg_config, vg_disk_signature
+
+    # Check if config exists, if not try to copy from example
+    if not os.path.exists(vg_config_path):
+        vf_example_path = os.path.join(os.path.dirname(__file__), 'config.example.json')
+        if os.path.exists(vf_example_path):
+            try:
+                shutil.copy(vf_example_path, vg_config_path)
+                print("Created config.json from config.example.json")
+            except Exception as vf_error:
+                print(f"Error creating config from example: {vf_error}")
+
+    with vg_lock:
+        # Taken before reading: a write after this point shows up as a change
+        vg_disk_signature = vf_read_signature()
+        try:
+            with open(vg_config_path, 'r') as vf_file:
+                vf_config = json.load(vf_file)
+        except Exception as vf_error:
+            print(f"Error loading config: {vf_error}")
+            return None
+
+        ag_records = vf_read_journal()
+        if ag_records:
+            vf_config['scripts'] = vf_apply_records(vf_config.get('scripts', []), ag_records)
+            vg_stats['replayed'] += len(ag_records)
+            print(f"Replayed {len(ag_records)} journaled config changes")
+
+        vg_config = vf_config
+        if vg_listener is not None:
+            vg_listener(vg_config)
+
+        if ag_records:
+            vf_flush()
+        return vg_config
+
+def vf_get_config():
+    """Current configuration"""
+    return vg_config
+
+def vf_commit(ag_records, vf_validate=None):
+    """Apply a change to the scripts, journal it and schedule the write
+
+    vf_validate(scripts) may return an error to reject the change.
+    """
+    global vg_config, vg_timer
+
+    with vg_lock:
+        if vg_config is None:
+            return {"success": False, "error": "Configuration not loaded"}
+
+        ag_scripts = vf_apply_records(vg_config.get('scripts', []), ag_records)
+        if vf_validate is not None:
+            vf_error = vf_validate(ag_scripts)
+            if vf_error:
+                return {"success": False, "error": vf_error}
+
+        # Durable before it is visible
+        try:
+            vf_fd = os.open(vg_journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                os.write(vf_fd, (json.dumps({'records': ag_records}) + '\n').encode('utf-8'))
+                os.fsync(vf_fd)
+            finally:
+                os.close(vf_fd)
+        except OSError as vf_error:
+            return {"success": False, "error": f"Failed to save configuration: {vf_error}"}
+
+        vg_config = dict(vg_config, scripts=ag_scripts)
+        vg_stats['changes'] += 1
+        vg_stats['records'] += len(ag_records)
+        if vg_listener is not None:
+            vg_listener(vg_config)
+
+        if vg_timer is None:
+            vg_timer = py_scheduler.vf_call_later(vg_write_delay, vf_flush)
+
+    return {"success": True}
+
+def vf_write_atomic(vf_data):
+    """Replace config.json with vf_data through a temp file and rename"""
+    vf_dir = os.path.dirname(vg_config_path)
+    vf_fd, vf_tmp_path = tempfile.mkstemp(prefix='.config.', suffix='.tmp', dir=vf_dir)
+    try:
+        with os.fdopen(vf_fd, 'w') as vf_file:
+            vf_file.write(vf_data)
+            vf_file.flush()
+            os.fsync(vf_file.fileno())
+        try:
+            shutil.copymode(vg_config_path, vf_tmp_path)
+        except OSError:
+            pass
+        os.replace(vf_tmp_path, vg_config_path)
+    except BaseException:
+        try:
+            os.unlink(vf_tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # Make the rename itself durable
+    vf_dir_fd = os.open(vf_dir, os.O_RDONLY)
+    try:
+        os.fsync(vf_dir_fd)
+    finally:
+        os.close(vf_dir_fd)
+
+def vf_flush():
+    """Write pending changes to config.json now and empty the journal"""
+    global vg_timer, vg_disk_signature
+
+    with vg_lock:
+        py_scheduler.vf_cancel(vg_timer)
+        vg_timer = None
+        if vg_config is None or not os.path.exists(vg_journal_path):
+            return True
+
+        try:
+            vf_write_atomic(json.dumps(vg_config, indent=2))
+            vg_disk_signature = vf_read_signature()  # Our own write is not an edit to reload
+            os.unlink(vg_journal_path)  # Everything in it is in config.json now
+        except OSError as vf_error:
+            vg_stats['write_errors'] += 1
+            print(f"Error saving config: {vf_error}")
+            return False
+
+        vg_stats['writes'] += 1
+        return True
+
+def vf_get_stats():
+    """Get store counters"""
+    return {
+        'changes': vg_stats['changes'],
+        'records': vg_stats['records'],
+        'writes': vg_stats['writes'],
+        'replayed': vg_stats['replayed'],
+        'write_errors': vg_stats['write_errors'],
+        'pending': vg_timer is not None
+    }
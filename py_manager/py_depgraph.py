@@ -0,0 +1,219 @@
+"""Start order and readiness gates for scripts
+
+Scripts can name the scripts they need in "depends_on" and can be pinned
+to a "start_stage". Together these resolve into stages: a script's stage
+is its start_stage or one past the latest stage of its dependencies,
+whichever is later. Stages start one after the other, the scripts inside
+a stage start in parallel, and a stopping order is the same list
+reversed.
+
+A script with a "ready_check" only counts as started once the check
+passes, so the next stage waits for it:
+
+    "ready_check": {"port": 8000, "host": "127.0.0.1"}    TCP port accepts
+    "ready_check": {"log": "Listening on"}                regex in new log output
+    "ready_check": {"command": "curl -sf localhost:8000"} command exits with 0
+
+Several keys can be combined (all must pass); "timeout" (seconds,
+default 30) and "interval" (default 0.5) tune the polling.
+"""
+
+import os
+import re
+import shlex
+import socket
+import subprocess
+import time
+
+# Global variables
+vg_default_timeout = 30     # Seconds a ready check may take
+vg_default_interval = 0.5   # Seconds between check attempts
+vg_log_read_limit = 1024 * 1024  # Bytes of new log output scanned per attempt
+
+def vf_get_dependencies(vf_script):
+    """IDs a script depends on"""
+    ag_depends_on = vf_script.get('depends_on') or []
+    if isinstance(ag_depends_on, str):
+        ag_depends_on = [ag_depends_on]
+    return list(ag_depends_on)
+
+def vf_validate(ag_scripts):
+    """Check dependencies and ready checks of a script list, returns an error or None"""
+    vf_by_id = {vf_script['id']: vf_script for vf_script in ag_scripts}
+
+    for vf_script in ag_scripts:
+        for vf_dep in vf_get_dependencies(vf_script):
+            if vf_dep == vf_script['id']:
+                return f"{vf_script['id']} depends on itself"
+            if vf_dep not in vf_by_id:
+                return f"{vf_script['id']} depends on unknown script {vf_dep}"
+        vf_error = vf_validate_ready_check(vf_script.get('ready_check'))
+        if vf_error:
+            return f"{vf_script['id']}: {vf_error}"
+
+    _, vf_error = vf_compute_stages(vf_by_id, list(vf_by_id))
+    return vf_error
+
+def vf_validate_ready_check(vf_check):
+    """Check the shape of a ready_check, returns an error or None"""
+    if not vf_check:
+        return None
+    if not isinstance(vf_check, dict):
+        return 'ready_check must be an object'
+    if not any(vf_key in vf_check for vf_key in ('port', 'log', 'command')):
+        return 'ready_check needs port, log or command'
+    if 'log' in vf_check:
+        try:
+            re.compile(vf_check['log'])
+        except re.error as vf_error:
+            return f"Invalid ready_check log regex: {vf_error}"
+    return None
+
+def vf_compute_stages(vf_by_id, ag_script_ids):
+    """Stage number of each script in ag_script_ids, returns ({id: stage}, error)
+
+    Dependencies outside ag_script_ids are taken as satisfied.
+    """
+    vf_included = set(ag_script_ids)
+    vf_stages = {}
+    vf_visiting = set()
+
+    def vf_visit(vf_script_id, ag_path):
+        if vf_script_id in vf_stages:
+            return vf_stages[vf_script_id], None
+        if vf_script_id in vf_visiting:
+            return None, 'Dependency cycle: ' + ' -> '.join(ag_path + [vf_script_id])
+
+        vf_visiting.add(vf_script_id)
+        vf_script = vf_by_id[vf_script_id]
+        vf_stage = int(vf_script.get('start_stage', 0) or 0)
+        for vf_dep in vf_get_dependencies(vf_script):
+            if vf_dep not in vf_included or vf_dep not in vf_by_id:
+                continue
+            vf_dep_stage, vf_error = vf_visit(vf_dep, ag_path + [vf_script_id])
+            if vf_error:
+                return None, vf_error
+            vf_stage = max(vf_stage, vf_dep_stage + 1)
+        vf_visiting.discard(vf_script_id)
+
+        vf_stages[vf_script_id] = vf_stage
+        return vf_stage, None
+
+    for vf_script_id in ag_script_ids:
+        _, vf_error = vf_visit(vf_script_id, [])
+        if vf_error:
+            return None, vf_error
+    return vf_stages, None
+
+def vf_resolve_stages(ag_scripts, ag_script_ids, vf_is_running=None):
+    """Group scripts into start stages, returns ([[ids of stage 0], ...], error)
+
+    With vf_is_running given, dependencies that are not running are
+    pulled in so they start first (use it for starts, not for stops).
+    """
+    vf_by_id = {vf_script['id']: vf_script for vf_script in ag_scripts}
+    ag_unknown = [vf_script_id for vf_script_id in ag_script_ids if vf_script_id not in vf_by_id]
+    if ag_unknown:
+        return None, f"Script ID not found: {', '.join(ag_unknown)}"
+
+    ag_selected = list(dict.fromkeys(ag_script_ids))
+    if vf_is_running is not None:
+        ag_pending = list(ag_selected)
+        while ag_pending:
+            for vf_dep in vf_get_dependencies(vf_by_id[ag_pending.pop()]):
+                if vf_dep in vf_by_id and vf_dep not in ag_selected and not vf_is_running(vf_dep):
+                    ag_selected.append(vf_dep)
+                    ag_pending.append(vf_dep)
+
+    vf_stages, vf_error = vf_compute_stages(vf_by_id, ag_selected)
+    if vf_error:
+        return None, vf_error
+
+    # Keep configuration order inside a stage
+    ag_ordered = [vf_script['id'] for vf_script in ag_scripts if vf_script['id'] in vf_stages]
+    ag_result = []
+    for vf_stage in sorted(set(vf_stages.values())):
+        ag_result.append([vf_script_id for vf_script_id in ag_ordered if vf_stages[vf_script_id] == vf_stage])
+    return ag_result, None
+
+def vf_get_log_offset(vf_log_path):
+    """Current size of a log, where a log ready check starts reading"""
+    try:
+        return os.path.getsize(vf_log_path)
+    except OSError:
+        return 0
+
+def vf_check_port(vf_check):
+    """Try one TCP connect"""
+    try:
+        with socket.create_connection((vf_check.get('host', '127.0.0.1'), int(vf_check['port'])), timeout=1):
+            return True
+    except OSError:
+        return False
+
+def vf_check_command(vf_check, vf_timeout):
+    """Run the health command once"""
+    vf_command = vf_check['command']
+    if isinstance(vf_command, str):
+        vf_command = shlex.split(vf_command)
+    try:
+        return subprocess.run(
+            vf_command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=max(vf_timeout, 1)
+        ).returncode == 0
+    except (OSError, subprocess.SubprocessError):
+        return False
+
+def vf_check_log(vf_pattern, vf_log_path, vf_state):
+    """Scan log output written since the start for the pattern"""
+    try:
+        with open(vf_log_path, 'rb') as vf_file:
+            vf_file.seek(vf_state['offset'])
+            vf_data = vf_file.read(vg_log_read_limit)
+    except OSError:
+        return False
+
+    # Only scan complete lines, keep a partial one for the next attempt
+    vf_end = vf_data.rfind(b'\n') + 1
+    if vf_end == 0 and len(vf_data) < vg_log_read_limit:
+        return False
+    vf_end = vf_end or len(vf_data)
+    vf_state['offset'] += vf_end
+    return vf_pattern.search(vf_data[:vf_end].decode('utf-8', errors='ignore')) is not None
+
+def vf_wait_ready(vf_script, vf_is_alive, vf_log_path=None, vf_log_offset=0):
+    """Block until a script's ready_check passes, returns (ready, error)
+
+    vf_is_alive() tells whether the process still runs; a process that
+    exits while being checked fails the check at once.
+    """
+    vf_check = vf_script.get('ready_check')
+    if not vf_check:
+        return True, None
+
+    vf_timeout = float(vf_check.get('timeout', vg_default_timeout))
+    vf_interval = float(vf_check.get('interval', vg_default_interval))
+    vf_deadline = time.monotonic() + vf_timeout
+
+    vf_pattern = re.compile(vf_check['log']) if 'log' in vf_check else None
+    vf_log_state = {'offset': vf_log_offset}
+    ag_pending = [vf_key for vf_key in ('log', 'port', 'command') if vf_key in vf_check]
+
+    while True:
+        if not vf_is_alive():
+            return False, 'process exited before it was ready'
+
+        # Passed checks stay passed, a log line will not be printed twice
+        if 'log' in ag_pending and vf_log_path and vf_check_log(vf_pattern, vf_log_path, vf_log_state):
+            ag_pending.remove('log')
+        if 'port' in ag_pending and vf_check_port(vf_check):
+            ag_pending.remove('port')
+        if 'command' in ag_pending and vf_check_command(vf_check, vf_deadline - time.monotonic()):
+            ag_pending.remove('command')
+
+        if not ag_pending:
+            return True, None
+
+        vf_remaining = vf_deadline - time.monotonic()
+        if vf_remaining <= 0:
+            return False, f"{', '.join(ag_pending)} check did not pass within {vf_timeout:g}s"
+        time.sleep(min(vf_interval, vf_remaining))
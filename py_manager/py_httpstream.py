@@ -0,0 +1,225 @@
+"""Status and log updates for clients without a WebSocket
+
+A client opens a session for a list of topics: 'status' and any number
+of 'logs:<script_id>'. Sessions are fed by the same machinery as the
+Socket.IO path: py_statusfeed deltas and py_logfanout frames (delivered
+through a callback instead of a room). The API serves a session either
+as a Server-Sent Events stream or through long-poll requests that block
+until something is queued.
+
+The first batch of a session starts with a full status_update. Queued
+log frames are acknowledged to py_logfanout when they are taken, so a
+long-poll client that stops polling is handled like a slow WebSocket
+client. A session that stops polling for vg_session_timeout seconds is
+closed; its next poll gets a fresh session and a full snapshot.
+"""
+
+import collections
+import json
+import threading
+import time
+import uuid
+
+import py_logfanout
+
+# Global variables
+vg_lock = threading.Lock()
+vg_sessions = {}             # client id -> session dict
+vg_snapshot_provider = None  # Returns {'seq': ..., 'status': [...]} brought up to date
+vg_session_timeout = 60      # Seconds a long-poll session lives without a poll
+vg_max_status_events = 100   # Queued deltas before a session resyncs from a full snapshot
+vg_heartbeat = 15            # Seconds between SSE keep-alive comments
+vg_stats = {
+    'opened': 0,
+    'expired': 0,
+    'events': 0
+}
+
+def vf_set_snapshot_provider(callback):
+    """Set the function returning the full status snapshot"""
+    global vg_snapshot_provider
+    vg_snapshot_provider = callback
+
+def vf_configure(vf_settings):
+    """Apply stream settings from websocket_settings"""
+    global vg_session_timeout, vg_heartbeat
+    vg_session_timeout = vf_settings.get('stream_session_timeout', vg_session_timeout)
+    vg_heartbeat = vf_settings.get('stream_heartbeat_interval', vg_heartbeat)
+
+def vf_parse_topics(vf_topics):
+    """Split 'status,logs:<id>,...' into (wants status, script IDs, error)"""
+    vf_status = False
+    ag_script_ids = []
+
+    for vf_topic in (vf_topics or '').split(','):
+        vf_topic = vf_topic.strip()
+        if not vf_topic:
+            continue
+        if vf_topic == 'status':
+            vf_status = True
+        elif vf_topic.startswith('logs:') and len(vf_topic) > 5:
+            if vf_topic[5:] not in ag_script_ids:
+                ag_script_ids.append(vf_topic[5:])
+        else:
+            return False, [], f"Unknown topic: {vf_topic}"
+
+    if not vf_status and not ag_script_ids:
+        return False, [], 'topics is required'
+    return vf_status, ag_script_ids, None
+
+def vf_open_session(vf_topics, vf_level=None, vf_match=None, vf_streaming=False, vf_regex=None):
+    """Open a session for a topic list, returns (session, error)"""
+    vf_status, ag_script_ids, vf_error = vf_parse_topics(vf_topics)
+    if vf_error:
+        return None, vf_error
+
+    vf_expire_sessions()
+
+    vf_session = {
+        'id': uuid.uuid4().hex,
+        'status': vf_status,
+        'script_ids': ag_script_ids,
+        'streaming': vf_streaming,  # SSE sessions end with their connection, not by timeout
+        'events': collections.deque(),
+        'status_events': 0,
+        'resync': vf_status,        # Next batch starts with a full snapshot
+        'cond': threading.Condition(),
+        'last_seen': time.monotonic(),
+        'closed': False
+    }
+
+    with vg_lock:
+        vg_sessions[vf_session['id']] = vf_session
+        vg_stats['opened'] += 1
+
+    for vf_script_id in ag_script_ids:
+        vf_result = py_logfanout.vf_subscribe(
+            vf_session['id'], vf_script_id, vf_level, vf_match,
+            vf_deliver=lambda vf_event, vf_payload: vf_deliver(vf_session, vf_event, vf_payload),
+            vf_regex=vf_regex
+        )
+        if not vf_result['success']:
+            vf_close_session(vf_session['id'])
+            return None, vf_result['error']
+
+    return vf_session, None
+
+def vf_get_session(vf_client_id):
+    """Look up an open session by client ID"""
+    vf_expire_sessions()
+    with vg_lock:
+        return vg_sessions.get(vf_client_id)
+
+def vf_close_session(vf_client_id):
+    """Close a session and drop its log subscriptions"""
+    with vg_lock:
+        vf_session = vg_sessions.pop(vf_client_id, None)
+    if vf_session is None:
+        return
+
+    py_logfanout.vf_unsubscribe(vf_client_id)
+    with vf_session['cond']:
+        vf_session['closed'] = True
+        vf_session['cond'].notify_all()
+
+def vf_expire_sessions():
+    """Close long-poll sessions that stopped polling"""
+    vf_now = time.monotonic()
+    with vg_lock:
+        ag_expired = [
+            vf_client_id for vf_client_id, vf_session in vg_sessions.items()
+            if not vf_session['streaming'] and vf_now - vf_session['last_seen'] > vg_session_timeout
+        ]
+    for vf_client_id in ag_expired:
+        vf_close_session(vf_client_id)
+        vg_stats['expired'] += 1
+
+def vf_deliver(vf_session, vf_event, vf_payload):
+    """Queue an event for a session and wake its waiter"""
+    with vf_session['cond']:
+        if vf_event == 'status_delta':
+            if vf_session['resync']:
+                return  # The pending full snapshot already contains it
+            if vf_session['status_events'] >= vg_max_status_events:
+                # Nobody is reading: replace the queued deltas by one snapshot
+                vf_session['events'] = collections.deque(
+                    vf_item for vf_item in vf_session['events'] if vf_item[0] != 'status_delta'
+                )
+                vf_session['status_events'] = 0
+                vf_session['resync'] = True
+            else:
+                vf_session['status_events'] += 1
+                vf_session['events'].append((vf_event, vf_payload))
+        else:
+            vf_session['events'].append((vf_event, vf_payload))
+        vf_session['cond'].notify_all()
+
+def vf_on_status_delta(vf_delta):
+    """Feed a status delta to every session watching status"""
+    with vg_lock:
+        ag_sessions = [vf_session for vf_session in vg_sessions.values() if vf_session['status']]
+    for vf_session in ag_sessions:
+        vf_deliver(vf_session, 'status_delta', vf_delta)
+
+def vf_take_events(vf_session, vf_timeout):
+    """Wait up to vf_timeout seconds for queued events and take them all
+
+    Returns a list of (event, payload); empty on timeout or when closed.
+    """
+    vf_deadline = time.monotonic() + vf_timeout
+
+    with vf_session['cond']:
+        while not vf_session['events'] and not vf_session['resync'] and not vf_session['closed']:
+            vf_remaining = vf_deadline - time.monotonic()
+            if vf_remaining <= 0:
+                break
+            vf_session['cond'].wait(vf_remaining)
+
+        ag_events = list(vf_session['events'])
+        vf_session['events'].clear()
+        vf_session['status_events'] = 0
+        vf_resync = vf_session['resync']
+        vf_session['resync'] = False
+        vf_session['last_seen'] = time.monotonic()
+
+    # Snapshot after clearing the flag: later deltas are queued, earlier ones are in it
+    if vf_resync and vg_snapshot_provider is not None:
+        ag_events.insert(0, ('status_update', vg_snapshot_provider()))
+
+    for vf_event, vf_payload in ag_events:
+        if vf_event == 'log_update':
+            py_logfanout.vf_ack(vf_session['id'], vf_payload['script_id'], vf_payload['seq'])
+
+    vg_stats['events'] += len(ag_events)
+    return ag_events
+
+def vf_format_sse(vf_event, vf_payload):
+    """Encode one event in text/event-stream format"""
+    return f"event: {vf_event}\ndata: {json.dumps(vf_payload)}\n\n"
+
+def vf_stream(vf_session):
+    """Generate a session's SSE stream until the client goes away"""
+    try:
+        # Ask EventSource to reconnect quickly; a new connection gets a fresh session
+        yield f"retry: 2000\nevent: session\ndata: {json.dumps({'client': vf_session['id']})}\n\n"
+        while not vf_session['closed']:
+            ag_events = vf_take_events(vf_session, vg_heartbeat)
+            if not ag_events:
+                yield ": ping\n\n"  # Keeps proxies from closing the idle connection
+                continue
+            yield ''.join(vf_format_sse(vf_event, vf_payload) for vf_event, vf_payload in ag_events)
+    finally:
+        vf_close_session(vf_session['id'])
+
+def vf_get_stats():
+    """Get session counters"""
+    with vg_lock:
+        vf_streaming = sum(1 for vf_session in vg_sessions.values() if vf_session['streaming'])
+        vf_total = len(vg_sessions)
+    return {
+        'sse_sessions': vf_streaming,
+        'poll_sessions': vf_total - vf_streaming,
+        'opened': vg_stats['opened'],
+        'expired': vg_stats['expired'],
+        'events': vg_stats['events']
+    }
@@ -10,6 +10,13 @@ var vg_current_view = 'scripts';
 var vg_current_group = 'All';
 var vg_sort_column = 'name';
 var vg_sort_direction = 'asc'; // 'asc' or 'desc'
+var vg_log_first_line = 0; // Line number of the oldest loaded script log line
+var vg_log_loading_older = false;
+var vg_log_subscription = null; // Script whose live log lines the server sends us
+var vg_status_seq = null; // Sequence number of the status snapshot we hold
+var vg_event_source = null; // SSE stream used while the WebSocket is down
+var vg_stream_topics = null; // Topics of the open SSE stream
+var vg_stream_opening = false; // Stream token request in flight
 
 // Global arrays
 var ag_scripts = [];
@@ -32,6 +39,11 @@ window.addEventListener('DOMContentLoaded', function() {
     
     // Initialize view
     vf_switch_view('scripts');
+    
+    // Infinite scroll: load older script log lines near the top
+    document.getElementById('log-viewer').addEventListener('scroll', function() {
+        if (this.scrollTop < 50) vf_load_older_logs();
+    });
 });
 
 // View Switching
@@ -69,6 +81,7 @@ function vf_switch_view(viewName) {
     if (viewName === 'logs') {
         vf_update_log_file_list();
     }
+    vf_update_log_subscription();
 }
 
 // WebSocket functions
@@ -84,27 +97,36 @@ function vf_init_websocket() {
         
         vg_socket.on('connect', function() {
             vg_connected = true;
+            vf_close_event_stream();
             vf_update_connection_status(true, 'ws');
             vf_show_toast('已连接到服务器', 'success');
+            
+            // Subscriptions are per connection, restore after a reconnect
+            vg_log_subscription = null;
+            vf_update_log_subscription();
         });
 
         vg_socket.on('disconnect', function() {
             vg_connected = false;
+            vg_status_seq = null; // Resync from the snapshot sent on reconnect
             // Don't immediately show disconnected, wait for polling to fail or succeed
             // vf_update_connection_status(false); 
             vf_show_toast('已断开与服务器的连接', 'error');
         });
         
         vg_socket.on('status_update', function(data) {
+            vg_status_seq = data.seq;
             vf_handle_status_update(data.status);
         });
         
+        vg_socket.on('status_delta', function(data) {
+            vf_apply_status_delta(data);
+        });
+        
         vg_socket.on('log_update', function(data) {
-            if (vg_current_view === 'logs' && 
-                (data.script_id === vg_current_log_script || 
-                 (data.script_id === 'manager' && vg_current_log_script === 'manager'))) {
-                vf_append_log(data.message);
-            }
+            vf_handle_log_frame(data, vg_log_subscription);
+            // Acknowledge so the server keeps sending full frames
+            vg_socket.emit('log_ack', { script_id: data.script_id, seq: data.seq });
         });
         
     } catch (error) {
@@ -113,6 +135,112 @@ function vf_init_websocket() {
     }
 }
 
+function vf_handle_log_frame(data, scriptId) {
+    // One frame carries a batch of lines of the subscribed script
+    if (data.script_id !== scriptId) return;
+    if (data.dropped) {
+        vf_append_log('\x1b[33m... ' + data.dropped + ' lines skipped (client too slow) ...\x1b[0m');
+    }
+    vf_append_logs(data.lines);
+}
+
+function vf_get_stream_topics() {
+    // Status always, plus the log being viewed
+    var topics = 'status';
+    if (vg_current_view === 'logs' && vg_current_log_script) {
+        topics += ',logs:' + vg_current_log_script;
+    }
+    return topics;
+}
+
+function vf_open_event_stream() {
+    // Server-Sent Events carry the same status deltas and log frames as the WebSocket
+    var topics = vf_get_stream_topics();
+    // A stream the server refused (e.g. expired token) stays closed, open a new one
+    if (vg_event_source && vg_event_source.readyState !== EventSource.CLOSED && vg_stream_topics === topics) return;
+    if (vg_stream_opening) return;
+    vf_close_event_stream();
+    
+    // EventSource cannot send an Authorization header: connect with a short-lived token
+    vg_stream_opening = true;
+    fetch(vg_api_base + '/stream/token', { method: 'POST' })
+        .then(response => response.json())
+        .then(result => result.success ? result.data.token : null)
+        .catch(() => null)
+        .then(token => {
+            vg_stream_opening = false;
+            if (vg_connected || topics !== vf_get_stream_topics()) return;
+            vf_connect_event_stream(topics, token);
+        });
+}
+
+function vf_connect_event_stream(topics, token) {
+    vg_stream_topics = topics;
+    var url = vg_api_base + '/stream?topics=' + encodeURIComponent(topics);
+    if (token) {
+        url += '&token=' + encodeURIComponent(token);
+    }
+    vg_event_source = new EventSource(url);
+    var logScript = topics.indexOf(',logs:') >= 0 ? vg_current_log_script : null;
+    
+    vg_event_source.addEventListener('open', function() {
+        vf_update_connection_status(true, 'http');
+    });
+    vg_event_source.addEventListener('error', function() {
+        // EventSource reconnects by itself, the new session resends a snapshot
+        vg_status_seq = null;
+        vf_update_connection_status(false);
+    });
+    vg_event_source.addEventListener('status_update', function(event) {
+        var data = JSON.parse(event.data);
+        vg_status_seq = data.seq;
+        vf_handle_status_update(data.status);
+    });
+    vg_event_source.addEventListener('status_delta', function(event) {
+        vf_apply_status_delta(JSON.parse(event.data));
+    });
+    vg_event_source.addEventListener('log_update', function(event) {
+        vf_handle_log_frame(JSON.parse(event.data), logScript);
+    });
+}
+
+function vf_close_event_stream() {
+    if (vg_event_source) {
+        vg_event_source.close();
+        vg_event_source = null;
+        vg_stream_topics = null;
+    }
+}
+
+function vf_request_full_status() {
+    // Resync after a missed delta on whichever channel is in use
+    if (vg_socket && vg_connected) {
+        vg_socket.emit('request_status');
+    } else if (vg_event_source) {
+        vf_close_event_stream();
+        vg_status_seq = null;
+        vf_open_event_stream();
+    }
+}
+
+function vf_update_log_subscription() {
+    // Watch only the log being viewed
+    var wanted = vg_current_view === 'logs' ? vg_current_log_script : null;
+    if (vg_event_source && !vg_connected) {
+        vf_open_event_stream(); // Reopens only when the topics changed
+        return;
+    }
+    if (!vg_socket || !vg_connected || wanted === vg_log_subscription) return;
+    
+    if (vg_log_subscription) {
+        vg_socket.emit('unsubscribe_logs', { script_id: vg_log_subscription });
+    }
+    if (wanted) {
+        vg_socket.emit('subscribe_logs', { script_id: wanted });
+    }
+    vg_log_subscription = wanted;
+}
+
 function vf_update_connection_status(connected, type) {
     var indicator = document.getElementById('connection-status');
     var text = document.getElementById('connection-text');
@@ -169,7 +297,15 @@ function vf_fetch_status() {
 }
 
 function vf_start_polling() {
-    setInterval(vf_fetch_status, 2000);
+    // WebSocket clients get deltas pushed; without one use the SSE stream, plain polling as last resort
+    setInterval(function() {
+        if (vg_connected) return;
+        if (typeof EventSource !== 'undefined') {
+            vf_open_event_stream();
+        } else {
+            vf_fetch_status();
+        }
+    }, 2000);
 }
 
 function vf_handle_status_update(statusList) {
@@ -183,6 +319,39 @@ function vf_handle_status_update(statusList) {
     }
 }
 
+function vf_apply_status_delta(delta) {
+    // Before the first snapshot, or already contained in it: nothing to do
+    if (vg_status_seq === null || delta.seq <= vg_status_seq) return;
+    
+    // A missed delta means our copy is stale: ask for a full snapshot
+    if (delta.base !== vg_status_seq) {
+        vf_request_full_status();
+        return;
+    }
+    vg_status_seq = delta.seq;
+    
+    Object.keys(delta.changed).forEach(id => {
+        var script = vg_scripts_status[id];
+        if (!script) return;
+        Object.entries(delta.changed[id]).forEach(([key, value]) => {
+            if (value === null) delete script[key];
+            else script[key] = value;
+        });
+    });
+    Object.assign(vg_scripts_status, delta.added);
+    delta.removed.forEach(id => delete vg_scripts_status[id]);
+    
+    if (delta.order) {
+        var ordered = {};
+        delta.order.forEach(id => { if (vg_scripts_status[id]) ordered[id] = vg_scripts_status[id]; });
+        vg_scripts_status = ordered;
+    }
+    
+    if (vg_current_view === 'scripts') {
+        vf_render_scripts_table();
+    }
+}
+
 // Group Management
 function vf_render_group_tabs() {
     var groups = new Set(['All']);
@@ -304,6 +473,13 @@ function vf_create_script_row(script) {
     var statusClass = isRunning ? 'running' : 'stopped';
     var statusText = isRunning ? 'Running' : 'Stopped';
     
+    // Show pending auto-restart or crash-loop quarantine
+    if (!isRunning && script.restart_state === 'quarantined') {
+        statusText = 'Quarantined';
+    } else if (!isRunning && script.next_restart_eta != null) {
+        statusText = 'Restart in ' + Math.ceil(script.next_restart_eta) + 's';
+    }
+    
     var uptime = isRunning ? vf_calculate_uptime(script.start_time) : '-';
     var cpu = isRunning ? script.cpu_percent.toFixed(1) + '%' : '-';
     var memory = isRunning ? script.memory_mb.toFixed(1) + ' MB' : '-';
@@ -425,6 +601,7 @@ function vf_update_log_file_list() {
 function vf_select_log(scriptId) {
     vg_current_log_script = scriptId;
     vf_update_log_file_list();
+    vf_update_log_subscription();
     
     var name = scriptId === 'manager' ? '管理器日志' : (vg_scripts_status[scriptId]?.name || scriptId);
     document.getElementById('current-log-name').textContent = name;
@@ -448,12 +625,36 @@ function vf_refresh_logs() {
                 var htmlLogs = data.data.logs.map(line => vf_ansi_to_html(line)).join('');
                 viewer.innerHTML = htmlLogs;
                 viewer.scrollTop = viewer.scrollHeight;
+                vg_log_first_line = data.data.first_line || 0;
             } else {
                 viewer.textContent = '无法加载日志: ' + data.error;
             }
         });
 }
 
+function vf_load_older_logs() {
+    if (vg_current_log_script === 'manager' || vg_log_loading_older || vg_log_first_line <= 0) return;
+    
+    var viewer = document.getElementById('log-viewer');
+    var scriptId = vg_current_log_script;
+    vg_log_loading_older = true;
+    
+    fetch(vg_api_base + '/scripts/' + scriptId + '/logs?lines=200&before=' + vg_log_first_line)
+        .then(res => res.json())
+        .then(data => {
+            vg_log_loading_older = false;
+            if (!data.success || scriptId !== vg_current_log_script) return;
+            
+            // Prepend and keep the visible lines where they were
+            var previousHeight = viewer.scrollHeight;
+            var htmlLogs = data.data.logs.map(line => vf_ansi_to_html(line)).join('');
+            viewer.insertAdjacentHTML('afterbegin', htmlLogs);
+            viewer.scrollTop += viewer.scrollHeight - previousHeight;
+            vg_log_first_line = data.data.first_line;
+        })
+        .catch(() => { vg_log_loading_older = false; });
+}
+
 function vf_append_log(message) {
     var viewer = document.getElementById('log-viewer');
     // Check if scrolled to bottom
@@ -468,6 +669,21 @@ function vf_append_log(message) {
     }
 }
 
+function vf_append_logs(lines) {
+    if (!lines || !lines.length) return;
+    var viewer = document.getElementById('log-viewer');
+    var isScrolledToBottom = viewer.scrollHeight - viewer.clientHeight <= viewer.scrollTop + 1;
+    
+    // One DOM insert per batch
+    var span = document.createElement('span');
+    span.innerHTML = lines.map(line => vf_ansi_to_html(line)).join('');
+    viewer.appendChild(span);
+    
+    if (isScrolledToBottom) {
+        viewer.scrollTop = viewer.scrollHeight;
+    }
+}
+
 function vf_ansi_to_html(text) {
     if (!text) return '';
     
@@ -0,0 +1,240 @@
+"""Resource limit engine for Python Manager
+
+Each script started by py_process gets its own cgroup v2 group with
+memory.max, cpu.max and pids.max taken from its config. The manager
+moves the child into its group right after Popen by writing the PID to
+cgroup.procs (vf_attach), so nothing but setrlimit() runs between fork
+and exec. Where cgroup v2 is not writable the engine falls back to
+setrlimit() in the child before exec, which can only cap memory (the
+data segment, RLIMIT_DATA); CPU and pids limits are then reported as not
+enforced. Scripts without a limit key run without that limit.
+
+Config keys per script:
+    max_memory_mb      memory limit for the whole process tree
+    cpu_quota_percent  CPU quota, 100 = one full core (cgroup only)
+    max_pids           max processes/threads in the tree (cgroup only)
+"""
+
+import os
+import signal
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Not available on Windows
+
+# Global variables
+vg_mode = 'off'                  # 'cgroup', 'rlimit' or 'off' once configured
+vg_cgroup_fs = '/sys/fs/cgroup'
+vg_cgroup_root = None            # Parent group holding one child per script
+vg_cpu_period = 100000           # cpu.max period in microseconds
+vg_oom_baseline = {}             # script_id -> oom_kill count at start
+vg_attach_paths = {}             # script_id -> cgroup.procs of its prepared group
+
+def vf_configure(vf_mode='auto', vf_cgroup_name='py_manager'):
+    """Pick the enforcement backend, returns the mode in use"""
+    global vg_mode, vg_cgroup_root
+
+    vg_mode = 'off'
+    if vf_mode == 'off':
+        return vg_mode
+
+    if vf_mode in ('auto', 'cgroup'):
+        vf_root = os.path.join(vg_cgroup_fs, vf_cgroup_name)
+        if vf_init_cgroup_root(vf_root):
+            vg_cgroup_root = vf_root
+            vg_mode = 'cgroup'
+            return vg_mode
+        if vf_mode == 'cgroup':
+            print("cgroup v2 not writable, falling back to rlimit")
+
+    if resource is not None:
+        vg_mode = 'rlimit'
+
+    return vg_mode
+
+def vf_init_cgroup_root(vf_root):
+    """Create the parent group and enable controllers for its children"""
+    if not os.path.exists(os.path.join(vg_cgroup_fs, 'cgroup.controllers')):
+        return False  # Not a cgroup v2 unified hierarchy
+
+    try:
+        os.makedirs(vf_root, exist_ok=True)
+        with open(os.path.join(vf_root, 'cgroup.controllers')) as vf_file:
+            ag_available = vf_file.read().split()
+
+        ag_wanted = [vf_name for vf_name in ('memory', 'cpu', 'pids') if vf_name in ag_available]
+        vf_write_cgroup_file(vf_root, 'cgroup.subtree_control',
+                             ' '.join(f"+{vf_name}" for vf_name in ag_wanted))
+        return True
+    except OSError:
+        return False
+
+def vf_write_cgroup_file(vf_group, vf_name, vf_value):
+    """Write a value into a cgroup interface file"""
+    with open(os.path.join(vf_group, vf_name), 'w') as vf_file:
+        vf_file.write(vf_value)
+
+def vf_get_group_path(vf_script_id):
+    """Path of a script's cgroup"""
+    return os.path.join(vg_cgroup_root, vf_script_id)
+
+def vf_read_oom_kills(vf_group):
+    """Read the oom_kill counter from memory.events"""
+    try:
+        with open(os.path.join(vf_group, 'memory.events')) as vf_file:
+            for vf_line in vf_file:
+                vf_key, vf_value = vf_line.split()
+                if vf_key == 'oom_kill':
+                    return int(vf_value)
+    except (OSError, ValueError):
+        pass
+    return 0
+
+def vf_prepare(vf_script_id, vf_script_config):
+    """Set up limits for a script, returns a preexec_fn for Popen or None
+
+    Only limits present in the script's config are enforced, the others
+    are reset to unlimited in a reused group. The preexec_fn only calls
+    setrlimit(); call vf_attach() with the new PID after Popen.
+    """
+    vf_memory_mb = vf_script_config.get('max_memory_mb')
+    vf_cpu_percent = vf_script_config.get('cpu_quota_percent')
+    vf_max_pids = vf_script_config.get('max_pids')
+
+    vg_attach_paths.pop(vf_script_id, None)
+
+    if vg_mode == 'cgroup':
+        vf_group = vf_get_group_path(vf_script_id)
+        ag_missing = []
+        try:
+            os.makedirs(vf_group, exist_ok=True)
+            if not vf_set_cgroup_limit(vf_group, 'memory.max', int(vf_memory_mb * 1024 * 1024) if vf_memory_mb else None):
+                ag_missing.append('memory.max')
+            vf_set_cgroup_limit(vf_group, 'memory.swap.max', 0 if vf_memory_mb else None)  # Optional: swap accounting may be off
+            vf_cpu_max = f"{int(vg_cpu_period * vf_cpu_percent / 100)} {vg_cpu_period}" if vf_cpu_percent else None
+            if not vf_set_cgroup_limit(vf_group, 'cpu.max', vf_cpu_max):
+                ag_missing.append('cpu.max')
+            if not vf_set_cgroup_limit(vf_group, 'pids.max', int(vf_max_pids) if vf_max_pids else None):
+                ag_missing.append('pids.max')
+        except OSError as vf_error:
+            # Never run unconfined because the cgroup could not be set up
+            print(f"Failed to set cgroup limits for {vf_script_id}: {vf_error}, falling back to rlimit")
+            vf_warn_unenforced(vf_script_id, vf_script_config)
+            return vf_rlimit_preexec(vf_memory_mb)
+
+        if ag_missing:
+            print(f"Controllers for {', '.join(ag_missing)} not enabled, not enforced for {vf_script_id}")
+
+        vg_oom_baseline[vf_script_id] = vf_read_oom_kills(vf_group)
+        vg_attach_paths[vf_script_id] = os.path.join(vf_group, 'cgroup.procs')
+        return vf_rlimit_preexec(vf_memory_mb) if 'memory.max' in ag_missing else None
+
+    if vg_mode == 'rlimit':
+        vf_warn_unenforced(vf_script_id, vf_script_config)
+        return vf_rlimit_preexec(vf_memory_mb)
+
+    return None
+
+def vf_attach(vf_script_id, vf_pid):
+    """Move a just started child into the group vf_prepare set up
+
+    Done from the parent: writing cgroup.procs from a preexec_fn means
+    file I/O between fork and exec, which is not safe in a threaded
+    process. The child runs unconfined only until this returns. Returns
+    False if the move failed; the caller must not let it run unconfined.
+    """
+    vf_procs_path = vg_attach_paths.pop(vf_script_id, None)
+    if vf_procs_path is None:
+        return True  # No cgroup for this script
+    try:
+        with open(vf_procs_path, 'w') as vf_file:
+            vf_file.write(str(vf_pid))
+        return True
+    except OSError as vf_error:
+        print(f"Failed to move {vf_script_id} into its cgroup: {vf_error}")
+        return False
+
+def vf_warn_unenforced(vf_script_id, vf_script_config):
+    """Report limits that setrlimit() cannot express
+
+    RLIMIT_CPU caps total CPU seconds rather than a share and RLIMIT_NPROC
+    counts every process of the user, so neither stands in for a quota.
+    """
+    ag_unenforced = [vf_key for vf_key in ('cpu_quota_percent', 'max_pids') if vf_script_config.get(vf_key)]
+    if ag_unenforced:
+        print(f"Limits {', '.join(ag_unenforced)} need cgroup v2, not enforced for {vf_script_id}")
+
+def vf_rlimit_preexec(vf_memory_mb):
+    """preexec_fn capping a child's data segment, None if there is nothing to cap
+
+    RLIMIT_DATA covers heap and private writable mappings; unlike
+    RLIMIT_AS it does not count reserved address space, which thread
+    stacks, numpy, torch and JITs reserve far beyond what they use.
+    """
+    if resource is None or not vf_memory_mb:
+        return None
+    vf_limit = getattr(resource, 'RLIMIT_DATA', resource.RLIMIT_AS)
+    vf_bytes = int(vf_memory_mb * 1024 * 1024)
+
+    def vf_apply_rlimits():
+        # Runs in the child between fork and exec
+        resource.setrlimit(vf_limit, (vf_bytes, vf_bytes))
+
+    return vf_apply_rlimits
+
+def vf_set_cgroup_limit(vf_group, vf_name, vf_value):
+    """Write a limit, None means unlimited
+
+    Returns False if the limit is wanted but its controller is not
+    enabled on this host.
+    """
+    if not os.path.exists(os.path.join(vf_group, vf_name)):
+        return vf_value is None
+    vf_write_cgroup_file(vf_group, vf_name, 'max' if vf_value is None else str(vf_value))
+    return True
+
+def vf_exit_reason(vf_script_id, vf_returncode):
+    """Classify why a script exited: 'oom_killed', 'signal' or 'exited'"""
+    if vg_mode == 'cgroup' and vf_script_id in vg_oom_baseline:
+        vf_kills = vf_read_oom_kills(vf_get_group_path(vf_script_id))
+        if vf_kills > vg_oom_baseline[vf_script_id]:
+            return 'oom_killed'
+
+    if vf_returncode is not None and vf_returncode < 0:
+        return 'signal'
+    return 'exited'
+
+def vf_adopt(vf_script_id):
+    """Track the cgroup of a script started by an earlier manager"""
+    if vg_mode == 'cgroup' and os.path.isdir(vf_get_group_path(vf_script_id)):
+        vg_oom_baseline[vf_script_id] = vf_read_oom_kills(vf_get_group_path(vf_script_id))
+
+def vf_release(vf_script_id):
+    """Kill leftovers in a script's cgroup and remove it"""
+    vg_oom_baseline.pop(vf_script_id, None)
+    vg_attach_paths.pop(vf_script_id, None)
+    if vg_mode != 'cgroup':
+        return
+
+    vf_group = vf_get_group_path(vf_script_id)
+    if not os.path.isdir(vf_group):
+        return
+
+    try:
+        if os.path.exists(os.path.join(vf_group, 'cgroup.kill')):
+            vf_write_cgroup_file(vf_group, 'cgroup.kill', '1')
+        else:
+            with open(os.path.join(vf_group, 'cgroup.procs')) as vf_file:
+                for vf_pid in vf_file.read().split():
+                    os.kill(int(vf_pid), signal.SIGKILL)
+        os.rmdir(vf_group)
+    except OSError:
+        pass  # Processes still exiting, the group is reused on next start
+
+def vf_get_info():
+    """Get the active enforcement backend"""
+    return {
+        'mode': vg_mode,
+        'cgroup_root': vg_cgroup_root if vg_mode == 'cgroup' else None
+    }
@@ -0,0 +1,339 @@
+"""Live log fan-out to subscribed WebSocket clients
+
+Clients subscribe to the scripts they are viewing. Lines are not sent as
+they arrive: publishing only appends to a per-script buffer, and a
+fan-out thread turns each script's buffer into one log_update frame per
+batch window (or sooner once vg_batch_lines are waiting).
+
+Subscribers without filters share one Socket.IO room per script, so a
+frame is encoded and sent once per room. Subscribers with a level or
+text filter are matched here and get frames addressed to their session.
+Text filters are case-insensitive substrings ("|" separates
+alternatives), never regexes: filters run on the shared fan-out thread
+and one pathological pattern would stall every subscriber.
+
+Subscribers that are not Socket.IO sessions (SSE streams, long-poll
+clients) pass a deliver callback and always get their own frames
+through it.
+
+Clients acknowledge frames by sequence number. A client with too many
+unacknowledged frames is skipped from room sends and its lines go to a
+bounded queue that drops the oldest; once it catches up it gets the
+queued lines plus a count of what was dropped. Neither a slow tab nor a
+burst of output ever blocks log capture.
+"""
+
+import collections
+import re
+import threading
+import time
+
+# Global variables
+vg_emitter = None          # Called as emitter(event, payload, to, skip_sids) to send a message
+vg_lock = threading.Lock()
+vg_wakeup = threading.Event()
+vg_thread = None
+vg_batch_interval = 0.1    # Seconds lines are coalesced before a frame is sent
+vg_batch_lines = 500       # Send early once a script has this many lines waiting
+vg_buffer_lines = 5000     # Lines kept per script between frames (oldest dropped)
+vg_client_queue_lines = 1000  # Lines queued for a slow client per script (oldest dropped)
+vg_max_unacked = 20        # Frames in flight before a client counts as slow
+vg_ack_timeout = 30        # Seconds after which an unacknowledged frame counts as lost
+vg_seq = 0                 # Sequence number of the last frame
+vg_subscribers = {}        # script_id -> {sid: subscription dict}
+vg_client_scripts = {}     # sid -> set of subscribed script IDs
+vg_pending = {}            # script_id -> lines waiting for the next frame
+vg_pending_dropped = {}    # script_id -> lines dropped from the buffer since the last frame
+vg_max_match_length = 200
+vg_level_re = re.compile(r'\b(DEBUG|INFO|WARN|WARNING|ERROR|CRITICAL|FATAL)\b')
+vg_stats = {
+    'published': 0,
+    'skipped': 0,
+    'frames': 0,
+    'dropped': 0
+}
+
+# Global arrays
+ag_levels = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
+
+def vf_set_emitter(callback):
+    """Set the function used to send messages"""
+    global vg_emitter
+    vg_emitter = callback
+
+def vf_configure(vf_settings):
+    """Apply batching settings from websocket_settings"""
+    global vg_batch_interval, vg_batch_lines, vg_client_queue_lines, vg_max_unacked
+    vg_batch_interval = vf_settings.get('log_batch_interval', vg_batch_interval)
+    vg_batch_lines = vf_settings.get('log_batch_lines', vg_batch_lines)
+    vg_client_queue_lines = vf_settings.get('log_client_queue_lines', vg_client_queue_lines)
+    vg_max_unacked = vf_settings.get('log_max_unacked_frames', vg_max_unacked)
+
+def vf_get_room(vf_script_id):
+    """Socket.IO room of a script's unfiltered subscribers"""
+    return f"logs:{vf_script_id}"
+
+def vf_level_rank(vf_level):
+    """Position of a level name, aliases folded"""
+    vf_level = {'WARN': 'WARNING', 'FATAL': 'CRITICAL'}.get(vf_level, vf_level)
+    return ag_levels.index(vf_level) if vf_level in ag_levels else None
+
+def vf_build_filter(vf_level=None, vf_match=None, vf_regex=None):
+    """Validate filter options, returns (filter or None, error)"""
+    vf_filter = {}
+
+    if vf_regex:
+        return None, 'Regex filters are not supported, use match (substrings separated by |)'
+
+    if vf_level:
+        vf_rank = vf_level_rank(str(vf_level).upper())
+        if vf_rank is None:
+            return None, f"Unknown level: {vf_level}"
+        vf_filter['min_rank'] = vf_rank
+
+    if vf_match:
+        if len(vf_match) > vg_max_match_length:
+            return None, 'Match filter too long'
+        ag_terms = tuple(vf_term for vf_term in str(vf_match).lower().split('|') if vf_term)
+        if ag_terms:
+            vf_filter['terms'] = ag_terms
+
+    return vf_filter or None, None
+
+def vf_subscribe(vf_sid, vf_script_id, vf_level=None, vf_match=None, vf_deliver=None, vf_regex=None):
+    """Register a client for a script's lines
+
+    Returns the room to join when the subscription has no filter. With
+    vf_deliver frames are passed to vf_deliver(event, payload) instead.
+    vf_regex is only accepted to reject it with a clear error.
+    """
+    vf_filter, vf_error = vf_build_filter(vf_level, vf_match, vf_regex)
+    if vf_error:
+        return {"success": False, "error": vf_error}
+
+    with vg_lock:
+        vf_remove_locked(vf_sid, vf_script_id)
+        vg_subscribers.setdefault(vf_script_id, {})[vf_sid] = {
+            'filter': vf_filter,
+            'deliver': vf_deliver,
+            'unacked': collections.deque(),  # (seq, sent at) of frames not acknowledged yet
+            'queue': collections.deque(maxlen=vg_client_queue_lines),
+            'dropped': 0
+        }
+        vg_client_scripts.setdefault(vf_sid, set()).add(vf_script_id)
+
+    vf_ensure_thread()
+    vf_in_room = vf_filter is None and vf_deliver is None
+    return {"success": True, "room": vf_get_room(vf_script_id) if vf_in_room else None}
+
+def vf_remove_locked(vf_sid, vf_script_id):
+    """Drop one subscription (caller holds vg_lock), returns the room left if any"""
+    vf_subs = vg_subscribers.get(vf_script_id)
+    if not vf_subs or vf_sid not in vf_subs:
+        return None
+
+    vf_sub = vf_subs.pop(vf_sid)
+    if not vf_subs:
+        del vg_subscribers[vf_script_id]
+        vg_pending.pop(vf_script_id, None)
+        vg_pending_dropped.pop(vf_script_id, None)
+
+    vf_scripts = vg_client_scripts.get(vf_sid)
+    if vf_scripts is not None:
+        vf_scripts.discard(vf_script_id)
+        if not vf_scripts:
+            del vg_client_scripts[vf_sid]
+
+    return vf_get_room(vf_script_id) if vf_sub['filter'] is None and vf_sub['deliver'] is None else None
+
+def vf_unsubscribe(vf_sid, vf_script_id=None):
+    """Remove one or all subscriptions of a client, returns rooms to leave"""
+    with vg_lock:
+        if vf_script_id is not None:
+            ag_script_ids = [vf_script_id]
+        else:
+            ag_script_ids = list(vg_client_scripts.get(vf_sid, ()))
+
+        ag_rooms = []
+        for vf_id in ag_script_ids:
+            vf_room = vf_remove_locked(vf_sid, vf_id)
+            if vf_room:
+                ag_rooms.append(vf_room)
+        return ag_rooms
+
+def vf_get_subscriptions(vf_sid):
+    """Script IDs a client is subscribed to"""
+    with vg_lock:
+        return sorted(vg_client_scripts.get(vf_sid, ()))
+
+def vf_ack(vf_sid, vf_script_id, vf_seq):
+    """Client processed all frames of a script up to vf_seq"""
+    with vg_lock:
+        vf_sub = vg_subscribers.get(vf_script_id, {}).get(vf_sid)
+        if vf_sub is None:
+            return
+        while vf_sub['unacked'] and vf_sub['unacked'][0][0] <= vf_seq:
+            vf_sub['unacked'].popleft()
+
+    # A client that caught up may have queued lines waiting
+    if vf_sub['queue'] or vf_sub['dropped']:
+        vg_wakeup.set()
+
+def vf_matches(vf_filter, vf_line):
+    """Check a line against a subscriber's filter"""
+    if 'min_rank' in vf_filter:
+        vf_found = vg_level_re.search(vf_line)
+        # Lines without a level are treated as INFO
+        vf_rank = vf_level_rank(vf_found.group(1)) if vf_found else 1
+        if vf_rank < vf_filter['min_rank']:
+            return False
+
+    if 'terms' in vf_filter:
+        vf_lowered = vf_line.lower()
+        if not any(vf_term in vf_lowered for vf_term in vf_filter['terms']):
+            return False
+
+    return True
+
+def vf_publish(vf_script_id, vf_line):
+    """Queue a live line for the clients watching its script (never blocks on clients)"""
+    vg_stats['published'] += 1
+
+    if vf_script_id not in vg_subscribers:
+        vg_stats['skipped'] += 1
+        return
+
+    with vg_lock:
+        ag_lines = vg_pending.setdefault(vf_script_id, [])
+        ag_lines.append(vf_line)
+        if len(ag_lines) > vg_buffer_lines:
+            # Nobody can read this fast: drop the oldest half-window at once
+            vf_cut = len(ag_lines) - vg_buffer_lines // 2
+            del ag_lines[:vf_cut]
+            vg_pending_dropped[vf_script_id] = vg_pending_dropped.get(vf_script_id, 0) + vf_cut
+            vg_stats['dropped'] += vf_cut
+        vf_full = len(ag_lines) >= vg_batch_lines
+
+    if vf_full:
+        vg_wakeup.set()
+
+def vf_ensure_thread():
+    """Start the fan-out thread on first subscription"""
+    global vg_thread
+    with vg_lock:
+        if vg_thread is None:
+            vg_thread = threading.Thread(target=vf_fanout_loop, name='py-log-fanout', daemon=True)
+            vg_thread.start()
+
+def vf_fanout_loop():
+    """Turn buffered lines into frames once per batch window"""
+    while True:
+        vg_wakeup.wait(vg_batch_interval)
+        vg_wakeup.clear()
+        try:
+            vf_send_frames()
+        except Exception as vf_error:
+            print(f"Log fan-out error: {vf_error}")
+        time.sleep(0.01)  # Coalesce lines arriving right after an early wake-up
+
+def vf_next_seq():
+    """Next frame sequence number (caller holds vg_lock)"""
+    global vg_seq
+    vg_seq += 1
+    return vg_seq
+
+def vf_enqueue(vf_sub, ag_lines, vf_dropped):
+    """Hold lines for a slow client, counting what falls off the front"""
+    vf_overflow = len(vf_sub['queue']) + len(ag_lines) - vg_client_queue_lines
+    if vf_overflow > 0:
+        vf_sub['dropped'] += vf_overflow
+        vg_stats['dropped'] += vf_overflow
+    vf_sub['queue'].extend(ag_lines)
+    vf_sub['dropped'] += vf_dropped
+
+def vf_send_frames():
+    """Build this window's frames and hand them to the emitter"""
+    ag_frames = []  # (payload, to, skip_sids, deliver)
+    vf_now = time.monotonic()
+
+    with vg_lock:
+        vf_pending = {vf_id: vg_pending.pop(vf_id) for vf_id in list(vg_pending)}
+        vf_pending_dropped = {vf_id: vg_pending_dropped.pop(vf_id) for vf_id in list(vg_pending_dropped)}
+
+        for vf_script_id, vf_subs in vg_subscribers.items():
+            ag_lines = vf_pending.get(vf_script_id, [])
+            vf_dropped = vf_pending_dropped.get(vf_script_id, 0)
+            ag_room_sids = []
+            ag_skip_sids = []
+
+            for vf_sid, vf_sub in vf_subs.items():
+                # Acks are cumulative, but a lost frame must not stall a client forever
+                while vf_sub['unacked'] and vf_now - vf_sub['unacked'][0][1] > vg_ack_timeout:
+                    vf_sub['unacked'].popleft()
+
+                vf_healthy = len(vf_sub['unacked']) < vg_max_unacked
+                vf_lines = ag_lines
+                if vf_sub['filter'] is not None:
+                    vf_lines = [vf_line for vf_line in ag_lines if vf_matches(vf_sub['filter'], vf_line)]
+
+                vf_in_room = vf_sub['filter'] is None and vf_sub['deliver'] is None
+                if vf_healthy and vf_in_room and not vf_sub['queue'] and not vf_sub['dropped']:
+                    ag_room_sids.append(vf_sid)
+                    continue
+
+                if vf_in_room:
+                    ag_skip_sids.append(vf_sid)
+
+                if not vf_healthy:
+                    vf_enqueue(vf_sub, vf_lines, vf_dropped)
+                    continue
+
+                # Healthy client with a backlog or a filter: send it its own frame
+                ag_direct = list(vf_sub['queue']) + vf_lines
+                vf_direct_dropped = vf_sub['dropped'] + vf_dropped
+                vf_sub['queue'].clear()
+                vf_sub['dropped'] = 0
+                if ag_direct or vf_direct_dropped:
+                    vf_seq = vf_next_seq()
+                    vf_sub['unacked'].append((vf_seq, vf_now))
+                    ag_frames.append((
+                        {'script_id': vf_script_id, 'seq': vf_seq, 'lines': ag_direct, 'dropped': vf_direct_dropped},
+                        vf_sid, None, vf_sub['deliver']
+                    ))
+
+            if ag_room_sids and (ag_lines or vf_dropped):
+                vf_seq = vf_next_seq()
+                for vf_sid in ag_room_sids:
+                    vf_subs[vf_sid]['unacked'].append((vf_seq, vf_now))
+                ag_frames.append((
+                    {'script_id': vf_script_id, 'seq': vf_seq, 'lines': ag_lines, 'dropped': vf_dropped},
+                    vf_get_room(vf_script_id), ag_skip_sids or None, None
+                ))
+
+    for vf_payload, vf_to, ag_skip, vf_deliver in ag_frames:
+        if vf_deliver is not None:
+            vf_deliver('log_update', vf_payload)
+        elif vg_emitter is not None:
+            vg_emitter('log_update', vf_payload, vf_to, ag_skip)
+        else:
+            continue
+        vg_stats['frames'] += 1
+
+def vf_get_stats():
+    """Get subscription and delivery counters"""
+    with vg_lock:
+        vf_clients = len(vg_client_scripts)
+        vf_watched = len(vg_subscribers)
+        vf_slow = sum(
+            1 for vf_subs in vg_subscribers.values() for vf_sub in vf_subs.values()
+            if len(vf_sub['unacked']) >= vg_max_unacked
+        )
+    return {
+        'clients': vf_clients,
+        'watched_scripts': vf_watched,
+        'slow_subscriptions': vf_slow,
+        'published': vg_stats['published'],
+        'skipped': vg_stats['skipped'],
+        'frames': vg_stats['frames'],
+        'dropped': vg_stats['dropped']
+    }
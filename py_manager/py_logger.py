@@ -1,13 +1,24 @@
 import os
 import json
 import datetime
+import queue
+import atexit
+import threading
 from pathlib import Path
 
+import py_logindex
+import py_logrotate
+
 # Global variables
 vg_log_dir = os.path.join(os.path.dirname(__file__), 'logs')
 vg_max_log_size = 10 * 1024 * 1024  # 10MB
 vg_log_retention_days = 7
 vg_log_callback = None
+vg_log_queue = queue.Queue(maxsize=10000)  # Pending manager log entries
+vg_writer_thread = None
+vg_writer_lock = threading.Lock()
+vg_batch_size = 512  # Max entries written per batch
+vg_dropped_entries = 0  # Entries lost because the queue was full
 
 def vf_set_log_callback(callback):
     """Set callback for log updates"""
@@ -26,10 +37,30 @@ def vf_ensure_log_dir():
     return vf_date_dir
 
 def vf_write_manager_log(vf_level, vf_message, vf_script_id=None):
-    """Write to manager log file"""
-    vf_ensure_log_dir()
+    """Queue an entry for the manager log writer"""
+    global vg_dropped_entries
+    
+    if vg_writer_thread is None:
+        vf_start_log_writer()
     
     vf_timestamp = datetime.datetime.now().isoformat()
+    
+    try:
+        vg_log_queue.put_nowait((vf_timestamp, vf_level, vf_message, vf_script_id))
+    except queue.Full:
+        vg_dropped_entries += 1
+
+def vf_start_log_writer():
+    """Start the manager log writer thread (idempotent)"""
+    global vg_writer_thread
+    
+    with vg_writer_lock:
+        if vg_writer_thread is None:
+            vg_writer_thread = threading.Thread(target=vf_log_writer_loop, name='py-manager-log', daemon=True)
+            vg_writer_thread.start()
+
+def vf_format_entry(vf_timestamp, vf_level, vf_message, vf_script_id):
+    """Build the JSON line and display message for an entry"""
     vf_log_entry = {
         'timestamp': vf_timestamp,
         'level': vf_level,
@@ -39,26 +70,89 @@ def vf_write_manager_log(vf_level, vf_message, vf_script_id=None):
     if vf_script_id:
         vf_log_entry['script_id'] = vf_script_id
     
-    vf_log_file = os.path.join(vg_log_dir, 'manager.log')
+    # Format for display: [TIMESTAMP] [LEVEL] Message
+    vf_display_msg = f"[{vf_timestamp}] [{vf_level}] {vf_message}"
+    if vf_script_id:
+        vf_display_msg += f" (Script: {vf_script_id})"
     
-    vf_log_line = json.dumps(vf_log_entry) + '\n'
+    return json.dumps(vf_log_entry) + '\n', vf_display_msg + '\n'
+
+def vf_log_writer_loop():
+    """Drain the queue in batches into an open manager.log handle"""
+    vf_log_path = os.path.join(vg_log_dir, 'manager.log')
+    vf_ensure_log_dir()
+    vf_file = open(vf_log_path, 'a')
+    vf_size = os.path.getsize(vf_log_path)
     
-    with open(vf_log_file, 'a') as vf_file:
-        vf_file.write(vf_log_line)
+    while True:
+        # Block for the first entry, then take whatever else is queued
+        ag_batch = [vg_log_queue.get()]
+        while len(ag_batch) < vg_batch_size:
+            try:
+                ag_batch.append(vg_log_queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        ag_lines = []
+        ag_flush_events = []
+        for vf_item in ag_batch:
+            if isinstance(vf_item, threading.Event):
+                ag_flush_events.append(vf_item)
+                continue
+            
+            vf_line, vf_display_msg = vf_format_entry(*vf_item)
+            ag_lines.append(vf_line)
+            
+            # Emit log update if callback is set
+            if vg_log_callback:
+                try:
+                    vg_log_callback('manager', vf_display_msg)
+                except Exception:
+                    pass
         
-    # Emit log update if callback is set
-    if vg_log_callback:
         try:
-            # Format for display: [TIMESTAMP] [LEVEL] Message
-            vf_display_msg = f"[{vf_timestamp}] [{vf_level}] {vf_message}"
-            if vf_script_id:
-                vf_display_msg += f" (Script: {vf_script_id})"
-            vg_log_callback('manager', vf_display_msg + '\n')
-        except Exception:
-            pass
+            if ag_lines:
+                vf_data = ''.join(ag_lines)
+                vf_file.write(vf_data)
+                vf_file.flush()
+                vf_size += len(vf_data)
+            
+            # Byte counter instead of a stat per entry
+            if vf_size > vg_max_log_size:
+                vf_file.close()
+                vf_rotate_log_if_needed(vf_log_path)
+                vf_ensure_log_dir()
+                vf_file = open(vf_log_path, 'a')
+                vf_size = os.path.getsize(vf_log_path)
+        except Exception as vf_error:
+            print(f"Manager log writer error: {vf_error}")
+        
+        for vf_event in ag_flush_events:
+            vf_event.set()
+        
+        for _ in ag_batch:
+            vg_log_queue.task_done()
+
+def vf_flush_manager_log(vf_timeout=5):
+    """Wait until everything queued so far is on disk (shutdown hook)"""
+    if vg_writer_thread is None:
+        return True
     
-    # Check if rotation needed
-    vf_rotate_log_if_needed(vf_log_file)
+    vf_event = threading.Event()
+    try:
+        vg_log_queue.put(vf_event, timeout=vf_timeout)
+    except queue.Full:
+        return False
+    return vf_event.wait(vf_timeout)
+
+def vf_get_writer_stats():
+    """Get manager log writer queue depth and drop count"""
+    return {
+        'queued': vg_log_queue.qsize(),
+        'dropped': vg_dropped_entries
+    }
+
+atexit.register(vf_flush_manager_log)
 
 def vf_rotate_log_if_needed(vf_log_path):
     """Rotate log file if it exceeds size limit"""
@@ -68,7 +162,7 @@ def vf_rotate_log_if_needed(vf_log_path):
     vf_size = os.path.getsize(vf_log_path)
     
     if vf_size > vg_max_log_size:
-        vf_timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        vf_timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')
         vf_rotated_name = f"{vf_log_path}.{vf_timestamp}"
         os.rename(vf_log_path, vf_rotated_name)
         
@@ -104,6 +198,12 @@ def vf_read_recent_logs(vf_script_id=None, vf_lines=100):
         vf_log_path = os.path.join(vg_log_dir, f"{vf_script_id}.log")
         if os.path.exists(vf_log_path):
             ag_logs = vf_read_last_lines(vf_log_path, vf_lines)
+        
+        # Continue into rotated segments, newest first
+        for vf_segment in reversed(py_logrotate.vf_list_segments(vf_log_path)):
+            if len(ag_logs) >= vf_lines:
+                break
+            ag_logs = py_logrotate.vf_read_segment_tail(vf_segment, vf_lines - len(ag_logs)) + ag_logs
     else:
         # Read manager log
         vf_log_path = os.path.join(vg_log_dir, 'manager.log')
@@ -112,26 +212,24 @@ def vf_read_recent_logs(vf_script_id=None, vf_lines=100):
     
     return ag_logs
 
+def vf_get_log_version(vf_script_id=None):
+    """Inode, size and mtime of a script's (or the manager's) live log, None if missing"""
+    vf_name = f"{vf_script_id}.log" if vf_script_id else 'manager.log'
+    try:
+        vf_stat = os.stat(os.path.join(vg_log_dir, vf_name))
+    except OSError:
+        return None
+    return (vf_stat.st_ino, vf_stat.st_size, vf_stat.st_mtime_ns)
+
 def vf_read_last_lines(vf_file_path, vf_num_lines):
     """Read last N lines from a file efficiently"""
-    ag_lines = []
-    
-    with open(vf_file_path, 'rb') as vf_file:
-        # Start from end of file
-        vf_file.seek(0, 2)
-        vf_file_size = vf_file.tell()
-        
-        vf_block_size = 1024
-        vf_blocks = []
-        
-        while len(ag_lines) < vf_num_lines and vf_file_size > 0:
-            vf_read_size = min(vf_block_size, vf_file_size)
-            vf_file_size -= vf_read_size
-            vf_file.seek(vf_file_size)
-            
-            vf_block = vf_file.read(vf_read_size)
-            vf_blocks.insert(0, vf_block)
-            
-            ag_lines = b''.join(vf_blocks).decode('utf-8', errors='ignore').splitlines()
+    return py_logindex.vf_read_range(vf_file_path, vf_count=vf_num_lines)['lines']
+
+def vf_read_log_page(vf_script_id, vf_lines=100, vf_from_line=None, vf_before_line=None):
+    """Read a page of a script's live log by line number (for scrolling views)"""
+    vf_log_path = os.path.join(vg_log_dir, f"{vf_script_id}.log")
+    vf_page = py_logindex.vf_read_range(vf_log_path, vf_from_line, vf_before_line, vf_lines)
     
-    return ag_lines[-vf_num_lines:]
\ No newline at end of file
+    # Lines before line 0 live in rotated segments, see vf_read_recent_logs
+    vf_page['has_older'] = vf_page['first_line'] > 0 or bool(py_logrotate.vf_list_segments(vf_log_path))
+    return vf_page
@@ -0,0 +1,247 @@
+"""Sparse line-offset index for log files
+
+Every log file gets a list of checkpoints (line number, byte offset),
+one roughly every vg_stride bytes, always at a line start. py_logpipe
+adds a checkpoint after each flush since a flushed buffer always ends on
+a line boundary. Files written without the pipeline (or before a manager
+restart) are caught up on read by scanning only the bytes past the last
+checkpoint.
+
+Reads map the file and slice it between checkpoints, so "last N lines",
+"N lines from line X" and "N lines before line X" cost O(result + stride)
+whatever the file size. Checkpoints are appended to <log>.idx so a
+restart does not rescan; the header stores the file's inode so an index
+left behind by a rotation is detected and rebuilt.
+"""
+
+import array
+import bisect
+import mmap
+import os
+import struct
+import threading
+
+# Global variables
+vg_stride = 64 * 1024        # Bytes between checkpoints
+vg_scan_block = 1024 * 1024  # Bytes per step when catching up on unindexed data
+vg_lock = threading.Lock()
+vg_indexes = {}              # log path -> index dict
+vg_magic = b'PYLIDX01'
+vg_header = struct.Struct('<8sQ')
+vg_record = struct.Struct('<QQ')
+
+def vf_get_index_path(vf_log_path):
+    """Path of a log's persisted checkpoints"""
+    return vf_log_path + '.idx'
+
+def vf_new_index(vf_inode):
+    """Empty index: line 0 starts at byte 0"""
+    return {
+        'inode': vf_inode,
+        'lines': array.array('Q', [0]),    # Line number of each checkpoint
+        'offsets': array.array('Q', [0]),  # Byte offset of each checkpoint
+        'total_lines': 0,                  # Complete lines in the indexed range
+        'size': 0,                         # Bytes covered by the index
+        'file': None,                      # Open .idx handle for appends
+        'lock': threading.Lock()
+    }
+
+def vf_load_index(vf_log_path, vf_inode):
+    """Load persisted checkpoints if they belong to this file"""
+    vf_index = vf_new_index(vf_inode)
+    vf_index_path = vf_get_index_path(vf_log_path)
+
+    try:
+        with open(vf_index_path, 'rb') as vf_file:
+            vf_data = vf_file.read()
+        vf_magic, vf_stored_inode = vg_header.unpack_from(vf_data, 0)
+        if vf_magic == vg_magic and vf_stored_inode == vf_inode:
+            vf_end = vg_header.size + (len(vf_data) - vg_header.size) // vg_record.size * vg_record.size
+            for vf_line, vf_offset in vg_record.iter_unpack(vf_data[vg_header.size:vf_end]):
+                vf_index['lines'].append(vf_line)
+                vf_index['offsets'].append(vf_offset)
+    except (OSError, struct.error):
+        pass
+
+    # Drop checkpoints past the end (file truncated) and resume from the last one
+    vf_size = os.path.getsize(vf_log_path)
+    while len(vf_index['offsets']) > 1 and vf_index['offsets'][-1] > vf_size:
+        vf_index['offsets'].pop()
+        vf_index['lines'].pop()
+    vf_index['total_lines'] = vf_index['lines'][-1]
+    vf_index['size'] = vf_index['offsets'][-1]
+
+    # Rewrite so the file matches what was kept
+    try:
+        vf_file = open(vf_index_path, 'wb')
+        vf_file.write(vg_header.pack(vg_magic, vf_inode))
+        for vf_pos in range(1, len(vf_index['offsets'])):
+            vf_file.write(vg_record.pack(vf_index['lines'][vf_pos], vf_index['offsets'][vf_pos]))
+        vf_file.flush()
+        vf_index['file'] = vf_file
+    except OSError:
+        vf_index['file'] = None  # Read-only directory: keep the index in memory only
+
+    return vf_index
+
+def vf_get_index(vf_log_path):
+    """Get the index of a log file, loading or rebuilding it when needed"""
+    try:
+        vf_inode = os.stat(vf_log_path).st_ino
+    except OSError:
+        return None
+
+    with vg_lock:
+        vf_index = vg_indexes.get(vf_log_path)
+        if vf_index is None or vf_index['inode'] != vf_inode:
+            if vf_index is not None:
+                vf_close_index(vf_index)
+            vf_index = vf_load_index(vf_log_path, vf_inode)
+            vg_indexes[vf_log_path] = vf_index
+    return vf_index
+
+def vf_add_checkpoint(vf_index, vf_line, vf_offset):
+    """Record a line start (caller holds the index lock)"""
+    vf_index['lines'].append(vf_line)
+    vf_index['offsets'].append(vf_offset)
+    if vf_index['file'] is not None:
+        try:
+            vf_index['file'].write(vg_record.pack(vf_line, vf_offset))
+            vf_index['file'].flush()
+        except (OSError, ValueError):
+            vf_index['file'] = None
+
+def vf_note_append(vf_log_path, vf_start, vf_data):
+    """Writer hook: vf_data (complete lines) was written at byte vf_start"""
+    vf_index = vg_indexes.get(vf_log_path)
+    if vf_index is None:
+        vf_index = vf_get_index(vf_log_path)
+        if vf_index is None:
+            return
+
+    with vf_index['lock']:
+        if vf_index['size'] < vf_start:
+            # Data written before this index was loaded, index it once
+            try:
+                with open(vf_log_path, 'rb') as vf_file:
+                    vf_catch_up(vf_index, vf_file, vf_start)
+            except OSError:
+                return
+        if vf_index['size'] != vf_start:
+            return  # Unindexed partial line, the next read catches up
+
+        vf_index['total_lines'] += vf_data.count(b'\n')
+        vf_index['size'] += len(vf_data)
+        if vf_index['size'] - vf_index['offsets'][-1] >= vg_stride:
+            vf_add_checkpoint(vf_index, vf_index['total_lines'], vf_index['size'])
+
+def vf_catch_up(vf_index, vf_file, vf_size):
+    """Index complete lines between the indexed size and vf_size (caller holds the index lock)"""
+    vf_file.seek(vf_index['size'])
+
+    while vf_index['size'] < vf_size:
+        vf_block = vf_file.read(min(vg_scan_block, vf_size - vf_index['size']))
+        if not vf_block:
+            break
+
+        vf_last_newline = vf_block.rfind(b'\n')
+        if vf_last_newline < 0:
+            break  # Only a partial line left
+
+        vf_pos = 0
+        while vf_pos <= vf_last_newline:
+            # Walk to the next checkpoint distance, then to the line end after it
+            vf_target = vf_index['offsets'][-1] + vg_stride - vf_index['size']
+            if vf_pos + vf_target > vf_last_newline:
+                vf_index['total_lines'] += vf_block.count(b'\n', vf_pos, vf_last_newline + 1)
+                vf_index['size'] += vf_last_newline + 1 - vf_pos
+                break
+            vf_end = vf_block.find(b'\n', vf_pos + max(vf_target - 1, 0)) + 1
+            vf_index['total_lines'] += vf_block.count(b'\n', vf_pos, vf_end)
+            vf_index['size'] += vf_end - vf_pos
+            vf_add_checkpoint(vf_index, vf_index['total_lines'], vf_index['size'])
+            vf_pos = vf_end
+
+        vf_file.seek(vf_index['size'])
+
+def vf_offset_of(vf_index, vf_line):
+    """Nearest checkpoint at or before a line: (line, offset)"""
+    vf_pos = bisect.bisect_right(vf_index['lines'], vf_line) - 1
+    return vf_index['lines'][vf_pos], vf_index['offsets'][vf_pos]
+
+def vf_read_range(vf_log_path, vf_from_line=None, vf_before_line=None, vf_count=100):
+    """Read up to vf_count lines by line number
+
+    Without arguments the last lines are returned. vf_from_line reads
+    forward from that line, vf_before_line reads the page ending just
+    before it. Returns the lines plus the numbers needed to page on.
+    """
+    vf_result = {'lines': [], 'first_line': 0, 'next_line': 0, 'total_lines': 0}
+
+    vf_index = vf_get_index(vf_log_path)
+    if vf_index is None or vf_count <= 0:
+        return vf_result
+
+    with open(vf_log_path, 'rb') as vf_file:
+        vf_size = os.fstat(vf_file.fileno()).st_size
+
+        with vf_index['lock']:
+            if vf_index['size'] < vf_size:
+                vf_catch_up(vf_index, vf_file, vf_size)
+            vf_total = vf_index['total_lines']
+
+            # A trailing line without newline is shown but not indexed yet
+            vf_has_partial = vf_size > vf_index['size']
+            vf_visible = vf_total + (1 if vf_has_partial else 0)
+
+            if vf_from_line is not None:
+                vf_first = max(0, min(vf_from_line, vf_visible))
+            elif vf_before_line is not None:
+                vf_first = max(0, min(vf_before_line, vf_visible) - vf_count)
+            else:
+                vf_first = max(0, vf_visible - vf_count)
+            vf_last = min(vf_first + vf_count, vf_visible)
+            if vf_before_line is not None:
+                vf_last = min(vf_last, max(vf_before_line, 0))
+
+            vf_check_line, vf_start = vf_offset_of(vf_index, vf_first)
+            vf_end_line, vf_end = vf_offset_of(vf_index, vf_last)
+            if vf_end_line < vf_last:
+                # Last wanted line lies past a checkpoint, read to the next one (or EOF)
+                vf_pos = bisect.bisect_right(vf_index['lines'], vf_last)
+                vf_end = vf_index['offsets'][vf_pos] if vf_pos < len(vf_index['offsets']) else vf_size
+
+        vf_result['total_lines'] = vf_visible
+        if vf_first >= vf_last or vf_end <= vf_start:
+            vf_result['first_line'] = vf_result['next_line'] = vf_first
+            return vf_result
+
+        with mmap.mmap(vf_file.fileno(), vf_end, access=mmap.ACCESS_READ) as vf_map:
+            # Split on '\n' only so positions match the indexed line count
+            ag_lines = vf_map[vf_start:vf_end].decode('utf-8', errors='ignore').split('\n')
+
+    ag_lines = ag_lines[vf_first - vf_check_line:vf_last - vf_check_line]
+    vf_result['lines'] = ag_lines
+    vf_result['first_line'] = vf_first
+    vf_result['next_line'] = vf_first + len(ag_lines)
+    return vf_result
+
+def vf_close_index(vf_index):
+    """Close an index's append handle"""
+    if vf_index['file'] is not None:
+        try:
+            vf_index['file'].close()
+        except OSError:
+            pass
+        vf_index['file'] = None
+
+def vf_forget(vf_log_path):
+    """Drop a log's index after the file was rotated or removed"""
+    with vg_lock:
+        vf_index = vg_indexes.pop(vf_log_path, None)
+    if vf_index is not None:
+        vf_close_index(vf_index)
+    try:
+        os.remove(vf_get_index_path(vf_log_path))
+    except OSError:
+        pass
@@ -0,0 +1,392 @@
+"""Log ingestion pipeline for Python Manager
+
+Child output is read as raw bytes in large chunks into a reused buffer.
+Complete lines are appended to a per-script write buffer that is flushed
+to disk when it grows past a size threshold or gets older than a time
+threshold, instead of on every line. Live-view callbacks get the lines
+of each chunk from a single decode; when a chunk holds more lines than
+the live budget, only the newest are forwarded and the rest are counted
+as dropped (they are still written to disk).
+
+In 'mux' mode (default on POSIX) one selector thread services every
+child pipe with non-blocking reads, so the thread count stays the same
+however many scripts run. Each ready pipe gets one chunk per round,
+which keeps a noisy script from starving quiet ones. 'thread' mode runs
+one blocking reader thread per pipe and is used on Windows, where
+select() does not work on pipes.
+"""
+
+import os
+import selectors
+import threading
+import time
+
+import py_logindex
+import py_logrotate
+import py_logsearch
+
+# Global variables
+vg_log_callback = None           # Called as callback(script_id, line) for live views
+vg_read_size = 64 * 1024         # Bytes per read from a child pipe
+vg_flush_bytes = 64 * 1024       # Flush a writer once this much is buffered
+vg_flush_interval = 0.2          # ...or once its oldest byte is this old (seconds)
+vg_live_lines_per_chunk = 1000   # Max lines per chunk passed to the live callback
+vg_max_line_bytes = 1024 * 1024  # Longest partial line kept before forcing a break
+vg_reader_mode = 'thread' if os.name == 'nt' else 'mux'
+vg_lock = threading.Lock()
+vg_flusher_thread = None
+vg_mux_thread = None
+vg_mux_selector = None
+vg_mux_wake_read = None
+vg_mux_wake_write = None
+vg_writers = {}                  # id(writer) -> writer dict for the flusher
+vg_stats = {}                    # script_id -> counters, kept across restarts
+
+# Global arrays
+ag_mux_pending = []              # (script_id, pipe, writer) waiting to be registered
+
+def vf_set_log_callback(callback):
+    """Set callback for live log lines"""
+    global vg_log_callback
+    vg_log_callback = callback
+
+def vf_configure(vf_settings):
+    """Apply tuning values from manager_settings"""
+    global vg_read_size, vg_flush_bytes, vg_flush_interval, vg_live_lines_per_chunk, vg_reader_mode
+    vg_read_size = vf_settings.get('log_read_bytes', vg_read_size)
+    vg_flush_bytes = vf_settings.get('log_flush_bytes', vg_flush_bytes)
+    vg_flush_interval = vf_settings.get('log_flush_interval', vg_flush_interval)
+    vg_live_lines_per_chunk = vf_settings.get('log_live_lines_per_chunk', vg_live_lines_per_chunk)
+    if os.name != 'nt':
+        vg_reader_mode = vf_settings.get('log_reader_mode', vg_reader_mode)
+
+def vf_get_script_stats(vf_script_id):
+    """Get (creating) the counters for a script"""
+    vf_stats = vg_stats.get(vf_script_id)
+    if vf_stats is None:
+        vf_stats = {
+            'lines': 0,
+            'bytes': 0,
+            'dropped_lines': 0,
+            'lines_per_sec': 0.0,
+            'bytes_per_sec': 0.0,
+            'rate_lines': 0,
+            'rate_bytes': 0,
+            'rate_time': time.monotonic()
+        }
+        vg_stats[vf_script_id] = vf_stats
+    return vf_stats
+
+def vf_open_writer(vf_script_id, vf_log_path):
+    """Open a batching writer for a script's log file"""
+    vf_writer = {
+        'script_id': vf_script_id,
+        'path': vf_log_path,
+        'file': open(vf_log_path, 'ab'),
+        'size': os.path.getsize(vf_log_path),
+        'started': py_logrotate.vf_current_started(vf_log_path),
+        'buffer': bytearray(),
+        'pending': bytearray(),  # Partial line carried between chunks
+        'first_buffered': None,
+        'lock': threading.Lock(),
+        'closed': False
+    }
+
+    with vg_lock:
+        vg_writers[id(vf_writer)] = vf_writer
+        vf_ensure_flusher()
+
+    return vf_writer
+
+def vf_flush_writer(vf_writer):
+    """Write out a writer's buffer (caller holds the writer lock)"""
+    if vf_writer['buffer'] and not vf_writer['closed']:
+        vf_writer['file'].write(vf_writer['buffer'])
+        vf_writer['file'].flush()
+        py_logindex.vf_note_append(vf_writer['path'], vf_writer['size'], vf_writer['buffer'])
+        vf_writer['size'] += len(vf_writer['buffer'])
+        vf_writer['buffer'].clear()
+        py_logsearch.vf_notify(vf_writer['path'])
+
+        if py_logrotate.vf_should_rotate(vf_writer['size'], vf_writer['started']):
+            vf_rotate_writer(vf_writer)
+    vf_writer['first_buffered'] = None
+
+def vf_rotate_writer(vf_writer):
+    """Swap the live file for a fresh one (caller holds the writer lock)"""
+    vf_writer['file'].close()
+    try:
+        vf_segment_path = py_logrotate.vf_rotate(vf_writer['path'])
+        py_logsearch.vf_note_rotated(vf_writer['path'], vf_segment_path)
+    except OSError as vf_error:
+        print(f"Log rotation failed for {vf_writer['script_id']}: {vf_error}")
+    py_logindex.vf_forget(vf_writer['path'])
+
+    vf_writer['file'] = open(vf_writer['path'], 'ab')
+    vf_writer['size'] = os.path.getsize(vf_writer['path'])
+    vf_writer['started'] = time.time()
+
+def vf_close_writer(vf_writer):
+    """Flush any partial line and buffered data, then close the file"""
+    with vf_writer['lock']:
+        if vf_writer['closed']:
+            return
+        if vf_writer['pending']:
+            vf_writer['buffer'] += vf_writer['pending']
+            vf_writer['buffer'] += b'\n'
+            vf_writer['pending'].clear()
+        vf_flush_writer(vf_writer)
+        vf_writer['file'].close()
+        vf_writer['closed'] = True
+
+    with vg_lock:
+        vg_writers.pop(id(vf_writer), None)
+
+def vf_close_all():
+    """Flush and close every open writer (manager exiting with children left running)"""
+    with vg_lock:
+        af_writers = list(vg_writers.values())
+    for vf_writer in af_writers:
+        try:
+            vf_close_writer(vf_writer)
+        except (ValueError, OSError) as vf_error:
+            print(f"Log flush error for {vf_writer['script_id']}: {vf_error}")
+
+def vf_feed(vf_writer, vf_chunk):
+    """Ingest one chunk of raw child output"""
+    vf_stats = vf_get_script_stats(vf_writer['script_id'])
+    vf_last_newline = vf_chunk.rfind(b'\n')
+
+    with vf_writer['lock']:
+        if vf_last_newline < 0:
+            # No line end yet, keep it until the line completes
+            vf_writer['pending'] += vf_chunk
+            if len(vf_writer['pending']) < vg_max_line_bytes:
+                return
+            # Overlong line (e.g. progress bar redraws): cut it here
+            vf_complete = bytes(vf_writer['pending']) + b'\n'
+            vf_writer['pending'].clear()
+        else:
+            vf_complete = bytes(vf_writer['pending']) + vf_chunk[:vf_last_newline + 1]
+            vf_writer['pending'][:] = vf_chunk[vf_last_newline + 1:]
+
+        if vf_writer['first_buffered'] is None:
+            vf_writer['first_buffered'] = time.monotonic()
+        vf_writer['buffer'] += vf_complete
+
+        if len(vf_writer['buffer']) >= vg_flush_bytes:
+            vf_flush_writer(vf_writer)
+
+    vf_line_count = vf_complete.count(b'\n')
+    vf_stats['lines'] += vf_line_count
+    vf_stats['bytes'] += len(vf_complete)
+
+    if vg_log_callback:
+        vf_emit_lines(vf_writer['script_id'], vf_complete, vf_line_count, vf_stats)
+
+def vf_emit_lines(vf_script_id, vf_complete, vf_line_count, vf_stats):
+    """Decode a block of complete lines once and pass them to the live callback"""
+    ag_lines = vf_complete.decode('utf-8', errors='replace').splitlines(keepends=True)
+
+    if vf_line_count > vg_live_lines_per_chunk:
+        vf_stats['dropped_lines'] += len(ag_lines) - vg_live_lines_per_chunk
+        ag_lines = ag_lines[-vg_live_lines_per_chunk:]
+
+    for vf_line in ag_lines:
+        try:
+            vg_log_callback(vf_script_id, vf_line)
+        except Exception:
+            vf_stats['dropped_lines'] += 1
+
+def vf_reader_loop(vf_script_id, vf_pipe, vf_writer):
+    """Read a child's pipe in chunks until EOF (thread target)"""
+    vf_buffer = bytearray(vg_read_size)
+    vf_view = memoryview(vf_buffer)
+
+    try:
+        while True:
+            vf_count = vf_pipe.readinto(vf_buffer)
+            if not vf_count:
+                break
+            vf_feed(vf_writer, bytes(vf_view[:vf_count]))
+    except (ValueError, OSError):
+        pass  # Pipe closed
+    except Exception as vf_error:
+        print(f"Log reader error for {vf_script_id}: {vf_error}")
+    finally:
+        vf_view.release()
+        vf_close_writer(vf_writer)
+        try:
+            vf_pipe.close()
+        except OSError:
+            pass
+
+def vf_start_reader(vf_script_id, vf_pipe, vf_log_path):
+    """Start reading a child's output pipe into its log file"""
+    vf_writer = vf_open_writer(vf_script_id, vf_log_path)
+
+    if vg_reader_mode == 'mux':
+        vf_mux_add(vf_script_id, vf_pipe, vf_writer)
+        return vf_writer
+
+    vf_thread = threading.Thread(
+        target=vf_reader_loop,
+        args=(vf_script_id, vf_pipe, vf_writer),
+        daemon=True
+    )
+    vf_thread.start()
+    return vf_writer
+
+def vf_mux_add(vf_script_id, vf_pipe, vf_writer):
+    """Hand a pipe to the multiplexer thread"""
+    os.set_blocking(vf_pipe.fileno(), False)
+
+    with vg_lock:
+        vf_ensure_mux()
+        ag_mux_pending.append((vf_script_id, vf_pipe, vf_writer))
+
+    try:
+        os.write(vg_mux_wake_write, b'\0')
+    except (BlockingIOError, OSError):
+        pass  # Wake pipe already full, the loop will wake anyway
+
+def vf_ensure_mux():
+    """Start the multiplexer on first use (caller holds vg_lock)"""
+    global vg_mux_thread, vg_mux_selector, vg_mux_wake_read, vg_mux_wake_write
+    if vg_mux_thread is not None:
+        return
+
+    vg_mux_selector = selectors.DefaultSelector()
+    vg_mux_wake_read, vg_mux_wake_write = os.pipe()
+    os.set_blocking(vg_mux_wake_read, False)
+    os.set_blocking(vg_mux_wake_write, False)
+    vg_mux_selector.register(vg_mux_wake_read, selectors.EVENT_READ, None)
+
+    vg_mux_thread = threading.Thread(target=vf_mux_loop, name='py-log-mux', daemon=True)
+    vg_mux_thread.start()
+
+def vf_mux_close(vf_key):
+    """Unregister a pipe at EOF and close its writer"""
+    vf_script_id, vf_pipe, vf_writer = vf_key.data
+    vg_mux_selector.unregister(vf_key.fd)
+    vf_close_writer(vf_writer)
+    try:
+        vf_pipe.close()
+    except OSError:
+        pass
+
+def vf_mux_loop():
+    """Service all registered pipes from one thread, one chunk per pipe per round"""
+    vf_buffer = bytearray(vg_read_size)
+    vf_view = memoryview(vf_buffer)
+    vf_round = 0
+
+    while True:
+        try:
+            ag_events = vg_mux_selector.select()
+        except OSError as vf_error:
+            print(f"Log mux select error: {vf_error}")
+            time.sleep(1)
+            continue
+
+        # Rotate the service order so no pipe is always read first
+        vf_round += 1
+        if ag_events:
+            vf_shift = vf_round % len(ag_events)
+            ag_events = ag_events[vf_shift:] + ag_events[:vf_shift]
+
+        for vf_key, vf_mask in ag_events:
+            if vf_key.data is None:
+                try:
+                    while os.read(vg_mux_wake_read, 4096):
+                        pass
+                except BlockingIOError:
+                    pass
+                continue
+
+            try:
+                vf_count = os.readv(vf_key.fd, [vf_buffer])
+            except BlockingIOError:
+                continue
+            except OSError:
+                vf_count = 0
+
+            if not vf_count:
+                vf_mux_close(vf_key)
+                continue
+
+            try:
+                vf_feed(vf_key.data[2], bytes(vf_view[:vf_count]))
+            except Exception as vf_error:
+                print(f"Log mux error for {vf_key.data[0]}: {vf_error}")
+
+        with vg_lock:
+            af_pending = ag_mux_pending[:]
+            del ag_mux_pending[:]
+
+        for vf_entry in af_pending:
+            vg_mux_selector.register(vf_entry[1].fileno(), selectors.EVENT_READ, vf_entry)
+
+def vf_ensure_flusher():
+    """Start the time-based flusher on first use (caller holds vg_lock)"""
+    global vg_flusher_thread
+    if vg_flusher_thread is None:
+        vg_flusher_thread = threading.Thread(target=vf_flusher_loop, name='py-log-flusher', daemon=True)
+        vg_flusher_thread.start()
+
+def vf_flusher_loop():
+    """Flush writers whose buffered data is too old and refresh rates"""
+    vf_last_rates = time.monotonic()
+
+    while True:
+        time.sleep(vg_flush_interval)
+        vf_now = time.monotonic()
+
+        with vg_lock:
+            af_writers = list(vg_writers.values())
+
+        for vf_writer in af_writers:
+            with vf_writer['lock']:
+                vf_first = vf_writer['first_buffered']
+                if vf_first is not None and vf_now - vf_first >= vg_flush_interval:
+                    try:
+                        vf_flush_writer(vf_writer)
+                    except (ValueError, OSError) as vf_error:
+                        print(f"Log flush error for {vf_writer['script_id']}: {vf_error}")
+
+        if vf_now - vf_last_rates >= 1:
+            vf_update_rates(vf_now)
+            vf_last_rates = vf_now
+
+def vf_update_rates(vf_now):
+    """Recompute lines/s and bytes/s from counter deltas"""
+    for vf_stats in list(vg_stats.values()):
+        vf_elapsed = vf_now - vf_stats['rate_time']
+        if vf_elapsed <= 0:
+            continue
+        vf_stats['lines_per_sec'] = round((vf_stats['lines'] - vf_stats['rate_lines']) / vf_elapsed, 1)
+        vf_stats['bytes_per_sec'] = round((vf_stats['bytes'] - vf_stats['rate_bytes']) / vf_elapsed, 1)
+        vf_stats['rate_lines'] = vf_stats['lines']
+        vf_stats['rate_bytes'] = vf_stats['bytes']
+        vf_stats['rate_time'] = vf_now
+
+def vf_get_reader_info():
+    """Get the reader mode and how many pipes it is servicing"""
+    if vg_reader_mode == 'mux' and vg_mux_selector is not None:
+        vf_pipes = len(vg_mux_selector.get_map()) - 1  # Minus the wake pipe
+    else:
+        vf_pipes = len(vg_writers)
+    return {'mode': vg_reader_mode, 'pipes': vf_pipes, 'threads': threading.active_count()}
+
+def vf_get_stats(vf_script_id=None):
+    """Get ingestion counters for one script or all scripts"""
+    ag_keys = ['lines', 'bytes', 'dropped_lines', 'lines_per_sec', 'bytes_per_sec']
+
+    if vf_script_id is not None:
+        vf_stats = vg_stats.get(vf_script_id)
+        return {vf_key: vf_stats[vf_key] for vf_key in ag_keys} if vf_stats else None
+
+    return {
+        vf_id: {vf_key: vf_stats[vf_key] for vf_key in ag_keys}
+        for vf_id, vf_stats in list(vg_stats.items())
+    }
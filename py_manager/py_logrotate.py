@@ -0,0 +1,214 @@
+"""Rotation engine for per-script logs
+
+py_logpipe asks this module after each flush whether the current log
+file is due for rotation (by size or age). Rotation happens under the
+writer's lock, so the child keeps running and no line is lost: the file
+is renamed to <log>.<timestamp>, recorded in a segment index and a fresh
+file is opened. Rotated segments are optionally gzip-compressed by a
+background worker. The index (<log>.segments.json) lists segments
+oldest-first so tail and search can read across rotations. Other
+modules may keep files derived from a segment next to it (see
+vf_get_sidecar_path); suffixes listed in ag_sidecar_suffixes are removed
+together with the segment.
+"""
+
+import collections
+import datetime
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+# Global variables
+vg_max_bytes = 50 * 1024 * 1024  # Rotate once the file reaches this size
+vg_max_age = 24 * 3600           # ...or once it is this old in seconds (0 = never)
+vg_keep_segments = 10            # Rotated segments kept per log
+vg_compress = True               # Gzip rotated segments in the background
+vg_tail_block = 64 * 1024        # Bytes read per step when tailing a segment
+vg_lock = threading.Lock()
+vg_compress_queue = queue.Queue()
+ag_sidecar_suffixes = []         # Derived files pruned with their segment
+vg_compress_thread = None
+
+def vf_configure(vf_settings):
+    """Apply rotation settings from manager_settings"""
+    global vg_max_bytes, vg_max_age, vg_keep_segments, vg_compress
+    vg_max_bytes = vf_settings.get('script_log_max_mb', vg_max_bytes // (1024 * 1024)) * 1024 * 1024
+    vg_max_age = vf_settings.get('script_log_max_age_hours', vg_max_age // 3600) * 3600
+    vg_keep_segments = vf_settings.get('script_log_keep_segments', vg_keep_segments)
+    vg_compress = vf_settings.get('script_log_compress', vg_compress)
+
+def vf_get_index_path(vf_log_path):
+    """Path of a log's segment index"""
+    return vf_log_path + '.segments.json'
+
+def vf_get_sidecar_path(vf_log_path, vf_segment_path, vf_suffix):
+    """Path of a file derived from a segment, the same whether it is compressed or not"""
+    vf_name = vf_segment_path[:-3] if vf_segment_path.endswith('.gz') else vf_segment_path
+    return os.path.join(os.path.dirname(vf_log_path), os.path.basename(vf_name) + vf_suffix)
+
+def vf_remove_sidecars(vf_log_path, vf_segment_path):
+    """Delete the registered files derived from a pruned segment"""
+    for vf_suffix in ag_sidecar_suffixes:
+        try:
+            os.remove(vf_get_sidecar_path(vf_log_path, vf_segment_path, vf_suffix))
+        except FileNotFoundError:
+            pass
+        except OSError as vf_error:
+            print(f"Error removing {vf_segment_path}{vf_suffix}: {vf_error}")
+
+def vf_load_index(vf_log_path):
+    """Load a log's segment index (caller holds vg_lock)"""
+    try:
+        with open(vf_get_index_path(vf_log_path), 'r') as vf_file:
+            return json.load(vf_file)
+    except (OSError, ValueError):
+        return {'current_started': None, 'segments': []}
+
+def vf_save_index(vf_log_path, vf_index):
+    """Write a log's segment index atomically (caller holds vg_lock)"""
+    vf_index_path = vf_get_index_path(vf_log_path)
+    vf_tmp_path = vf_index_path + '.tmp'
+    with open(vf_tmp_path, 'w') as vf_file:
+        json.dump(vf_index, vf_file)
+    os.replace(vf_tmp_path, vf_index_path)
+
+def vf_current_started(vf_log_path):
+    """When the live file was started, recorded on first use"""
+    with vg_lock:
+        vf_index = vf_load_index(vf_log_path)
+        if vf_index['current_started'] is None:
+            vf_index['current_started'] = time.time()
+            vf_save_index(vf_log_path, vf_index)
+        return vf_index['current_started']
+
+def vf_should_rotate(vf_size, vf_started):
+    """Check the size and age limits"""
+    if vg_max_bytes and vf_size >= vg_max_bytes:
+        return True
+    return bool(vg_max_age) and time.time() - vf_started >= vg_max_age
+
+def vf_rotate(vf_log_path):
+    """Rename the live file into a new segment (caller closed the file)"""
+    vf_stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    vf_segment_path = f"{vf_log_path}.{vf_stamp}"
+
+    with vg_lock:
+        vf_index = vf_load_index(vf_log_path)
+        os.replace(vf_log_path, vf_segment_path)
+
+        vf_index['segments'].append({
+            'path': os.path.basename(vf_segment_path),
+            'started': vf_index['current_started'],
+            'ended': time.time(),
+            'bytes': os.path.getsize(vf_segment_path),
+            'compressed': False
+        })
+        vf_index['current_started'] = time.time()
+
+        # Retention: drop the oldest segments beyond the limit
+        while len(vf_index['segments']) > vg_keep_segments:
+            vf_old = vf_index['segments'].pop(0)
+            vf_old_path = os.path.join(os.path.dirname(vf_log_path), vf_old['path'])
+            if os.path.exists(vf_old_path):
+                os.remove(vf_old_path)
+            vf_remove_sidecars(vf_log_path, vf_old['path'])
+
+        vf_save_index(vf_log_path, vf_index)
+
+    if vg_compress:
+        vf_ensure_compressor()
+        vg_compress_queue.put((vf_log_path, os.path.basename(vf_segment_path)))
+
+    return vf_segment_path
+
+def vf_ensure_compressor():
+    """Start the compression worker on first use"""
+    global vg_compress_thread
+    with vg_lock:
+        if vg_compress_thread is None:
+            vg_compress_thread = threading.Thread(target=vf_compress_loop, name='py-log-compress', daemon=True)
+            vg_compress_thread.start()
+
+def vf_compress_loop():
+    """Gzip rotated segments one at a time"""
+    while True:
+        vf_log_path, vf_name = vg_compress_queue.get()
+        try:
+            vf_compress_segment(vf_log_path, vf_name)
+        except Exception as vf_error:
+            print(f"Log compression error for {vf_name}: {vf_error}")
+
+def vf_compress_segment(vf_log_path, vf_name):
+    """Compress one segment and point its index entry at the .gz file"""
+    vf_dir = os.path.dirname(vf_log_path)
+    vf_source = os.path.join(vf_dir, vf_name)
+    if not os.path.exists(vf_source):
+        return  # Already pruned by retention
+
+    with open(vf_source, 'rb') as vf_in, gzip.open(vf_source + '.gz.tmp', 'wb') as vf_out:
+        shutil.copyfileobj(vf_in, vf_out, 1024 * 1024)
+    os.replace(vf_source + '.gz.tmp', vf_source + '.gz')
+
+    with vg_lock:
+        vf_index = vf_load_index(vf_log_path)
+        for vf_segment in vf_index['segments']:
+            if vf_segment['path'] == vf_name:
+                vf_segment['path'] = vf_name + '.gz'
+                vf_segment['compressed'] = True
+        vf_save_index(vf_log_path, vf_index)
+
+    # Readers resolve paths via the index, so the plain file can go now
+    os.remove(vf_source)
+
+def vf_list_segments(vf_log_path):
+    """Rotated segments oldest-first, each with an absolute 'file' path"""
+    with vg_lock:
+        vf_index = vf_load_index(vf_log_path)
+
+    ag_segments = []
+    for vf_segment in vf_index['segments']:
+        vf_entry = dict(vf_segment)
+        vf_entry['file'] = os.path.join(os.path.dirname(vf_log_path), vf_segment['path'])
+        ag_segments.append(vf_entry)
+    return ag_segments
+
+def vf_open_segment(vf_segment):
+    """Open a segment for binary reading, compressed or not"""
+    if vf_segment['file'].endswith('.gz'):
+        return gzip.open(vf_segment['file'], 'rb')
+    return open(vf_segment['file'], 'rb')
+
+def vf_read_segment_tail(vf_segment, vf_count):
+    """Read the last vf_count lines of a rotated segment
+
+    Plain segments are read backwards from the end in blocks. A gzip
+    segment can only be read forwards, so it is streamed through a
+    bounded deque instead of being decompressed into memory whole.
+    """
+    if vf_count <= 0:
+        return []
+    try:
+        if vf_segment['file'].endswith('.gz'):
+            with gzip.open(vf_segment['file'], 'rb') as vf_file:
+                ag_tail = collections.deque(vf_file, maxlen=vf_count)
+            return [vf_line.decode('utf-8', errors='ignore').rstrip('\r\n') for vf_line in ag_tail]
+
+        with open(vf_segment['file'], 'rb') as vf_file:
+            vf_position = vf_file.seek(0, os.SEEK_END)
+            vf_data = b''
+            # One newline more than lines wanted, plus the file's trailing one
+            while vf_position > 0 and vf_data.count(b'\n') <= vf_count:
+                vf_step = min(vg_tail_block, vf_position)
+                vf_position -= vf_step
+                vf_file.seek(vf_position)
+                vf_data = vf_file.read(vf_step) + vf_data
+        ag_lines = vf_data.decode('utf-8', errors='ignore').splitlines()
+        if vf_position > 0:
+            ag_lines = ag_lines[1:]  # First line is cut off
+        return ag_lines[-vf_count:]
+    except (OSError, EOFError):
+        return []  # Pruned or being compressed right now
@@ -0,0 +1,583 @@
+"""Full-text search over script logs
+
+Each log file and each rotated segment (a "unit") gets an inverted
+index mapping lowercase word tokens to the blocks that contain them.
+A block is a run of whole lines of about vg_block_bytes, so posting
+lists stay small enough to keep gigabytes of logs indexed in memory;
+matching lines are found by scanning only the candidate blocks.
+
+Live files are indexed incrementally: py_logpipe notifies after each
+flush and a background thread indexes the new complete blocks. The
+short unindexed tail is scanned directly at query time. On rotation the
+live index is handed over to the new segment, so it is not rebuilt.
+
+Units are identified by when their file was started (the segment index
+records it), which does not change when the live file is rotated, so
+cursors stay valid across a rotation. Once a segment is fully indexed
+its index is saved next to it (<segment>.search.json) and never built
+again; after a restart it is loaded on the first query that needs it.
+Loaded segment indexes are evicted least recently used first once they
+hold more than vg_max_tokens tokens, and reloaded on demand.
+
+Plain queries match lines containing every word of the query (case
+insensitive). Regex queries cannot use the index and scan every block
+in the time range. Results come newest first with a cursor to continue.
+"""
+
+import array
+import base64
+import collections
+import json
+import mmap
+import os
+import re
+import threading
+import time
+
+import py_logrotate
+
+# Global variables
+vg_enabled = True
+vg_block_bytes = 32 * 1024       # Target size of an indexed block
+vg_read_bytes = 1024 * 1024      # Bytes read per step while indexing
+vg_token_re = re.compile(rb'[a-z0-9_]{2,64}')
+vg_fragment_re = re.compile(rb'(?:[^\x00-\x7f]|[a-z0-9_])+')  # Query text the tokens miss
+vg_lock = threading.Lock()
+vg_units = {}                    # (log path, unit name) -> unit dict
+vg_pending = set()               # Live log paths with data waiting to be indexed
+vg_wakeup = threading.Event()
+vg_indexer_thread = None
+vg_live_name = 'live'
+vg_max_tokens = 2000000          # Tokens of saved segment indexes kept in memory
+vg_index_suffix = '.search.json'
+vg_loaded = collections.OrderedDict()  # Evictable unit key -> token count, oldest use first
+vg_loaded_tokens = 0
+vg_stats = {
+    'saved': 0,
+    'loaded': 0,
+    'evicted': 0
+}
+
+py_logrotate.ag_sidecar_suffixes.append(vg_index_suffix)
+
+def vf_configure(vf_settings):
+    """Apply search settings from manager_settings"""
+    global vg_enabled, vg_block_bytes, vg_max_tokens
+    vg_enabled = vf_settings.get('log_search_index', vg_enabled)
+    vg_block_bytes = vf_settings.get('log_search_block_kb', vg_block_bytes // 1024) * 1024
+    vg_max_tokens = vf_settings.get('log_search_max_tokens', vg_max_tokens)
+
+def vf_tokenize(vf_data):
+    """Distinct lowercase word tokens of some bytes"""
+    return set(vg_token_re.findall(vf_data.lower()))
+
+def vf_new_unit(vf_key, vf_name, vf_file):
+    """Empty index for one log file or segment"""
+    return {
+        'key': vf_key,                     # (log path, identity)
+        'name': vf_name,
+        'file': vf_file,
+        'size': 0,                         # Bytes indexed so far
+        'blocks': array.array('Q'),        # Start offset of each block
+        'block_times': array.array('d'),   # Newest data in each block (upper bound)
+        'postings': {},                    # token -> block number or array of them
+        'saved': None,                     # Index file written (None: not checked yet)
+        'lock': threading.Lock()
+    }
+
+def vf_clear_unit(vf_unit):
+    """Drop a unit's index data, keeping its identity (caller holds the unit lock)"""
+    vf_unit.update(size=0, blocks=array.array('Q'), block_times=array.array('d'), postings={})
+
+def vf_get_unit(vf_log_path, vf_identity, vf_name, vf_file):
+    """Get (creating) the index of a unit"""
+    vf_key = (vf_log_path, vf_identity)
+    with vg_lock:
+        vf_unit = vg_units.get(vf_key)
+        if vf_unit is None:
+            vf_unit = vf_new_unit(vf_key, vf_name, vf_file)
+            vg_units[vf_key] = vf_unit
+        vf_unit['name'] = vf_name  # Live file may have been rotated since
+        vf_unit['file'] = vf_file  # ...and the segment compressed
+        return vf_unit
+
+def vf_get_index_file(vf_unit):
+    """Path of a segment's saved index"""
+    return py_logrotate.vf_get_sidecar_path(vf_unit['key'][0], vf_unit['file'], vg_index_suffix)
+
+def vf_save_unit(vf_unit, vf_segment):
+    """Write a fully indexed segment's index next to it (caller holds the unit lock)"""
+    vf_index_file = vf_get_index_file(vf_unit)
+    vf_data = {
+        'started': vf_segment.get('started'),
+        'bytes': vf_unit['size'],
+        'blocks': vf_unit['blocks'].tolist(),
+        'block_times': vf_unit['block_times'].tolist(),
+        'postings': {
+            vf_token.decode('ascii'): vf_list if vf_list.__class__ is int else vf_list.tolist()
+            for vf_token, vf_list in vf_unit['postings'].items()
+        }
+    }
+    try:
+        with open(vf_index_file + '.tmp', 'w') as vf_file:
+            json.dump(vf_data, vf_file, separators=(',', ':'))
+        os.replace(vf_index_file + '.tmp', vf_index_file)
+    except OSError as vf_error:
+        print(f"Error saving search index {vf_index_file}: {vf_error}")
+        return False
+    vf_unit['saved'] = True
+    vg_stats['saved'] += 1
+    return True
+
+def vf_load_unit(vf_unit, vf_segment):
+    """Load a segment's saved index, False if there is none for this segment (caller holds the unit lock)"""
+    try:
+        with open(vf_get_index_file(vf_unit), 'r') as vf_file:
+            vf_data = json.load(vf_file)
+    except FileNotFoundError:
+        vf_unit['saved'] = False
+        return False
+    except (OSError, ValueError):
+        vf_unit['saved'] = False
+        return False  # Torn write: it is rebuilt and saved again
+
+    if vf_data.get('started') != vf_segment.get('started') or vf_data.get('bytes') != vf_segment.get('bytes'):
+        vf_unit['saved'] = False
+        return False  # Left over from another segment of the same name
+
+    vf_unit.update(
+        size=vf_data['bytes'],
+        blocks=array.array('Q', vf_data['blocks']),
+        block_times=array.array('d', vf_data['block_times']),
+        postings={
+            vf_token.encode('ascii'): vf_list if vf_list.__class__ is int else array.array('I', vf_list)
+            for vf_token, vf_list in vf_data['postings'].items()
+        }
+    )
+    vf_unit['saved'] = True
+    vg_stats['loaded'] += 1
+    return True
+
+def vf_touch_unit(vf_unit):
+    """Mark a saved segment index as used and evict the least recently used ones over the budget
+
+    Called with the unit's lock held; other units are only evicted if their
+    lock is free, so a unit being searched or indexed is never emptied.
+    """
+    global vg_loaded_tokens
+    vf_key = vf_unit['key']
+    with vg_lock:
+        vg_loaded_tokens -= vg_loaded.pop(vf_key, 0)
+        vg_loaded[vf_key] = len(vf_unit['postings'])
+        vg_loaded_tokens += vg_loaded[vf_key]
+
+        for vf_old_key in list(vg_loaded):
+            if vg_loaded_tokens <= vg_max_tokens:
+                break
+            vf_old_unit = vg_units.get(vf_old_key)
+            if vf_old_key == vf_key or vf_old_unit is None or not vf_old_unit['lock'].acquire(blocking=False):
+                continue
+            try:
+                vf_clear_unit(vf_old_unit)
+            finally:
+                vf_old_unit['lock'].release()
+            vg_loaded_tokens -= vg_loaded.pop(vf_old_key)
+            vg_stats['evicted'] += 1
+
+def vf_drop_units(ag_keys):
+    """Forget units entirely (caller holds vg_lock)"""
+    global vg_loaded_tokens
+    for vf_key in ag_keys:
+        vg_units.pop(vf_key, None)
+        vg_loaded_tokens -= vg_loaded.pop(vf_key, 0)
+
+def vf_open_unit(vf_unit):
+    """Open a unit's file for binary reading"""
+    return py_logrotate.vf_open_segment({'file': vf_unit['file']})
+
+def vf_add_block(vf_unit, vf_start, vf_data, vf_time):
+    """Index one block of whole lines (caller holds the unit lock)"""
+    vf_block_id = len(vf_unit['blocks'])
+    vf_unit['blocks'].append(vf_start)
+    vf_unit['block_times'].append(vf_time)
+
+    # Most tokens (ids, counters) occur in one block only: store a bare
+    # block number and switch to an array on the second block
+    vf_postings = vf_unit['postings']
+    for vf_token in vf_tokenize(vf_data):
+        vf_list = vf_postings.get(vf_token)
+        if vf_list is None:
+            vf_postings[vf_token] = vf_block_id
+        elif vf_list.__class__ is int:
+            vf_postings[vf_token] = array.array('I', (vf_list, vf_block_id))
+        else:
+            vf_list.append(vf_block_id)
+
+def vf_index_unit(vf_unit, vf_final, vf_time):
+    """Index complete blocks added since the last call (caller holds the unit lock)
+
+    Live files only get full blocks indexed; final segments are indexed
+    to the end including a last short block.
+    """
+    try:
+        vf_file = vf_open_unit(vf_unit)
+    except OSError:
+        return
+
+    with vf_file:
+        vf_file.seek(vf_unit['size'])
+        vf_carry = b''
+
+        while True:
+            vf_chunk = vf_file.read(vg_read_bytes)
+            vf_data = vf_carry + vf_chunk
+            vf_pos = 0
+
+            # Cut blocks at the first line end after vg_block_bytes
+            while len(vf_data) - vf_pos > vg_block_bytes:
+                vf_end = vf_data.find(b'\n', vf_pos + vg_block_bytes - 1)
+                if vf_end < 0:
+                    break
+                vf_add_block(vf_unit, vf_unit['size'], vf_data[vf_pos:vf_end + 1], vf_time)
+                vf_unit['size'] += vf_end + 1 - vf_pos
+                vf_pos = vf_end + 1
+
+            vf_carry = vf_data[vf_pos:]
+            if not vf_chunk:
+                break
+
+        if vf_final and vf_carry:
+            vf_add_block(vf_unit, vf_unit['size'], vf_carry, vf_time)
+            vf_unit['size'] += len(vf_carry)
+
+def vf_notify(vf_log_path):
+    """Writer hook: new data was flushed to a live log"""
+    if not vg_enabled:
+        return
+    vg_pending.add(vf_log_path)
+    vg_wakeup.set()
+
+def vf_note_rotated(vf_log_path, vf_segment_path):
+    """Hand the live index over to the segment it was renamed to
+
+    The unit keeps its key (the segment has the live file's start time),
+    only its name and file change.
+    """
+    with vg_lock:
+        for vf_key, vf_unit in vg_units.items():
+            if vf_key[0] == vf_log_path and vf_unit['file'] == vf_log_path:
+                vf_unit['name'] = os.path.basename(vf_segment_path)
+                vf_unit['file'] = vf_segment_path
+
+def vf_forget(vf_log_path):
+    """Drop all indexes of a log (script removed)"""
+    with vg_lock:
+        vf_drop_units([vf_key for vf_key in vg_units if vf_key[0] == vf_log_path])
+    vg_pending.discard(vf_log_path)
+
+def vf_start_indexer(ag_log_paths=()):
+    """Start the background indexer and queue existing logs (idempotent)"""
+    global vg_indexer_thread
+
+    if not vg_enabled:
+        return
+
+    for vf_log_path in ag_log_paths:
+        vg_pending.add(vf_log_path)
+    vg_wakeup.set()
+
+    with vg_lock:
+        if vg_indexer_thread is None:
+            vg_indexer_thread = threading.Thread(target=vf_indexer_loop, name='py-log-search', daemon=True)
+            vg_indexer_thread.start()
+
+def vf_indexer_loop():
+    """Index new data of notified logs, at most once per flush interval"""
+    while True:
+        vg_wakeup.wait()
+        vg_wakeup.clear()
+        time.sleep(0.5)  # Let a burst of flushes accumulate
+
+        while vg_pending:
+            vf_log_path = vg_pending.pop()
+            try:
+                vf_refresh_log(vf_log_path)
+            except Exception as vf_error:
+                print(f"Log search indexer error for {vf_log_path}: {vf_error}")
+
+def vf_segment_identity(vf_segment):
+    """Stable identity of a segment: the start time of the file it was"""
+    vf_name = vf_segment['path'][:-3] if vf_segment['compressed'] else vf_segment['path']
+    return vf_segment.get('started') or vf_name
+
+def vf_list_units(vf_log_path):
+    """Units of a log newest first: (unit, is_final, segment info)"""
+    # Segments first: a rotation in between then cannot give the live
+    # file the start time of the newest segment
+    ag_segments = py_logrotate.vf_list_segments(vf_log_path)
+    ag_units = []
+
+    if os.path.exists(vf_log_path):
+        vf_identity = py_logrotate.vf_current_started(vf_log_path)
+        ag_units.append((vf_get_unit(vf_log_path, vf_identity, vg_live_name, vf_log_path), False, None))
+
+    for vf_segment in reversed(ag_segments):
+        vf_name = vf_segment['path'][:-3] if vf_segment['compressed'] else vf_segment['path']
+        vf_unit = vf_get_unit(vf_log_path, vf_segment_identity(vf_segment), vf_name, vf_segment['file'])
+        ag_units.append((vf_unit, True, vf_segment))
+
+    # Forget segments pruned by retention
+    ag_keys = {vf_unit['key'] for vf_unit, _, _ in ag_units}
+    with vg_lock:
+        vf_drop_units([vf_key for vf_key in vg_units if vf_key[0] == vf_log_path and vf_key not in ag_keys])
+
+    return ag_units
+
+def vf_refresh_log(vf_log_path):
+    """Bring every unit of a log up to date
+
+    Segments with a saved index are skipped: they are loaded when a query
+    needs them, not at startup.
+    """
+    for vf_unit, vf_final, vf_segment in vf_list_units(vf_log_path):
+        with vf_unit['lock']:
+            if vf_final and vf_unit['saved'] is None:
+                vf_unit['saved'] = os.path.exists(vf_get_index_file(vf_unit))
+            if vf_final and vf_unit['saved']:
+                continue
+            vf_refresh_unit(vf_unit, vf_final, vf_segment)
+
+def vf_refresh_unit(vf_unit, vf_final, vf_segment):
+    """Index a unit's new data (caller holds the unit lock)
+
+    A final segment is indexed at most once: later it is loaded from
+    its saved index whenever it was evicted.
+    """
+    if vf_final:
+        if vf_segment.get('bytes') is None or vf_unit['size'] < vf_segment['bytes']:
+            if vf_unit['saved'] is False or not vf_load_unit(vf_unit, vf_segment):
+                vf_index_unit(vf_unit, True, vf_segment.get('ended') or time.time())
+                if vf_segment.get('bytes') is not None and vf_unit['size'] >= vf_segment['bytes']:
+                    vf_save_unit(vf_unit, vf_segment)
+        if vf_unit['saved']:
+            vf_touch_unit(vf_unit)
+        return
+
+    try:
+        vf_stat = os.stat(vf_unit['file'])
+    except OSError:
+        return
+    if vf_stat.st_size < vf_unit['size']:
+        # Truncated or replaced outside the pipeline: start over
+        vf_clear_unit(vf_unit)
+    if vf_stat.st_size - vf_unit['size'] > vg_block_bytes:
+        vf_index_unit(vf_unit, False, max(vf_stat.st_mtime, time.time()))
+
+def vf_encode_cursor(vf_script_id, vf_identity, vf_offset):
+    """Opaque cursor pointing just above a result"""
+    vf_raw = json.dumps([vf_script_id, vf_identity, vf_offset]).encode('utf-8')
+    return base64.urlsafe_b64encode(vf_raw).decode('ascii')
+
+def vf_decode_cursor(vf_cursor):
+    """Decode a cursor, None if it is malformed"""
+    try:
+        vf_script_id, vf_identity, vf_offset = json.loads(base64.urlsafe_b64decode(vf_cursor.encode('ascii')))
+        return vf_script_id, vf_identity, int(vf_offset)
+    except (ValueError, TypeError):
+        return None
+
+def vf_compile_query(vf_query, vf_regex):
+    """Build the line matcher and the tokens used to pick blocks"""
+    if vf_regex:
+        vf_pattern = re.compile(vf_query)
+        return (lambda vf_line: vf_pattern.search(vf_line.decode('utf-8', errors='replace')) is not None), []
+
+    vf_lowered = vf_query.encode('utf-8').lower()
+    ag_tokens = sorted(vf_tokenize(vf_lowered))
+
+    if not ag_tokens:
+        # Nothing indexable (e.g. punctuation or non-ASCII only): plain substring scan
+        return (lambda vf_line: vf_lowered in vf_line.lower()), []
+
+    # Words the tokenizer cannot index (non-ASCII, single characters) are
+    # checked as substrings on the lines the index narrows down to
+    vf_wanted = set(ag_tokens)
+    ag_fragments = vg_fragment_re.findall(vg_token_re.sub(b' ', vf_lowered))
+    if not ag_fragments:
+        return (lambda vf_line: vf_wanted <= vf_tokenize(vf_line)), ag_tokens
+
+    def vf_matcher(vf_line):
+        vf_line = vf_line.lower()
+        return vf_wanted <= vf_tokenize(vf_line) and all(vf_fragment in vf_line for vf_fragment in ag_fragments)
+
+    return vf_matcher, ag_tokens
+
+def vf_candidate_blocks(vf_unit, ag_tokens, vf_since):
+    """Block numbers that may hold a match, newest first"""
+    vf_count = len(vf_unit['blocks'])
+
+    if ag_tokens:
+        ag_lists = []
+        for vf_token in ag_tokens:
+            vf_list = vf_unit['postings'].get(vf_token)
+            if vf_list is None:
+                return []
+            ag_lists.append((vf_list,) if vf_list.__class__ is int else vf_list)
+        ag_lists.sort(key=len)
+        vf_blocks = set(ag_lists[0])
+        for vf_list in ag_lists[1:]:
+            vf_blocks.intersection_update(vf_list)
+        ag_blocks = sorted(vf_blocks, reverse=True)
+    else:
+        ag_blocks = range(vf_count - 1, -1, -1)
+
+    if vf_since:
+        ag_blocks = [vf_block for vf_block in ag_blocks if vf_unit['block_times'][vf_block] >= vf_since]
+    return ag_blocks
+
+def vf_scan_range(vf_file, vf_start, vf_end, vf_matcher, vf_below):
+    """Matching lines of a byte range newest first: (offset, text)"""
+    if vf_end <= vf_start:
+        return []
+
+    if isinstance(vf_file, mmap.mmap):
+        vf_data = vf_file[vf_start:vf_end]
+    else:
+        vf_file.seek(vf_start)
+        vf_data = vf_file.read(vf_end - vf_start)
+
+    ag_matches = []
+    vf_offset = vf_start
+    for vf_line in vf_data.split(b'\n'):
+        if vf_line and vf_offset < vf_below and vf_matcher(vf_line):
+            ag_matches.append((vf_offset, vf_line))
+        vf_offset += len(vf_line) + 1
+
+    ag_matches.reverse()
+    return ag_matches
+
+def vf_search_iter(ag_targets, vf_query, vf_regex=False, vf_since=None, vf_cursor=None):
+    """Yield matches across logs, newest first within each script
+
+    ag_targets is a list of (script_id, log path). Each match is a dict
+    with script_id, segment (None for the live file), offset, text and
+    the cursor to resume after it.
+    """
+    vf_matcher, ag_tokens = vf_compile_query(vf_query, vf_regex)
+    vf_resume = vf_decode_cursor(vf_cursor) if vf_cursor else None
+
+    for vf_script_id, vf_log_path in ag_targets:
+        if vf_resume and vf_resume[0] != vf_script_id:
+            continue
+
+        for vf_unit, vf_final, vf_segment in vf_list_units(vf_log_path):
+            vf_below = float('inf')
+            if vf_resume:
+                if vf_resume[1] != vf_unit['key'][1]:
+                    continue
+                vf_below = vf_resume[2]
+                vf_resume = None
+
+            if vf_since and vf_segment and (vf_segment.get('ended') or 0) < vf_since:
+                break  # Older segments only get older
+
+            for vf_match in vf_search_unit(vf_unit, vf_final, vf_segment, vf_matcher, ag_tokens, vf_since, vf_below):
+                vf_offset, vf_line = vf_match
+                yield {
+                    'script_id': vf_script_id,
+                    'segment': vf_unit['name'] if vf_final else None,
+                    'offset': vf_offset,
+                    'text': vf_line.decode('utf-8', errors='replace'),
+                    'cursor': vf_encode_cursor(vf_script_id, vf_unit['key'][1], vf_offset)
+                }
+
+def vf_search_unit(vf_unit, vf_final, vf_segment, vf_matcher, ag_tokens, vf_since, vf_below):
+    """Yield (offset, line) matches of one unit, newest first"""
+    with vf_unit['lock']:
+        if vg_enabled:
+            vf_refresh_unit(vf_unit, vf_final, vf_segment)
+        vf_indexed = vf_unit['size']
+        ag_starts = vf_unit['blocks'][:]
+        ag_blocks = vf_candidate_blocks(vf_unit, ag_tokens, vf_since) if vg_enabled else []
+
+    try:
+        vf_file = vf_open_unit(vf_unit)
+    except OSError:
+        return
+
+    with vf_file:
+        if vf_final:
+            vf_source = vf_file
+            vf_size = vf_segment.get('bytes') or vf_indexed
+        else:
+            vf_size = os.fstat(vf_file.fileno()).st_size
+            if vf_size == 0:
+                return
+            vf_source = mmap.mmap(vf_file.fileno(), vf_size, access=mmap.ACCESS_READ)
+
+        try:
+            # Unindexed tail of a live file (or everything with indexing off)
+            vf_tail_start = vf_indexed if vg_enabled else 0
+            if not vf_final or not vg_enabled:
+                yield from vf_scan_range(vf_source, vf_tail_start, vf_size, vf_matcher, vf_below)
+
+            ag_ranges = []
+            for vf_block in ag_blocks:
+                vf_start = ag_starts[vf_block]
+                if vf_start >= vf_below:
+                    continue
+                vf_end = ag_starts[vf_block + 1] if vf_block + 1 < len(ag_starts) else vf_indexed
+                ag_ranges.append((vf_start, vf_end))
+
+            if vf_segment and vf_segment['compressed']:
+                # gzip only seeks forward cheaply: collect oldest first, then report newest first
+                ag_found = []
+                for vf_start, vf_end in reversed(ag_ranges):
+                    ag_found.append(vf_scan_range(vf_source, vf_start, vf_end, vf_matcher, vf_below))
+                for ag_matches in reversed(ag_found):
+                    yield from ag_matches
+                return
+
+            for vf_start, vf_end in ag_ranges:
+                yield from vf_scan_range(vf_source, vf_start, vf_end, vf_matcher, vf_below)
+        finally:
+            if vf_source is not vf_file:
+                vf_source.close()
+
+def vf_search(ag_targets, vf_query, vf_regex=False, vf_since=None, vf_cursor=None, vf_limit=100):
+    """Collect one page of matches"""
+    vf_started = time.monotonic()
+    ag_results = []
+    _, ag_tokens = vf_compile_query(vf_query, vf_regex)
+    vf_next_cursor = None
+
+    for vf_match in vf_search_iter(ag_targets, vf_query, vf_regex, vf_since, vf_cursor):
+        if len(ag_results) >= vf_limit:
+            vf_next_cursor = ag_results[-1]['cursor']
+            break
+        ag_results.append(vf_match)
+
+    return {
+        'results': ag_results,
+        'next_cursor': vf_next_cursor,
+        'mode': 'regex' if vf_regex else ('index' if ag_tokens and vg_enabled else 'scan'),
+        'took_ms': round((time.monotonic() - vf_started) * 1000, 2)
+    }
+
+def vf_get_stats():
+    """Get index size counters"""
+    with vg_lock:
+        ag_units = list(vg_units.values())
+        vf_loaded_tokens = vg_loaded_tokens
+    return {
+        'enabled': vg_enabled,
+        'units': len(ag_units),
+        'indexed_bytes': sum(vf_unit['size'] for vf_unit in ag_units),
+        'blocks': sum(len(vf_unit['blocks']) for vf_unit in ag_units),
+        'tokens': sum(len(vf_unit['postings']) for vf_unit in ag_units),
+        'segment_tokens': vf_loaded_tokens,
+        'max_segment_tokens': vg_max_tokens,
+        'saved': vg_stats['saved'],
+        'loaded': vg_stats['loaded'],
+        'evicted': vg_stats['evicted']
+    }
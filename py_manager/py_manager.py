@@ -1,25 +1,14 @@
 import os
 import sys
-import time
 import threading
 
 # Import from same package
 import py_process
 import py_logger
-try:
-    import py_telegram_bot
-except ImportError:
-    py_telegram_bot = None
+import py_reload
 
 # Global variables
 vg_running = True
-vg_monitor_thread = None
-
-def vf_monitor_loop():
-    """Background thread for monitoring processes"""
-    while vg_running:
-        py_process.vf_monitor_processes()
-        time.sleep(py_process.vg_config['manager_settings']['check_interval_seconds'])
 
 def vf_print_status():
     """Print current status of all scripts"""
@@ -41,6 +30,11 @@ def vf_print_status():
             print(f"  Start Time: {vf_script['start_time']}")
         elif vf_script.get('restart_attempts', 0) > 0:
             print(f"  Restart Attempts: {vf_script['restart_attempts']}")
+        
+        if vf_script.get('restart_state') == 'quarantined':
+            print("  Restart: quarantined (crash loop), start manually to resume")
+        elif vf_script.get('next_restart_eta') is not None:
+            print(f"  Next Restart In: {vf_script['next_restart_eta']:.1f}s")
     
     print("\n" + "="*60)
 
@@ -76,19 +70,19 @@ def vf_select_script():
 
 def vf_main():
     """Main interactive loop"""
-    global vg_running, vg_monitor_thread
+    global vg_running
     
     print("Python Script Manager Starting...")
     
     # Load configuration
-    if not py_process.vf_load_config():
+    if not py_process.vf_init():
         print("Failed to load configuration!")
         return
     
-    # Start monitor thread
-    vg_monitor_thread = threading.Thread(target=vf_monitor_loop)
-    vg_monitor_thread.daemon = True
-    vg_monitor_thread.start()
+    # Start exit supervisor
+    vf_mode = py_process.vf_start_supervisor()
+    print(f"Process supervisor started ({vf_mode} mode)")
+    print(f"Config watcher: {py_reload.vf_start_watcher(py_process.vg_config['manager_settings'])}")
     
     # Log startup
     py_logger.vf_write_manager_log('INFO', 'Manager started')
@@ -98,6 +92,11 @@ def vf_main():
     vf_telegram_config = vf_config.get('telegram', {})
     vf_telegram_enabled = vf_telegram_config.get('enabled', True)
     if vf_telegram_enabled and vf_telegram_config.get('token'):
+        # Imported only when enabled, python-telegram-bot is slow to import
+        try:
+            import py_telegram_bot
+        except ImportError:
+            py_telegram_bot = None
         if py_telegram_bot:
             vf_token = vf_telegram_config['token']
             vf_chat_ids = vf_telegram_config.get('allowed_chat_ids', [])
@@ -174,10 +173,14 @@ def vf_main():
                             print(f"  {vf_line}")
                             
             elif vf_choice == '6':  # Reload config
-                if py_process.vf_load_config():
+                vf_result = py_reload.vf_reload('menu')
+                if vf_result['success']:
+                    vf_summary = vf_result['summary']
                     print("Configuration reloaded successfully")
+                    print(f"  Added: {len(vf_summary['added'])}, removed: {len(vf_summary['removed'])}, "
+                          f"restarted: {len(vf_summary['restarted'])}, unchanged: {vf_summary['unchanged']}")
                 else:
-                    print("Failed to reload configuration")
+                    print(vf_result['error'])
                     
             else:
                 print("Invalid command")
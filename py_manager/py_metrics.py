@@ -0,0 +1,263 @@
+"""Background process metrics sampler for Python Manager
+
+One thread samples every supervised PID per interval, reusing
+psutil.Process objects so cpu_percent() is a non-blocking delta since
+the previous sample. Status readers get the latest snapshot from a dict
+instead of sampling processes themselves.
+
+Resource usage covers each script's whole process tree. Descendants are
+tracked incrementally: a full recursive walk happens once when a script
+is first seen, after that only PIDs that appeared since the previous
+pass have their parent looked up.
+"""
+
+import threading
+import time
+
+import psutil
+
+# Global variables
+vg_target_provider = None  # Returns {script_id: pid} of processes to sample
+vg_sample_callback = None  # Receives {script_id: snapshot} after each pass
+vg_interval = 2
+vg_thread = None
+vg_running = False
+vg_snapshots = {}          # script_id -> latest metrics snapshot
+vg_proc_cache = {}         # pid -> psutil.Process reused across samples
+vg_known_pids = set()      # All PIDs on the host at the previous pass
+vg_trees = {}              # root pid -> set of descendant pids
+vg_owner = {}              # descendant pid -> root pid
+vg_pss_every = 5           # Read PSS (costly smaps read) every N passes
+vg_pss_cache = {}          # pid -> last PSS in bytes
+vg_stats = {
+    'last_pass_ms': None,
+    'passes': 0
+}
+
+def vf_set_target_provider(callback):
+    """Set callback returning the {script_id: pid} map to sample"""
+    global vg_target_provider
+    vg_target_provider = callback
+
+def vf_set_sample_callback(callback):
+    """Set callback for completed sampling passes"""
+    global vg_sample_callback
+    vg_sample_callback = callback
+
+def vf_start(vf_interval=2):
+    """Start the sampler thread (idempotent)"""
+    global vg_interval, vg_thread, vg_running
+
+    vg_interval = vf_interval
+    if vg_running:
+        return
+
+    vg_running = True
+    vg_thread = threading.Thread(target=vf_sampler_loop, name='py-metrics', daemon=True)
+    vg_thread.start()
+
+def vf_stop():
+    """Stop the sampler thread"""
+    global vg_running
+    vg_running = False
+
+def vf_sampler_loop():
+    """Sample all targets once per interval"""
+    while vg_running:
+        try:
+            vf_sample_all()
+        except Exception as vf_error:
+            print(f"Metrics sampler error: {vf_error}")
+        time.sleep(vg_interval)
+
+def vf_get_cached_process(vf_pid):
+    """Get the reused psutil.Process for a PID"""
+    vf_proc = vg_proc_cache.get(vf_pid)
+    if vf_proc is None:
+        vf_proc = psutil.Process(vf_pid)
+        vf_proc.cpu_percent(None)  # Prime the CPU delta baseline
+        vg_proc_cache[vf_pid] = vf_proc
+    return vf_proc
+
+def vf_sample_process(vf_proc, vf_read_pss):
+    """Read one process's metrics without blocking"""
+    with vf_proc.oneshot():
+        vf_sample = {
+            'cpu_percent': vf_proc.cpu_percent(None),
+            'rss': vf_proc.memory_info().rss,
+            'num_threads': vf_proc.num_threads(),
+            'num_fds': vf_count_fds(vf_proc)
+        }
+
+    if vf_read_pss:
+        try:
+            vg_pss_cache[vf_proc.pid] = vf_proc.memory_full_info().pss
+        except (AttributeError, psutil.AccessDenied):
+            pass  # PSS is Linux only and may need extra privileges
+
+    vf_sample['pss'] = vg_pss_cache.get(vf_proc.pid, vf_sample['rss'])
+    return vf_sample
+
+def vf_count_fds(vf_proc):
+    """Open file descriptors (handles on Windows)"""
+    try:
+        if hasattr(vf_proc, 'num_fds'):
+            return vf_proc.num_fds()
+        return vf_proc.num_handles()
+    except psutil.AccessDenied:
+        return 0
+
+def vf_attach(vf_pid, vf_root):
+    """Record a PID as a descendant of a supervised root"""
+    vg_trees[vf_root].add(vf_pid)
+    vg_owner[vf_pid] = vf_root
+
+def vf_detach(vf_pid):
+    """Forget a PID that exited"""
+    vf_root = vg_owner.pop(vf_pid, None)
+    if vf_root in vg_trees:
+        vg_trees[vf_root].discard(vf_pid)
+    vg_proc_cache.pop(vf_pid, None)
+    vg_pss_cache.pop(vf_pid, None)
+
+def vf_update_trees(vf_roots):
+    """Bring descendant sets up to date with PIDs created/exited since last pass"""
+    global vg_known_pids
+
+    vf_pids = set(psutil.pids())
+
+    # Drop trees of scripts that are no longer supervised
+    for vf_root in list(vg_trees.keys()):
+        if vf_root not in vf_roots:
+            for vf_pid in vg_trees.pop(vf_root):
+                vg_owner.pop(vf_pid, None)
+
+    # Newly supervised roots: one recursive walk to seed the tree
+    for vf_root in vf_roots:
+        if vf_root in vg_trees:
+            continue
+        vg_trees[vf_root] = set()
+        try:
+            for vf_child in psutil.Process(vf_root).children(recursive=True):
+                vf_attach(vf_child.pid, vf_root)
+        except psutil.Error:
+            pass
+
+    for vf_pid in vg_known_pids - vf_pids:
+        vf_detach(vf_pid)
+
+    # Only PIDs born since the last pass need a parent lookup
+    vf_pending = {}
+    if vg_known_pids:
+        for vf_pid in vf_pids - vg_known_pids:
+            try:
+                vf_pending[vf_pid] = psutil.Process(vf_pid).ppid()
+            except psutil.Error:
+                pass
+
+    # Repeat so grandchildren born in the same interval find their parent
+    vf_progress = True
+    while vf_pending and vf_progress:
+        vf_progress = False
+        for vf_pid, vf_ppid in list(vf_pending.items()):
+            vf_root = vf_ppid if vf_ppid in vg_trees else vg_owner.get(vf_ppid)
+            if vf_root is not None and vf_pid not in vg_trees:
+                vf_attach(vf_pid, vf_root)
+                del vf_pending[vf_pid]
+                vf_progress = True
+
+    vg_known_pids = vf_pids
+
+def vf_sample_tree(vf_root, vf_read_pss):
+    """Sum metrics over a root process and its tracked descendants"""
+    vf_totals = {'cpu_percent': 0.0, 'rss': 0, 'pss': 0, 'num_threads': 0,
+                 'num_fds': 0, 'num_processes': 0}
+
+    # The root must be readable, descendants may vanish mid-pass
+    for vf_pid in [vf_root] + list(vg_trees.get(vf_root, ())):
+        try:
+            vf_sample = vf_sample_process(vf_get_cached_process(vf_pid), vf_read_pss)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            if vf_pid == vf_root:
+                raise
+            vf_detach(vf_pid)
+            continue
+
+        for vf_key in ('cpu_percent', 'rss', 'pss', 'num_threads', 'num_fds'):
+            vf_totals[vf_key] += vf_sample[vf_key]
+        vf_totals['num_processes'] += 1
+
+    return vf_totals
+
+def vf_sample_all():
+    """Sample every target process tree in one pass and publish snapshots"""
+    global vg_snapshots
+
+    if not vg_target_provider:
+        return
+
+    vf_started = time.monotonic()
+    vf_targets = vg_target_provider()
+    vf_new_snapshots = {}
+    vf_read_pss = vg_stats['passes'] % vg_pss_every == 0
+
+    vf_update_trees(set(vf_targets.values()))
+
+    for vf_script_id, vf_pid in vf_targets.items():
+        try:
+            vf_totals = vf_sample_tree(vf_pid, vf_read_pss)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            vg_proc_cache.pop(vf_pid, None)
+            continue
+
+        vf_new_snapshots[vf_script_id] = {
+            'pid': vf_pid,
+            'sampled_at': time.time(),
+            'cpu_percent': vf_totals['cpu_percent'],
+            'memory_mb': vf_totals['rss'] / 1024 / 1024,
+            'pss_mb': vf_totals['pss'] / 1024 / 1024,
+            'num_threads': vf_totals['num_threads'],
+            'num_fds': vf_totals['num_fds'],
+            'num_processes': vf_totals['num_processes']
+        }
+
+    # Forget processes that are no longer supervised or tracked
+    for vf_pid in list(vg_proc_cache.keys()):
+        if vf_pid not in vg_trees and vf_pid not in vg_owner:
+            del vg_proc_cache[vf_pid]
+            vg_pss_cache.pop(vf_pid, None)
+
+    # Swap the whole dict so readers never see a half-built pass
+    vg_snapshots = vf_new_snapshots
+
+    vg_stats['passes'] += 1
+    vg_stats['last_pass_ms'] = round((time.monotonic() - vf_started) * 1000, 3)
+
+    if vg_sample_callback:
+        try:
+            vg_sample_callback(vf_new_snapshots)
+        except Exception as vf_error:
+            print(f"Metrics sample callback error: {vf_error}")
+
+def vf_get_snapshot(vf_script_id, vf_pid=None):
+    """Get the latest snapshot for a script, None if not sampled yet"""
+    vf_snapshot = vg_snapshots.get(vf_script_id)
+    if vf_snapshot is None:
+        return None
+
+    # Ignore a snapshot of a previous incarnation of the script
+    if vf_pid is not None and vf_snapshot['pid'] != vf_pid:
+        return None
+
+    return vf_snapshot
+
+def vf_get_stats():
+    """Get sampler timing metrics"""
+    return {
+        'running': vg_running,
+        'interval': vg_interval,
+        'sampled_scripts': len(vg_snapshots),
+        'tracked_descendants': len(vg_owner),
+        'passes': vg_stats['passes'],
+        'last_pass_ms': vg_stats['last_pass_ms']
+    }
@@ -1,19 +1,37 @@
 import subprocess
-import psutil
-import json
 import os
 import sys
 import time
 import signal
 from datetime import datetime
-import threading
 import re
+import random
+
+import py_reaper
+import py_scheduler
+import py_metrics
+import py_timeseries
+import py_limits
+import py_logpipe
+import py_logrotate
+import py_logsearch
+import py_logger
+import py_serve
+import py_registry
+import py_configstore
+import py_adopt
 
 # Global variables
-vg_processes = {}  # Dictionary to store running processes
+vg_processes = py_registry.vg_processes  # Running processes, changed only through py_registry
 vg_config = None   # Configuration data
 vg_restart_attempts = {}  # Track restart attempts
+vg_restart_state = {}  # Pending restart timer or quarantine per script
+vg_last_exit = {}  # Reason and code of each script's last unplanned exit
 vg_log_callback = None # Callback for log updates
+vg_config_version = 0  # Bumped on every config load or change
+vg_log_stats = {}  # Log ingestion counters per script as of the last sampler pass
+vg_log_stats_pass = 0  # Bumped whenever vg_log_stats is replaced
+vg_initialized = False
 
 # Fix path for script execution
 vg_base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -22,75 +40,67 @@ def vf_set_log_callback(callback):
     """Set callback for log updates"""
     global vg_log_callback
     vg_log_callback = callback
+    py_logpipe.vf_set_log_callback(callback)
 
 def vf_strip_ansi(text):
     """Remove ANSI escape sequences from text"""
     ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
     return ansi_escape.sub('', text)
 
-def vf_log_worker(pipe, log_file, script_id):
-    """Read from pipe and write to log file"""
-    try:
-        for line in pipe:
-            # clean_line = vf_strip_ansi(line)
-            log_file.write(line)
-            log_file.flush()
-            
-            # Emit log update if callback is set
-            if vg_log_callback:
-                try:
-                    vg_log_callback(script_id, line)
-                except Exception:
-                    pass
-                    
-    except ValueError:
-        pass  # File likely closed
-    except Exception as e:
-        print(f"Log worker error: {e}")
+def vf_init():
+    """Load the configuration and install signal handlers (idempotent)
+
+    Nothing happens at import time, entry points call this once.
+    """
+    global vg_initialized
+    if vg_initialized:
+        return True
+    if not vf_load_config():
+        return False
+    
+    py_serve.vf_set_signal_handler(signal.SIGINT, vf_signal_handler)
+    py_serve.vf_set_signal_handler(signal.SIGTERM, vf_signal_handler)
+    if hasattr(signal, 'SIGUSR2'):
+        py_serve.vf_set_signal_handler(signal.SIGUSR2, vf_signal_handler)
+    vg_initialized = True
+    return True
 
 def vf_load_config():
     """Load configuration from config.json"""
-    global vg_config
-    vf_config_path = os.path.join(os.path.dirname(__file__), 'config.json')
-    
-    # Check if config exists, if not try to copy from example
-    if not os.path.exists(vf_config_path):
-        vf_example_path = os.path.join(os.path.dirname(__file__), 'config.example.json')
-        if os.path.exists(vf_example_path):
-            try:
-                import shutil
-                shutil.copy(vf_example_path, vf_config_path)
-                print(f"Created config.json from config.example.json")
-            except Exception as e:
-                print(f"Error creating config from example: {e}")
+    return py_configstore.vf_load() is not None
 
-    try:
-        with open(vf_config_path, 'r') as vf_file:
-            vg_config = json.load(vf_file)
-            return True
-    except Exception as vf_error:
-        print(f"Error loading config: {vf_error}")
-        return False
+def vf_on_config_change(vf_config):
+    """Adopt a configuration loaded or changed in py_configstore"""
+    global vg_config, vg_config_version
+    vg_config = vf_config
+    vg_config_version += 1
+    py_registry.vf_load(vg_config['scripts'])
 
-def vf_start_script(vf_script_id):
+def vf_get_script_config(vf_script_id):
+    """Configuration entry of a script, None if unknown"""
+    return py_registry.vf_get(vf_script_id)
+
+def vf_start_script(vf_script_id, vf_reset_attempts=True):
     """Start a Python script by its ID"""
-    global vg_processes
-    
-    # Find script configuration
-    vf_script_config = None
-    for vf_script in vg_config['scripts']:
-        if vf_script['id'] == vf_script_id:
-            vf_script_config = vf_script
-            break
+    # A manual start overrides any pending restart or quarantine
+    if vf_reset_attempts:
+        vf_cancel_restart(vf_script_id)
     
+    vf_script_config = py_registry.vf_get(vf_script_id)
     if not vf_script_config:
         return {"success": False, "error": "Script ID not found"}
     
     if not vf_script_config['enabled']:
         return {"success": False, "error": "Script is disabled"}
     
+    # Concurrent starts of one script (API, bulk job, restart timer) run one at a time
+    with py_registry.vf_get_script_lock(vf_script_id):
+        return vf_spawn_script(vf_script_id, vf_script_config, vf_reset_attempts)
+
+def vf_spawn_script(vf_script_id, vf_script_config, vf_reset_attempts):
+    """Launch a script's process, called with the script's start lock held"""
     # Check if already running
-    if vf_script_id in vg_processes and vf_is_process_running(vf_script_id):
+    if vf_is_process_running(vf_script_id):
         return {"success": False, "error": "Script already running"}
     
     # Prepare command with proper path handling
@@ -119,7 +129,6 @@ def vf_start_script(vf_script_id):
     os.makedirs(vf_log_dir, exist_ok=True)
     
     vf_log_path = os.path.join(vf_log_dir, vf_script_config['log_file'])
-    vf_log_file = open(vf_log_path, 'a', encoding='utf-8')
     
     try:
         # Start process with proper working directory
@@ -132,38 +141,69 @@ def vf_start_script(vf_script_id):
         vf_env['FORCE_COLOR'] = '1'
         vf_env['LOGURU_COLORIZE'] = 'true'
         vf_env['TERM'] = 'xterm-256color'
+        
+        # Set up the child's cgroup (joined below) or rlimits applied before exec
+        vf_preexec = py_limits.vf_prepare(vf_script_id, vf_script_config)
 
-        vf_process = subprocess.Popen(
-            vf_cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            cwd=vf_working_dir,  # Set working directory based on path type
-            env=vf_env,
-            text=True,
-            encoding='utf-8',
-            errors='replace',
-            bufsize=1
-        )
+        # Adoptable children get a named pipe and their own session so
+        # they survive the manager (see py_adopt)
+        if py_adopt.vg_enabled:
+            vf_child_fd, vf_output = py_adopt.vf_open_output(vf_script_id)
+        else:
+            vf_child_fd, vf_output = subprocess.PIPE, None
+
+        try:
+            vf_process = subprocess.Popen(
+                vf_cmd,
+                stdout=vf_child_fd,
+                stderr=subprocess.STDOUT,
+                cwd=vf_working_dir,  # Set working directory based on path type
+                env=vf_env,
+                bufsize=0,  # Raw pipe, py_logpipe reads it in large chunks
+                preexec_fn=vf_preexec,
+                start_new_session=vf_output is not None
+            )
+        except BaseException:
+            if vf_output is not None:
+                vf_output.close()
+            raise
+        finally:
+            if vf_output is not None:
+                os.close(vf_child_fd)
+        
+        if not py_limits.vf_attach(vf_script_id, vf_process.pid):
+            # Never leave it running unconfined
+            vf_process.kill()
+            vf_process.wait()
+            if vf_output is not None:
+                vf_output.close()
+                py_adopt.vf_remove_output(vf_script_id)
+            elif vf_process.stdout is not None:
+                vf_process.stdout.close()
+            return {"success": False, "error": f"Failed to apply resource limits to {vf_script_id}"}
+        
+        vf_start_time = datetime.now().isoformat()
+        py_adopt.vf_record(vf_script_id, vf_process.pid, vf_cmd, vf_start_time)
         
-        # Start log processing thread
-        vf_log_thread = threading.Thread(
-            target=vf_log_worker,
-            args=(vf_process.stdout, vf_log_file, vf_script_id),
-            daemon=True
-        )
-        vf_log_thread.start()
+        # Start log ingestion; the reader closes the log file at EOF
+        vf_log_writer = py_logpipe.vf_start_reader(vf_script_id, vf_process.stdout if vf_output is None else vf_output, vf_log_path)
         
         # Store process info
-        vg_processes[vf_script_id] = {
+        py_registry.vf_set_process(vf_script_id, {
             'process': vf_process,
             'pid': vf_process.pid,
-            'start_time': datetime.now().isoformat(),
-            'log_file': vf_log_file,
+            'start_time': vf_start_time,
+            'started_monotonic': time.monotonic(),
+            'log_writer': vf_log_writer,
             'config': vf_script_config
-        }
+        })
+        
+        # Report the exit to the supervisor as soon as it happens
+        py_reaper.vf_watch_process(vf_script_id, vf_process)
         
         # Reset restart attempts
-        vg_restart_attempts[vf_script_id] = 0
+        if vf_reset_attempts:
+            vg_restart_attempts[vf_script_id] = 0
         
         return {
             "success": True, 
@@ -172,41 +212,91 @@ def vf_start_script(vf_script_id):
         }
         
     except Exception as vf_error:
-        vf_log_file.close()
         return {"success": False, "error": str(vf_error)}
 
 def vf_stop_script(vf_script_id, vf_timeout=10):
     """Stop a running Python script"""
-    global vg_processes
+    return vf_stop_scripts([vf_script_id], vf_timeout)[vf_script_id]
+
+def vf_stop_scripts(ag_script_ids, vf_timeout=10, vf_progress=None):
+    """Stop several scripts together, returns {script_id: result}
+
+    SIGTERM goes to every target at once and all of them share one
+    deadline, after which the survivors get SIGKILL in a single pass, so
+    stopping N stuck scripts takes vf_timeout rather than N * vf_timeout.
+    vf_progress(script_id, result) is called as each script finishes.
+    """
+    vf_results = {}
+    vf_stopping = {}
     
-    if vf_script_id not in vg_processes:
-        return {"success": False, "error": "Script not in process list"}
+    def vf_finish(vf_script_id, vf_result):
+        vf_results[vf_script_id] = vf_result
+        if vf_progress is not None:
+            vf_progress(vf_script_id, vf_result)
     
-    vf_process_info = vg_processes[vf_script_id]
-    vf_process = vf_process_info['process']
+    for vf_script_id in ag_script_ids:
+        # A stopped script must not come back through a pending restart
+        vf_cancel_restart(vf_script_id)
+        
+        vf_process_info = py_registry.vf_get_process(vf_script_id)
+        if vf_process_info is None:
+            vf_finish(vf_script_id, {"success": False, "error": "Script not in process list"})
+            continue
+        
+        try:
+            # Mark as stopping so the reaper does not treat the exit as a crash
+            vf_process_info['stopping'] = True
+            
+            # Try graceful termination first
+            vf_process_info['process'].terminate()
+            vf_stopping[vf_script_id] = vf_process_info['process']
+        except Exception as vf_error:
+            vf_finish(vf_script_id, {"success": False, "error": str(vf_error)})
     
-    try:
-        # Try graceful termination first
-        vf_process.terminate()
+    # Wait for all of them against one deadline, polling less often as time passes
+    vf_deadline = time.monotonic() + vf_timeout
+    vf_delay = 0.01
+    while vf_stopping:
+        for vf_script_id, vf_process in list(vf_stopping.items()):
+            if vf_process.poll() is not None:
+                del vf_stopping[vf_script_id]
+                vf_finish(vf_script_id, vf_release_stopped(vf_script_id))
         
-        # Wait for process to terminate
+        vf_remaining = vf_deadline - time.monotonic()
+        if not vf_stopping or vf_remaining <= 0:
+            break
+        time.sleep(min(vf_delay, vf_remaining))
+        vf_delay = min(vf_delay * 2, 0.2)
+    
+    # Force kill whatever ignored SIGTERM, all in one pass
+    for vf_process in vf_stopping.values():
         try:
-            vf_process.wait(timeout=vf_timeout)
-        except subprocess.TimeoutExpired:
-            # Force kill if timeout
             vf_process.kill()
+        except OSError:
+            pass
+    
+    for vf_script_id, vf_process in vf_stopping.items():
+        try:
             vf_process.wait()
-        
-        # Close log file
-        vf_process_info['log_file'].close()
-        
-        # Remove from process list
-        del vg_processes[vf_script_id]
-        
-        return {"success": True, "message": f"Script {vf_script_id} stopped"}
-        
-    except Exception as vf_error:
-        return {"success": False, "error": str(vf_error)}
+            vf_finish(vf_script_id, vf_release_stopped(vf_script_id))
+        except Exception as vf_error:
+            vf_finish(vf_script_id, {"success": False, "error": str(vf_error)})
+    
+    return vf_results
+
+def vf_release_stopped(vf_script_id):
+    """Clean up after a stopped script exited"""
+    # Kill leftover descendants and drop the script's cgroup
+    py_limits.vf_release(vf_script_id)
+    
+    # Before the entry goes, so a new instance's pipe is never the one removed
+    py_adopt.vf_remove_output(vf_script_id)
+    
+    # Remove from process list
+    if py_registry.vf_pop_process(vf_script_id) is not None:
+        py_adopt.vf_forget(vf_script_id)
+    
+    return {"success": True, "message": f"Script {vf_script_id} stopped"}
 
 def vf_restart_script(vf_script_id):
     """Restart a Python script"""
@@ -220,115 +310,312 @@ def vf_restart_script(vf_script_id):
 
 def vf_is_process_running(vf_script_id):
     """Check if a process is still running"""
-    if vf_script_id not in vg_processes:
-        return False
-    
-    vf_process = vg_processes[vf_script_id]['process']
-    return vf_process.poll() is None
+    vf_process_info = py_registry.vf_get_process(vf_script_id)
+    return vf_process_info is not None and vf_process_info['process'].poll() is None
 
 def vf_get_process_info(vf_script_id):
     """Get detailed information about a running process"""
-    if vf_script_id not in vg_processes:
-        return None
-    
-    if not vf_is_process_running(vf_script_id):
+    vf_process_info = py_registry.vf_get_process(vf_script_id)
+    if vf_process_info is None or vf_process_info['process'].poll() is not None:
         return None
     
-    vf_process_info = vg_processes[vf_script_id]
     vf_pid = vf_process_info['pid']
     
-    try:
-        vf_psutil_process = psutil.Process(vf_pid)
-        
-        return {
-            'pid': vf_pid,
-            'status': 'running',
-            'start_time': vf_process_info['start_time'],
-            'cpu_percent': vf_psutil_process.cpu_percent(interval=0.1),
-            'memory_mb': vf_psutil_process.memory_info().rss / 1024 / 1024,
-            'num_threads': vf_psutil_process.num_threads()
-        }
-    except psutil.NoSuchProcess:
-        return None
+    # Read the sampler's latest snapshot instead of sampling here
+    vf_snapshot = py_metrics.vf_get_snapshot(vf_script_id, vf_pid) or {}
+    
+    return {
+        'pid': vf_pid,
+        'status': 'running',
+        'start_time': vf_process_info['start_time'],
+        'cpu_percent': vf_snapshot.get('cpu_percent', 0.0),
+        'memory_mb': vf_snapshot.get('memory_mb', 0.0),
+        'num_threads': vf_snapshot.get('num_threads', 0),
+        'pss_mb': vf_snapshot.get('pss_mb', 0.0),
+        'num_fds': vf_snapshot.get('num_fds', 0),
+        'num_processes': vf_snapshot.get('num_processes', 1),
+        'adopted': vf_process_info.get('adopted', False),
+        'log_stats': vg_log_stats.get(vf_script_id)
+    }
 
-def vf_monitor_processes():
-    """Monitor all processes and handle auto-restarts"""
-    global vg_restart_attempts
+def vf_get_sample_targets():
+    """Map of supervised script IDs to PIDs for the metrics sampler"""
+    return {vf_script_id: vf_info['pid'] for vf_script_id, vf_info in py_registry.vf_process_items()}
+
+def vf_get_log_targets():
+    """Map of configured script IDs to their log file paths"""
+    vf_log_dir = os.path.join(os.path.dirname(__file__), 'logs')
+    return {
+        vf_script['id']: os.path.join(vf_log_dir, vf_script['log_file'])
+        for vf_script in py_registry.vf_list() if vf_script.get('log_file')
+    }
+
+def vf_handle_process_exit(vf_script_id, vf_process):
+    """Handle a child exit reported by the reaper and apply auto-restart"""
+    # Holding the start lock keeps a new instance from starting until the
+    # old one's cgroup is released
+    with py_registry.vf_get_script_lock(vf_script_id):
+        vf_handle_exit_locked(vf_script_id, vf_process)
+
+def vf_handle_exit_locked(vf_script_id, vf_process):
+    """Clean up after an exit and schedule the restart, with the start lock held"""
+    vf_process_info = py_registry.vf_get_process(vf_script_id)
+    
+    # Ignore exits of replaced processes and of scripts being stopped
+    if not vf_process_info or vf_process_info['process'] is not vf_process:
+        return
+    if vf_process_info.get('stopping'):
+        return
+    
+    vf_config = vf_process_info['config']
+    vf_uptime = time.monotonic() - vf_process_info['started_monotonic']
+    
+    # Classify the exit before the cgroup and its OOM counter go away
+    vf_reason = py_limits.vf_exit_reason(vf_script_id, vf_process.returncode)
+    vg_last_exit[vf_script_id] = {'reason': vf_reason, 'code': vf_process.returncode}
+    py_limits.vf_release(vf_script_id)
+    
+    if vf_reason == 'oom_killed':
+        print(f"{vf_script_id} was OOM-killed (limit {vf_config.get('max_memory_mb')} MB)")
+    
+    # Clean up dead process entry (the log reader closes its file at EOF)
+    py_registry.vf_pop_process(vf_script_id, vf_process)
+    py_adopt.vf_forget(vf_script_id)
+    py_adopt.vf_remove_output(vf_script_id)
     
-    ag_dead_processes = []
+    # Check if auto-restart is enabled
+    if vf_config.get('auto_restart', False):
+        vf_schedule_restart(vf_script_id, vf_uptime, vf_reason)
+
+def vf_schedule_restart(vf_script_id, vf_uptime, vf_reason='exited'):
+    """Schedule an auto-restart with exponential backoff, or quarantine"""
+    vf_settings = vg_config['manager_settings']
+    
+    # Restarting into the same memory limit may just loop on OOM kills
+    if vf_reason == 'oom_killed' and not vf_settings.get('auto_restart_on_oom', True):
+        print(f"Not restarting {vf_script_id} after OOM kill, quarantined")
+        vg_restart_state[vf_script_id] = {'state': 'quarantined', 'timer': None}
+        return
+    
+    vf_max_attempts = vf_settings['auto_restart_max_attempts']
+    vf_base_delay = vf_settings['auto_restart_delay_seconds']
+    vf_max_delay = vf_settings.get('auto_restart_max_delay_seconds', 300)
+    vf_reset_window = vf_settings.get('auto_restart_reset_seconds', 60)
+    vf_jitter = vf_settings.get('auto_restart_jitter', 0.2)
+    
+    # A script that stayed healthy long enough starts a fresh backoff
+    if vf_uptime >= vf_reset_window:
+        vg_restart_attempts[vf_script_id] = 0
+    
+    vf_attempt = vg_restart_attempts.get(vf_script_id, 0) + 1
+    
+    if vf_attempt > vf_max_attempts:
+        print(f"Max restart attempts reached for {vf_script_id}, quarantined")
+        vg_restart_state[vf_script_id] = {'state': 'quarantined', 'timer': None}
+        return
+    
+    vg_restart_attempts[vf_script_id] = vf_attempt
+    
+    vf_delay = min(vf_max_delay, vf_base_delay * (2 ** (vf_attempt - 1)))
+    vf_delay *= random.uniform(1 - vf_jitter, 1 + vf_jitter)
+    
+    print(f"Auto-restarting {vf_script_id} in {vf_delay:.1f}s (attempt {vf_attempt})")
+    vg_restart_state[vf_script_id] = {
+        'state': 'scheduled',
+        'timer': py_scheduler.vf_call_later(vf_delay, vf_run_scheduled_restart, vf_script_id)
+    }
+
+def vf_run_scheduled_restart(vf_script_id):
+    """Timer callback: start a script whose backoff delay has elapsed"""
+    vg_restart_state.pop(vf_script_id, None)
+    
+    vf_result = vf_start_script(vf_script_id, vf_reset_attempts=False)
+    if not vf_result['success']:
+        print(f"Auto-restart of {vf_script_id} failed: {vf_result.get('error')}")
+
+def vf_cancel_restart(vf_script_id):
+    """Cancel a pending restart and clear quarantine for a script"""
+    vf_state = vg_restart_state.pop(vf_script_id, None)
+    if vf_state:
+        py_scheduler.vf_cancel(vf_state['timer'])
+
+def vf_get_restart_info(vf_script_id):
+    """Get restart state and next-restart ETA for a script"""
+    vf_state = vg_restart_state.get(vf_script_id)
+    vf_eta = py_scheduler.vf_seconds_until(vf_state['timer']) if vf_state else None
+    vf_last_exit = vg_last_exit.get(vf_script_id, {})
     
-    # Check each process
-    for vf_script_id in list(vg_processes.keys()):
-        if not vf_is_process_running(vf_script_id):
-            ag_dead_processes.append(vf_script_id)
+    return {
+        'restart_attempts': vg_restart_attempts.get(vf_script_id, 0),
+        'restart_state': vf_state['state'] if vf_state else None,
+        'next_restart_eta': round(vf_eta, 1) if vf_eta is not None else None,
+        'last_exit_reason': vf_last_exit.get('reason'),
+        'last_exit_code': vf_last_exit.get('code')
+    }
+
+def vf_monitor_processes():
+    """Sweep all processes once and handle any that have exited"""
+    for vf_script_id, vf_process_info in py_registry.vf_process_items():
+        if vf_process_info['process'].poll() is not None:
+            vf_handle_process_exit(vf_script_id, vf_process_info['process'])
+
+def vf_adopt_children():
+    """Take over children left running by a previous manager, returns how many"""
+    vf_log_dir = os.path.join(os.path.dirname(__file__), 'logs')
+    vf_count = 0
     
-    # Handle dead processes
-    for vf_script_id in ag_dead_processes:
-        vf_config = vg_processes[vf_script_id]['config']
+    for vf_script_id, vf_process, vf_output, vf_entry in py_adopt.vf_collect(py_registry.vf_exists):
+        vf_script_config = py_registry.vf_get(vf_script_id)
         
-        # Clean up dead process entry
-        vg_processes[vf_script_id]['log_file'].close()
-        del vg_processes[vf_script_id]
+        vf_log_writer = None
+        if vf_output is not None:
+            vf_log_path = os.path.join(vf_log_dir, vf_script_config['log_file'])
+            vf_log_writer = py_logpipe.vf_start_reader(vf_script_id, vf_output, vf_log_path)
         
-        # Check if auto-restart is enabled
-        if vf_config.get('auto_restart', False):
-            vf_max_attempts = vg_config['manager_settings']['auto_restart_max_attempts']
-            vf_current_attempts = vg_restart_attempts.get(vf_script_id, 0)
-            
-            if vf_current_attempts < vf_max_attempts:
-                print(f"Auto-restarting {vf_script_id} (attempt {vf_current_attempts + 1})")
-                vg_restart_attempts[vf_script_id] = vf_current_attempts + 1
-                
-                # Wait before restart
-                time.sleep(vg_config['manager_settings']['auto_restart_delay_seconds'])
-                vf_start_script(vf_script_id)
-            else:
-                print(f"Max restart attempts reached for {vf_script_id}")
+        py_limits.vf_adopt(vf_script_id)
+        py_registry.vf_set_process(vf_script_id, {
+            'process': vf_process,
+            'pid': vf_process.pid,
+            'start_time': vf_entry.get('start_time') or datetime.now().isoformat(),
+            # Uptime counts from the original start for the restart backoff
+            'started_monotonic': time.monotonic() - max(0, time.time() - vf_entry['create_time']),
+            'log_writer': vf_log_writer,
+            'config': vf_script_config,
+            'adopted': True
+        })
+        vf_count += 1
+    
+    if vf_count:
+        print(f"Adopted {vf_count} running scripts from the previous manager")
+        py_logger.vf_write_manager_log('INFO', f"Adopted {vf_count} running scripts")
+    return vf_count
+
+def vf_start_supervisor():
+    """Start exit supervision and metrics sampling for all child processes"""
+    vf_settings = vg_config['manager_settings']
+    
+    py_configstore.vf_configure(vf_settings)
+    py_logpipe.vf_configure(vf_settings)
+    py_logrotate.vf_configure(vf_settings)
+    py_logsearch.vf_configure(vf_settings)
+    py_logsearch.vf_start_indexer(vf_get_log_targets().values())
+    vf_limits_mode = py_limits.vf_configure(vf_settings.get('resource_limits_mode', 'auto'))
+    print(f"Resource limits: {vf_limits_mode}")
+    py_adopt.vf_configure(vf_settings)
+    vf_adopt_children()
+    
+    # Keep metrics history, optionally persisted on memory-mapped files
+    if vf_settings.get('metrics_history_persist', False):
+        py_timeseries.vf_configure(os.path.join(os.path.dirname(__file__), 'logs', 'metrics'))
+    
+    py_metrics.vf_set_target_provider(vf_get_sample_targets)
+    py_metrics.vf_set_sample_callback(vf_handle_sample)
+    py_metrics.vf_start(vf_settings.get('metrics_interval_seconds', 2))
+    
+    py_reaper.vf_set_exit_callback(vf_handle_process_exit)
+    vf_mode = py_reaper.vf_start(
+        vf_settings.get('supervisor_mode', 'auto'),
+        vf_settings.get('check_interval_seconds', 5)
+    )
+    
+    # Watch children started before the supervisor was running
+    for vf_script_id, vf_process_info in py_registry.vf_process_items():
+        py_reaper.vf_watch_process(vf_script_id, vf_process_info['process'])
+    
+    # Catch anything that exited while nothing was watching
+    vf_monitor_processes()
+    
+    return vf_mode
 
 def vf_get_all_status():
     """Get status of all configured scripts"""
-    ag_status = []
-
-    for vf_script in vg_config['scripts']:
-        vf_script_id = vf_script['id']
-        vf_status = {
-            'id': vf_script_id,
-            'name': vf_script['name'],
-            'enabled': vf_script['enabled'],
-            'path': vf_script['path'],
-            'group': vf_script.get('group', 'Default'),
-            'args': vf_script.get('args', []),
-            'auto_restart': vf_script.get('auto_restart', True),
-            'interpreter': vf_script.get('interpreter'),
-            'max_memory_mb': vf_script.get('max_memory_mb', 512)
-        }
+    return [vf_build_status(vf_script) for vf_script in py_registry.vf_list()]
 
-        if vf_is_process_running(vf_script_id):
-            vf_process_info = vf_get_process_info(vf_script_id)
-            vf_status.update(vf_process_info)
-        else:
-            vf_status['status'] = 'stopped'
-            vf_status['restart_attempts'] = vg_restart_attempts.get(vf_script_id, 0)
+def vf_get_script_status(vf_script_id):
+    """Get status of one configured script, None if unknown"""
+    vf_script = py_registry.vf_get(vf_script_id)
+    return vf_build_status(vf_script) if vf_script else None
+
+def vf_build_status(vf_script):
+    """Status entry of a script configuration"""
+    vf_script_id = vf_script['id']
+    vf_status = {
+        'id': vf_script_id,
+        'name': vf_script['name'],
+        'enabled': vf_script['enabled'],
+        'path': vf_script['path'],
+        'group': vf_script.get('group', 'Default'),
+        'args': vf_script.get('args', []),
+        'auto_restart': vf_script.get('auto_restart', True),
+        'interpreter': vf_script.get('interpreter'),
+        'max_memory_mb': vf_script.get('max_memory_mb', 512)
+    }
 
-        ag_status.append(vf_status)
+    vf_process_info = vf_get_process_info(vf_script_id)
+    if vf_process_info:
+        vf_status.update(vf_process_info)
+    else:
+        vf_status['status'] = 'stopped'
+        vf_status.update(vf_get_restart_info(vf_script_id))
 
-    return ag_status
+    return vf_status
 
-def vf_cleanup():
-    """Clean up all processes before exit"""
-    print("Cleaning up processes...")
+def vf_handle_sample(vf_snapshots):
+    """Sampler pass done: record metrics history and take the log counters with it"""
+    global vg_log_stats, vg_log_stats_pass
+    vg_log_stats = py_logpipe.vf_get_stats()
+    vg_log_stats_pass += 1
+    py_timeseries.vf_record_snapshots(vf_snapshots)
+
+def vf_get_status_version():
+    """Cheap value that changes whenever vf_get_all_status() can change
+
+    Built from the registry version (config loads and process changes),
+    the sampler pass count and the log counter snapshot (CPU, memory and
+    log figures only change per pass),
+    exited processes not reaped yet and the restart state. A pending
+    restart adds the current second since its ETA counts down.
+    """
+    vf_version = [
+        py_registry.vf_get_version(),
+        py_metrics.vg_stats['passes'],
+        vg_log_stats_pass,
+        tuple(vf_script_id for vf_script_id, vf_info in py_registry.vf_process_items() if vf_info['process'].returncode is not None),
+        tuple((vf_script_id, vf_state['state']) for vf_script_id, vf_state in list(vg_restart_state.items())),
+        tuple(list(vg_restart_attempts.items())),
+        tuple((vf_script_id, vf_exit['reason'], vf_exit['code']) for vf_script_id, vf_exit in list(vg_last_exit.items()))
+    ]
+    if any(vf_state['state'] == 'scheduled' for vf_state in list(vg_restart_state.values())):
+        vf_version.append(int(time.monotonic()))
+    return tuple(vf_version)
+
+def vf_cleanup(vf_stop_children=True):
+    """Clean up all processes before exit
+
+    With vf_stop_children=False (and adoption enabled) the scripts keep
+    running for the next manager to adopt.
+    """
+    if vf_stop_children or not py_adopt.vg_enabled:
+        print("Cleaning up processes...")
+        vf_stop_scripts(py_registry.vf_running_ids())
+    else:
+        print(f"Leaving {len(py_registry.vf_running_ids())} scripts running for the next manager")
+        py_logpipe.vf_close_all()
     
-    for vf_script_id in list(vg_processes.keys()):
-        vf_stop_script(vf_script_id)
+    py_timeseries.vf_flush()
+    py_configstore.vf_flush()
+    py_logger.vf_flush_manager_log()
 
 # Signal handler for clean shutdown
+vg_shutting_down = False
+
 def vf_signal_handler(vf_signum, vf_frame):
-    vf_cleanup()
+    global vg_shutting_down
+    if vg_shutting_down:
+        return  # A second SIGINT/SIGTERM must not interrupt the cleanup
+    vg_shutting_down = True
+    # SIGUSR2 exits for an upgrade or restart, the scripts stay up
+    vf_cleanup(vf_stop_children=vf_signum != getattr(signal, 'SIGUSR2', None))
     exit(0)
 
-# Register signal handlers
-signal.signal(signal.SIGINT, vf_signal_handler)
-signal.signal(signal.SIGTERM, vf_signal_handler)
-
-# Initialize configuration on module load
-vf_load_config()
\ No newline at end of file
+py_configstore.vf_set_listener(vf_on_config_change)
\ No newline at end of file
@@ -0,0 +1,230 @@
+"""Child exit reaper for Python Manager
+
+Learns about child exits as they happen instead of polling every
+process on a fixed interval. On Linux 5.3+ each child gets a pidfd that
+is watched by a single selector thread; elsewhere the reaper falls back
+to a polling loop over the watched processes.
+
+The exit time itself cannot be read back from the kernel, so the stats
+report what is measurable: the dispatch delay from noticing an exit to
+handing it to the callback, and in poll mode the detection window, the
+time since the process was last seen alive (an upper bound on how late
+the exit was noticed). With pidfds the selector wakes at the exit, so
+there is no window to report.
+"""
+
+import os
+import selectors
+import threading
+import time
+
+# Global variables
+vg_exit_callback = None  # Called as callback(script_id, process) on exit
+vg_mode = None           # 'pidfd' or 'poll' once started
+vg_poll_interval = 5
+vg_thread = None
+vg_running = False
+vg_lock = threading.Lock()
+vg_selector = None
+vg_wake_read = None
+vg_wake_write = None
+vg_watches = {}          # pidfd (or pid in poll mode) -> watch dict
+vg_stats = {
+    'exits_detected': 0,
+    'last_dispatch_ms': None,
+    'max_dispatch_ms': 0.0,
+    'total_dispatch_ms': 0.0,
+    'last_window_ms': None,
+    'max_window_ms': 0.0
+}
+
+# Global arrays
+ag_pending_watches = []  # Watches queued for registration by the reaper thread
+
+def vf_set_exit_callback(callback):
+    """Set callback for child exits"""
+    global vg_exit_callback
+    vg_exit_callback = callback
+
+def vf_pidfd_supported():
+    """Check if pidfd_open is usable on this platform"""
+    if not hasattr(os, 'pidfd_open'):
+        return False
+
+    try:
+        vf_fd = os.pidfd_open(os.getpid())
+        os.close(vf_fd)
+        return True
+    except OSError:
+        return False
+
+def vf_start(vf_mode='auto', vf_poll_interval=5):
+    """Start the reaper thread (idempotent)"""
+    global vg_mode, vg_poll_interval, vg_thread, vg_running
+    global vg_selector, vg_wake_read, vg_wake_write
+
+    if vg_running:
+        return vg_mode
+
+    if vf_mode == 'auto':
+        vf_mode = 'pidfd' if vf_pidfd_supported() else 'poll'
+    elif vf_mode == 'pidfd' and not vf_pidfd_supported():
+        print("pidfd not supported on this platform, falling back to polling")
+        vf_mode = 'poll'
+
+    vg_mode = vf_mode
+    vg_poll_interval = vf_poll_interval
+
+    if vg_mode == 'pidfd':
+        vg_selector = selectors.DefaultSelector()
+        vg_wake_read, vg_wake_write = os.pipe()
+        os.set_blocking(vg_wake_read, False)
+        os.set_blocking(vg_wake_write, False)
+        vg_selector.register(vg_wake_read, selectors.EVENT_READ, None)
+        vf_target = vf_pidfd_loop
+    else:
+        vf_target = vf_poll_loop
+
+    vg_running = True
+    vg_thread = threading.Thread(target=vf_target, name='py-reaper', daemon=True)
+    vg_thread.start()
+    return vg_mode
+
+def vf_stop():
+    """Stop the reaper thread"""
+    global vg_running
+    vg_running = False
+    vf_wake()
+
+def vf_wake():
+    """Wake the reaper thread so it picks up pending watches"""
+    if vg_wake_write is None:
+        return
+
+    try:
+        os.write(vg_wake_write, b'\0')
+    except (BlockingIOError, OSError):
+        pass  # Pipe already full, reaper will wake anyway
+
+def vf_watch_process(vf_script_id, vf_process):
+    """Register a child process to be reported when it exits"""
+    if not vg_running:
+        return  # Not started yet, vf_start callers watch existing children
+
+    vf_watch = {
+        'script_id': vf_script_id,
+        'process': vf_process,
+        'fd': None,
+        'last_alive': time.monotonic()
+    }
+
+    if vg_mode == 'pidfd':
+        try:
+            vf_watch['fd'] = os.pidfd_open(vf_process.pid)
+        except OSError:
+            # Child already gone and reaped, report it right away
+            vf_dispatch_exit(vf_watch, time.monotonic())
+            return
+
+    with vg_lock:
+        ag_pending_watches.append(vf_watch)
+
+    vf_wake()
+
+def vf_register_pending():
+    """Move queued watches into the active table (reaper thread only)"""
+    with vg_lock:
+        af_pending = ag_pending_watches[:]
+        del ag_pending_watches[:]
+
+    for vf_watch in af_pending:
+        if vg_mode == 'pidfd':
+            vg_selector.register(vf_watch['fd'], selectors.EVENT_READ, vf_watch)
+            vg_watches[vf_watch['fd']] = vf_watch
+        else:
+            vg_watches[vf_watch['process'].pid] = vf_watch
+
+def vf_dispatch_exit(vf_watch, vf_noticed_at):
+    """Record the dispatch delay and hand the exit to the callback"""
+    vf_dispatch_ms = (time.monotonic() - vf_noticed_at) * 1000
+
+    vg_stats['exits_detected'] += 1
+    vg_stats['last_dispatch_ms'] = round(vf_dispatch_ms, 3)
+    vg_stats['total_dispatch_ms'] += vf_dispatch_ms
+    vg_stats['max_dispatch_ms'] = max(vg_stats['max_dispatch_ms'], vf_dispatch_ms)
+
+    if vg_exit_callback:
+        try:
+            vg_exit_callback(vf_watch['script_id'], vf_watch['process'])
+        except Exception as vf_error:
+            print(f"Reaper callback error for {vf_watch['script_id']}: {vf_error}")
+
+def vf_pidfd_loop():
+    """Wait on all pidfds at once and dispatch exits as they happen"""
+    while vg_running:
+        try:
+            ag_events = vg_selector.select()
+        except OSError as vf_error:
+            print(f"Reaper select error: {vf_error}")
+            time.sleep(1)
+            continue
+
+        vf_noticed_at = time.monotonic()
+
+        for vf_key, vf_mask in ag_events:
+            if vf_key.data is None:
+                # Wake pipe: drain it, new watches are registered below
+                try:
+                    while os.read(vg_wake_read, 4096):
+                        pass
+                except BlockingIOError:
+                    pass
+                continue
+
+            vf_watch = vf_key.data
+            vg_selector.unregister(vf_key.fd)
+            vg_watches.pop(vf_key.fd, None)
+            os.close(vf_key.fd)
+
+            # Reap the zombie so returncode is set before dispatch
+            vf_watch['process'].poll()
+            vf_dispatch_exit(vf_watch, vf_noticed_at)
+
+        vf_register_pending()
+
+def vf_poll_loop():
+    """Fallback loop: check watched processes every poll interval"""
+    while vg_running:
+        vf_register_pending()
+
+        for vf_pid, vf_watch in list(vg_watches.items()):
+            if vf_watch['process'].poll() is None:
+                vf_watch['last_alive'] = time.monotonic()
+                continue
+
+            vf_noticed_at = time.monotonic()
+            del vg_watches[vf_pid]
+            # Exit happened somewhere since the last alive check
+            vf_window_ms = (vf_noticed_at - vf_watch['last_alive']) * 1000
+            vg_stats['last_window_ms'] = round(vf_window_ms, 3)
+            vg_stats['max_window_ms'] = max(vg_stats['max_window_ms'], vf_window_ms)
+            vf_dispatch_exit(vf_watch, vf_noticed_at)
+
+        time.sleep(vg_poll_interval)
+
+def vf_get_stats():
+    """Get reaper mode, dispatch delay and detection window metrics"""
+    vf_exits = vg_stats['exits_detected']
+    vf_avg = vg_stats['total_dispatch_ms'] / vf_exits if vf_exits else None
+
+    return {
+        'mode': vg_mode,
+        'running': vg_running,
+        'watched': len(vg_watches) + len(ag_pending_watches),
+        'exits_detected': vf_exits,
+        'last_dispatch_ms': vg_stats['last_dispatch_ms'],
+        'avg_dispatch_ms': round(vf_avg, 3) if vf_avg is not None else None,
+        'max_dispatch_ms': round(vg_stats['max_dispatch_ms'], 3),
+        'last_detection_window_ms': vg_stats['last_window_ms'],
+        'max_detection_window_ms': round(vg_stats['max_window_ms'], 3) if vg_mode == 'poll' else None
+    }
@@ -0,0 +1,141 @@
+"""Indexed registry of configured scripts and their running processes
+
+Script configurations live in an immutable snapshot: a dict by ID, the
+configuration order and secondary indexes by group and enabled flag.
+A change builds a new snapshot and swaps it in, so readers never lock
+and always see one consistent version (copy-on-write).
+
+Running processes are kept in vg_processes, which is only mutated under
+vg_lock. Every change to either bumps vg_version, a cheap value callers
+can compare to know whether anything changed. Per-script locks
+serialize starts of the same script without blocking other scripts.
+"""
+
+import threading
+
+# Global variables
+vg_lock = threading.Lock()
+vg_version = 0              # Bumped on every configuration or process change
+vg_snapshot = {
+    'order': (),            # Script IDs in configuration order
+    'by_id': {},            # script_id -> configuration dict
+    'by_group': {},         # group -> tuple of script IDs in configuration order
+    'enabled': frozenset()  # IDs of enabled scripts
+}
+vg_processes = {}           # script_id -> process info of the running instance
+vg_script_locks = {}        # script_id -> lock held while starting it
+
+def vf_build_snapshot(ag_scripts):
+    """Index a list of script configurations"""
+    vf_by_id = {}
+    vf_by_group = {}
+    for vf_script in ag_scripts:
+        vf_by_id[vf_script['id']] = vf_script
+        vf_by_group.setdefault(vf_script.get('group', 'Default'), []).append(vf_script['id'])
+
+    return {
+        'order': tuple(vf_by_id),
+        'by_id': vf_by_id,
+        'by_group': {vf_group: tuple(ag_ids) for vf_group, ag_ids in vf_by_group.items()},
+        'enabled': frozenset(vf_id for vf_id, vf_script in vf_by_id.items() if vf_script.get('enabled', True))
+    }
+
+def vf_load(ag_scripts):
+    """Replace all script configurations (after a config load)"""
+    global vg_snapshot, vg_version
+    vf_snapshot = vf_build_snapshot(ag_scripts)
+    with vg_lock:
+        vg_snapshot = vf_snapshot
+        vg_version += 1
+
+def vf_get(vf_script_id):
+    """Configuration of a script, None if unknown"""
+    return vg_snapshot['by_id'].get(vf_script_id)
+
+def vf_exists(vf_script_id):
+    """Check if a script is configured"""
+    return vf_script_id in vg_snapshot['by_id']
+
+def vf_ids(vf_group=None, vf_enabled=None, vf_status=None):
+    """Script IDs in configuration order, optionally filtered
+
+    vf_status is 'running' or 'stopped' (has a process entry or not).
+    """
+    vf_snapshot = vg_snapshot
+    ag_ids = vf_snapshot['order'] if vf_group is None else vf_snapshot['by_group'].get(vf_group, ())
+
+    if vf_enabled is not None:
+        ag_ids = [vf_id for vf_id in ag_ids if (vf_id in vf_snapshot['enabled']) == vf_enabled]
+    if vf_status is not None:
+        vf_running = vf_status == 'running'
+        ag_ids = [vf_id for vf_id in ag_ids if (vf_id in vg_processes) == vf_running]
+    return list(ag_ids)
+
+def vf_list(vf_group=None, vf_enabled=None, vf_status=None):
+    """Script configurations in configuration order, filtered like vf_ids"""
+    vf_by_id = vg_snapshot['by_id']
+    return [vf_by_id[vf_id] for vf_id in vf_ids(vf_group, vf_enabled, vf_status) if vf_id in vf_by_id]
+
+def vf_groups():
+    """Group names in order of first appearance"""
+    return list(vg_snapshot['by_group'])
+
+def vf_get_version():
+    """Change counter of configurations and processes"""
+    return vg_version
+
+def vf_get_script_lock(vf_script_id):
+    """Lock serializing starts of one script"""
+    with vg_lock:
+        vf_script_lock = vg_script_locks.get(vf_script_id)
+        if vf_script_lock is None:
+            vf_script_lock = vg_script_locks[vf_script_id] = threading.Lock()
+        return vf_script_lock
+
+def vf_set_process(vf_script_id, vf_process_info):
+    """Register the running instance of a script"""
+    global vg_version
+    with vg_lock:
+        vg_processes[vf_script_id] = vf_process_info
+        vg_version += 1
+
+def vf_get_process(vf_script_id):
+    """Process info of a script's running instance, None if none"""
+    return vg_processes.get(vf_script_id)
+
+def vf_pop_process(vf_script_id, vf_process=None):
+    """Remove a script's process entry, only if it is still vf_process when given
+
+    Returns the removed info, None if nothing was removed.
+    """
+    global vg_version
+    with vg_lock:
+        vf_process_info = vg_processes.get(vf_script_id)
+        if vf_process_info is None:
+            return None
+        if vf_process is not None and vf_process_info['process'] is not vf_process:
+            return None  # Already replaced by a newer instance
+        del vg_processes[vf_script_id]
+        vg_version += 1
+        return vf_process_info
+
+def vf_process_items():
+    """Consistent copy of (script_id, process info) pairs"""
+    with vg_lock:
+        return list(vg_processes.items())
+
+def vf_running_ids():
+    """IDs with a registered process"""
+    with vg_lock:
+        return list(vg_processes)
+
+def vf_get_stats():
+    """Get registry counters"""
+    vf_snapshot = vg_snapshot
+    return {
+        'version': vg_version,
+        'scripts': len(vf_snapshot['order']),
+        'groups': len(vf_snapshot['by_group']),
+        'enabled': len(vf_snapshot['enabled']),
+        'processes': len(vg_processes)
+    }
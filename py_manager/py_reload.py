@@ -0,0 +1,267 @@
+"""Config hot-reload: diff the script sets and apply only what changed
+
+vf_reload() loads config.json again and compares every script with the
+entry it replaces:
+
+    added and enabled               started
+    re-enabled                      started
+    removed, or now disabled        stopped (if running)
+    launch settings changed         restarted (if running)
+    anything else changed           running process picks up the new entry
+    unchanged                       left alone
+
+Stops share one deadline (py_process.vf_stop_scripts), starts run as a
+py_bulk job so dependencies and ready checks are honored.
+
+A watcher thread reloads on its own when config.json is edited: inotify
+on its directory (through ctypes, Linux only) or mtime polling
+elsewhere. Events are debounced, so an editor's burst of writes gives
+one reload, and the store's own write-behind rewrites are ignored.
+"""
+
+import ctypes
+import os
+import selectors
+import struct
+import threading
+import time
+
+import py_bulk
+import py_configstore
+import py_logger
+import py_process
+import py_registry
+
+# Global variables
+vg_emitter = None           # Called as emitter(event, payload) after a reload
+vg_reload_lock = threading.Lock()
+vg_watch_mode = None        # 'inotify', 'poll' or 'off' once started
+vg_watch_thread = None
+vg_debounce = 0.5           # Seconds without further events before reloading
+vg_poll_interval = 2        # Seconds between mtime checks in poll mode
+vg_stats = {
+    'reloads': 0,
+    'watch_reloads': 0,
+    'failed': 0,
+    'last_summary': None
+}
+
+# Entries that change how the process is launched; other changes need no restart
+ag_restart_keys = (
+    'path', 'args', 'interpreter', 'env', 'log_file',
+    'max_memory_mb', 'cpu_quota_percent', 'max_pids'
+)
+
+# inotify constants from <sys/inotify.h>
+vg_in_close_write = 0x00000008
+vg_in_moved_to = 0x00000080
+vg_in_nonblock = 0o4000
+vg_in_cloexec = 0o2000000
+
+def vf_set_emitter(callback):
+    """Set the function used to broadcast reload summaries"""
+    global vg_emitter
+    vg_emitter = callback
+
+def vf_diff(ag_old_scripts, ag_new_scripts):
+    """Classify script changes between two configurations"""
+    vf_old = {vf_script['id']: vf_script for vf_script in ag_old_scripts}
+    vf_new = {vf_script['id']: vf_script for vf_script in ag_new_scripts}
+
+    vf_changes = {
+        'added': [], 'removed': [], 'disabled': [], 'enabled': [],
+        'restart': [], 'updated': [], 'unchanged': 0
+    }
+    for vf_script_id, vf_script in vf_new.items():
+        vf_previous = vf_old.get(vf_script_id)
+        if vf_previous is None:
+            vf_changes['added'].append(vf_script_id)
+        elif vf_previous == vf_script:
+            vf_changes['unchanged'] += 1
+        elif vf_previous.get('enabled', True) and not vf_script.get('enabled', True):
+            vf_changes['disabled'].append(vf_script_id)
+        elif not vf_previous.get('enabled', True) and vf_script.get('enabled', True):
+            vf_changes['enabled'].append(vf_script_id)
+        elif any(vf_previous.get(vf_key) != vf_script.get(vf_key) for vf_key in ag_restart_keys):
+            vf_changes['restart'].append(vf_script_id)
+        else:
+            vf_changes['updated'].append(vf_script_id)
+
+    vf_changes['removed'] = [vf_script_id for vf_script_id in vf_old if vf_script_id not in vf_new]
+    return vf_changes
+
+def vf_apply(vf_changes):
+    """Stop, restart and start scripts for a diff, returns a summary"""
+    # Running instances keep working with their new entry (auto_restart, group, ...)
+    for vf_script_id, vf_process_info in py_registry.vf_process_items():
+        vf_script = py_registry.vf_get(vf_script_id)
+        if vf_script is not None:
+            vf_process_info['config'] = vf_script
+
+    ag_running = set(py_registry.vf_running_ids())
+    ag_restart = [vf_script_id for vf_script_id in vf_changes['restart'] if vf_script_id in ag_running]
+    ag_stop = [
+        vf_script_id for vf_script_id in vf_changes['removed'] + vf_changes['disabled'] + ag_restart
+        if vf_script_id in ag_running
+    ]
+    ag_start = [
+        vf_script_id for vf_script_id in vf_changes['added'] + vf_changes['enabled'] + ag_restart
+        if py_registry.vf_get(vf_script_id).get('enabled', True)
+    ]
+    # Launch changes of stopped scripts apply on their next start
+    ag_updated = vf_changes['updated'] + [
+        vf_script_id for vf_script_id in vf_changes['restart'] if vf_script_id not in ag_running
+    ]
+
+    if ag_stop:
+        py_process.vf_stop_scripts(ag_stop, py_bulk.vg_stop_timeout)
+
+    vf_job = py_bulk.vf_submit('start', ag_start) if ag_start else None
+
+    return {
+        'added': vf_changes['added'],
+        'removed': vf_changes['removed'],
+        'disabled': vf_changes['disabled'],
+        'enabled': vf_changes['enabled'],
+        'restarted': ag_restart,
+        'updated': ag_updated,
+        'unchanged': vf_changes['unchanged'],
+        'stopped': ag_stop,
+        'start_job': vf_job['id'] if vf_job else None
+    }
+
+def vf_reload(vf_source='manual'):
+    """Load config.json again and apply the difference, returns a result dict"""
+    with vg_reload_lock:
+        ag_old_scripts = py_registry.vf_list()
+        if not py_process.vf_load_config():
+            vg_stats['failed'] += 1
+            return {"success": False, "error": "Failed to reload configuration"}
+
+        vf_summary = vf_apply(vf_diff(ag_old_scripts, py_registry.vf_list()))
+
+    vg_stats['reloads'] += 1
+    vg_stats['last_summary'] = vf_summary
+    py_logger.vf_write_manager_log('INFO', (
+        f"Config reloaded ({vf_source}): {len(vf_summary['added'])} added, "
+        f"{len(vf_summary['enabled'])} enabled, {len(vf_summary['removed'])} removed, {len(vf_summary['restarted'])} restarted, "
+        f"{len(vf_summary['updated'])} updated, {vf_summary['unchanged']} unchanged"
+    ))
+    if vg_emitter is not None:
+        vg_emitter('config_reloaded', vf_summary)
+    return {"success": True, "summary": vf_summary}
+
+def vf_watch_reload():
+    """Reload after an edit seen by the watcher, unless it was our own write"""
+    if not py_configstore.vf_disk_changed():
+        return
+    vg_stats['watch_reloads'] += 1
+    try:
+        vf_result = vf_reload('watcher')
+        if not vf_result['success']:
+            print(f"Config watcher: {vf_result['error']}")
+    except Exception as vf_error:
+        print(f"Config watcher reload failed: {vf_error}")
+
+def vf_inotify_open(vf_directory):
+    """inotify fd watching a directory for finished writes and renames, None if unavailable"""
+    try:
+        # The interpreter's own symbols include libc; find_library would spawn ldconfig
+        vf_libc = ctypes.CDLL(None, use_errno=True)
+        vf_fd = vf_libc.inotify_init1(vg_in_nonblock | vg_in_cloexec)
+    except (OSError, AttributeError):
+        return None
+    if vf_fd < 0:
+        return None
+
+    # Watch the directory: an atomic save replaces the file's inode
+    if vf_libc.inotify_add_watch(vf_fd, os.fsencode(vf_directory), vg_in_close_write | vg_in_moved_to) < 0:
+        os.close(vf_fd)
+        return None
+    return vf_fd
+
+def vf_inotify_loop(vf_fd, vf_name):
+    """Wait for events on the config file and reload once they settle"""
+    vf_selector = selectors.DefaultSelector()
+    vf_selector.register(vf_fd, selectors.EVENT_READ)
+    vf_due = None
+
+    while True:
+        vf_timeout = None if vf_due is None else max(0, vf_due - time.monotonic())
+        if vf_selector.select(vf_timeout):
+            try:
+                vf_data = os.read(vf_fd, 65536)
+            except BlockingIOError:
+                continue
+
+            # struct inotify_event: int wd; uint32 mask, cookie, len; char name[len]
+            vf_offset = 0
+            while vf_offset < len(vf_data):
+                _, _, _, vf_length = struct.unpack_from('iIII', vf_data, vf_offset)
+                vf_event_name = vf_data[vf_offset + 16:vf_offset + 16 + vf_length].rstrip(b'\0')
+                vf_offset += 16 + vf_length
+                if vf_event_name == vf_name:
+                    vf_due = time.monotonic() + vg_debounce
+        elif vf_due is not None and time.monotonic() >= vf_due:
+            vf_due = None
+            vf_watch_reload()
+
+def vf_poll_loop():
+    """Fallback: reload when config.json's identity changed and stayed put"""
+    while True:
+        time.sleep(vg_poll_interval)
+        if not py_configstore.vf_disk_changed():
+            continue
+
+        # Wait until writes stop before reading
+        vf_signature = py_configstore.vf_read_signature()
+        while True:
+            time.sleep(vg_debounce)
+            vf_current = py_configstore.vf_read_signature()
+            if vf_current == vf_signature:
+                break
+            vf_signature = vf_current
+        vf_watch_reload()
+
+def vf_start_watcher(vf_settings):
+    """Start watching config.json per manager_settings (idempotent), returns the mode"""
+    global vg_watch_mode, vg_watch_thread, vg_debounce, vg_poll_interval
+
+    if vg_watch_thread is not None:
+        return vg_watch_mode
+
+    vf_mode = vf_settings.get('config_watch', 'auto')
+    vg_debounce = vf_settings.get('config_watch_debounce_seconds', vg_debounce)
+    vg_poll_interval = vf_settings.get('config_watch_poll_seconds', vg_poll_interval)
+
+    if vf_mode == 'off':
+        vg_watch_mode = 'off'
+        return vg_watch_mode
+
+    vf_fd = None
+    if vf_mode in ('auto', 'inotify'):
+        vf_fd = vf_inotify_open(os.path.dirname(py_configstore.vg_config_path))
+        if vf_fd is None and vf_mode == 'inotify':
+            print("inotify not available, watching config.json by polling")
+
+    if vf_fd is not None:
+        vg_watch_mode = 'inotify'
+        vf_name = os.fsencode(os.path.basename(py_configstore.vg_config_path))
+        vf_target, vf_args = vf_inotify_loop, (vf_fd, vf_name)
+    else:
+        vg_watch_mode = 'poll'
+        vf_target, vf_args = vf_poll_loop, ()
+
+    vg_watch_thread = threading.Thread(target=vf_target, args=vf_args, name='py-config-watch', daemon=True)
+    vg_watch_thread.start()
+    return vg_watch_mode
+
+def vf_get_stats():
+    """Get reload counters"""
+    return {
+        'watch_mode': vg_watch_mode,
+        'reloads': vg_stats['reloads'],
+        'watch_reloads': vg_stats['watch_reloads'],
+        'failed': vg_stats['failed'],
+        'last_summary': vg_stats['last_summary']
+    }
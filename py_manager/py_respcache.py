@@ -0,0 +1,156 @@
+"""Response cache for read-only API endpoints
+
+Each cached response is stored under a key (endpoint plus arguments)
+together with the version of the state it was built from: the config
+version, a status version or a log file's size and inode. While the
+version is unchanged the stored body is served as is, so a poller costs
+a dictionary lookup instead of recomputing and re-serializing.
+
+The cached bytes are a body prefix; each response appends a short
+suffix built when it is served (the serve timestamp). Bodies get a weak
+ETag, a hash of the prefix, since only the suffix differs between
+responses of one version. A request whose If-None-Match names the
+current ETag gets an empty 304. Compression is limited to bodies above
+vg_min_compress bytes. gzip compresses the prefix once per version and
+keeps the compressor state, so a response only compresses its suffix;
+brotli (when the module is installed) cannot resume a stream and
+compresses each response whole at a fast quality setting.
+"""
+
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # Optional, gzip is always available
+
+# Global variables
+vg_lock = threading.Lock()
+vg_entries = OrderedDict()  # key -> entry, least recently used first
+vg_max_entries = 256
+vg_min_compress = 1024      # Smaller bodies are sent uncompressed
+vg_compress = True
+vg_stats = {
+    'hits': 0,
+    'misses': 0,
+    'not_modified': 0,
+    'compressed': 0
+}
+
+def vf_configure(vf_settings):
+    """Apply response cache settings from api_settings"""
+    global vg_max_entries, vg_min_compress, vg_compress
+    vg_max_entries = max(1, int(vf_settings.get('response_cache_entries', 256)))
+    vg_min_compress = int(vf_settings.get('response_compress_min_bytes', 1024))
+    vg_compress = vf_settings.get('response_compression', True)
+
+def vf_get_entry(vf_key, vf_version, vf_build):
+    """Get the cached body for a key at a version, building it on a miss
+
+    vf_build() returns the serialized body prefix as bytes.
+    """
+    with vg_lock:
+        vf_entry = vg_entries.get(vf_key)
+        if vf_entry is not None and vf_entry['version'] == vf_version:
+            vg_entries.move_to_end(vf_key)
+            vg_stats['hits'] += 1
+            return vf_entry
+
+    # Build outside the lock, concurrent misses just build twice
+    vf_body = vf_build()
+    vf_entry = {
+        'version': vf_version,
+        'body': vf_body,
+        'etag': hashlib.blake2b(vf_body, digest_size=16).hexdigest(),
+        'encoded': {}  # 'gzip' -> (compressed prefix, compressor state after it)
+    }
+
+    with vg_lock:
+        vg_stats['misses'] += 1
+        vg_entries[vf_key] = vf_entry
+        vg_entries.move_to_end(vf_key)
+        while len(vg_entries) > vg_max_entries:
+            vg_entries.popitem(last=False)
+    return vf_entry
+
+def vf_choose_encoding(vf_accept_encoding, vf_size):
+    """Pick br or gzip from an Accept-Encoding header, None for identity"""
+    if not vg_compress or vf_size < vg_min_compress or not vf_accept_encoding:
+        return None
+
+    ag_accepted = set()
+    for vf_part in vf_accept_encoding.lower().split(','):
+        vf_name, _, vf_params = vf_part.strip().partition(';')
+        if vf_params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        ag_accepted.add(vf_name.strip())
+
+    if brotli is not None and 'br' in ag_accepted:
+        return 'br'
+    if 'gzip' in ag_accepted or '*' in ag_accepted:
+        return 'gzip'
+    return None
+
+def vf_get_body(vf_entry, vf_encoding, vf_suffix=b''):
+    """Body of an entry plus a per-response suffix in an encoding"""
+    if vf_encoding is None:
+        return vf_entry['body'] + vf_suffix
+
+    if vf_encoding == 'br':
+        vg_stats['compressed'] += 1
+        return brotli.compress(vf_entry['body'] + vf_suffix, quality=5)
+
+    vf_state = vf_entry['encoded'].get('gzip')
+    if vf_state is None:
+        vf_compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+        vf_state = (vf_compressor.compress(vf_entry['body']), vf_compressor)
+        vf_entry['encoded']['gzip'] = vf_state
+        vg_stats['compressed'] += 1
+
+    vf_compressor = vf_state[1].copy()  # Copies are independent, the cached state is never advanced
+    return vf_state[0] + vf_compressor.compress(vf_suffix) + vf_compressor.flush()
+
+def vf_get_etag(vf_entry, vf_encoding):
+    """Weak ETag of one representation (each encoding has its own)"""
+    if vf_encoding is None:
+        return f'W/"{vf_entry["etag"]}"'
+    return f'W/"{vf_entry["etag"]}-{vf_encoding}"'
+
+def vf_matches(vf_entry, vf_if_none_match):
+    """Check an If-None-Match header against any representation of the entry"""
+    if not vf_if_none_match:
+        return False
+    if vf_if_none_match.strip() == '*':
+        return True
+
+    for vf_tag in vf_if_none_match.split(','):
+        vf_tag = vf_tag.strip()
+        if vf_tag.startswith('W/'):
+            vf_tag = vf_tag[2:]
+        if vf_tag.strip('"').split('-', 1)[0] == vf_entry['etag']:
+            return True
+    return False
+
+def vf_note_not_modified():
+    """Count a 304 answer"""
+    with vg_lock:
+        vg_stats['not_modified'] += 1
+
+def vf_clear():
+    """Drop all cached responses"""
+    with vg_lock:
+        vg_entries.clear()
+
+def vf_get_stats():
+    """Get cache counters"""
+    return {
+        'entries': len(vg_entries),
+        'hits': vg_stats['hits'],
+        'misses': vg_stats['misses'],
+        'not_modified': vg_stats['not_modified'],
+        'compressed': vg_stats['compressed'],
+        'brotli': brotli is not None
+    }
@@ -0,0 +1,86 @@
+"""Timer heap scheduler for Python Manager
+
+A single background thread runs callbacks at their due time. Timers are
+kept in a heap ordered by due time, so any number of pending restarts
+wait side by side without blocking the thread that scheduled them.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+# Global variables
+vg_condition = threading.Condition()
+vg_thread = None
+vg_counter = itertools.count()  # Tie-breaker for timers due at the same time
+
+# Global arrays
+ag_heap = []  # (due_monotonic, seq, timer)
+
+def vf_call_later(vf_delay, vf_callback, *vf_args):
+    """Run callback(*args) after delay seconds, returns a timer handle"""
+    vf_timer = {
+        'due': time.monotonic() + max(0, vf_delay),
+        'callback': vf_callback,
+        'args': vf_args,
+        'cancelled': False
+    }
+
+    with vg_condition:
+        vf_ensure_thread()
+        heapq.heappush(ag_heap, (vf_timer['due'], next(vg_counter), vf_timer))
+        vg_condition.notify()
+
+    return vf_timer
+
+def vf_cancel(vf_timer):
+    """Cancel a pending timer (no-op if it already fired)"""
+    if vf_timer:
+        vf_timer['cancelled'] = True
+
+def vf_seconds_until(vf_timer):
+    """Seconds left before a timer fires, None if cancelled"""
+    if not vf_timer or vf_timer['cancelled']:
+        return None
+    return max(0.0, vf_timer['due'] - time.monotonic())
+
+def vf_ensure_thread():
+    """Start the scheduler thread on first use (caller holds the lock)"""
+    global vg_thread
+    if vg_thread is None or not vg_thread.is_alive():
+        vg_thread = threading.Thread(target=vf_scheduler_loop, name='py-scheduler', daemon=True)
+        vg_thread.start()
+
+def vf_scheduler_loop():
+    """Pop due timers off the heap and run them"""
+    while True:
+        with vg_condition:
+            while True:
+                # Drop cancelled timers at the top of the heap
+                while ag_heap and ag_heap[0][2]['cancelled']:
+                    heapq.heappop(ag_heap)
+
+                if not ag_heap:
+                    vg_condition.wait()
+                    continue
+
+                vf_wait = ag_heap[0][0] - time.monotonic()
+                if vf_wait <= 0:
+                    vf_timer = heapq.heappop(ag_heap)[2]
+                    break
+
+                vg_condition.wait(vf_wait)
+
+        # Mark as done so vf_seconds_until stops reporting it
+        vf_timer['cancelled'] = True
+
+        try:
+            vf_timer['callback'](*vf_timer['args'])
+        except Exception as vf_error:
+            print(f"Scheduler callback error: {vf_error}")
+
+def vf_pending_count():
+    """Number of timers still waiting to fire"""
+    with vg_condition:
+        return sum(1 for vf_entry in ag_heap if not vf_entry[2]['cancelled'])
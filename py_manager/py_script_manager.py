@@ -2,65 +2,36 @@
 """Script management functions for Python Manager"""
 
 import os
-import json
 import uuid
 import shlex
 from pathlib import Path
 
-# Global variable for config path
-vg_config_path = os.path.join(os.path.dirname(__file__), 'config.json')
+import py_configstore
+import py_depgraph
+import py_registry
 
 def vf_load_config():
-    """Load configuration from file"""
-    # Check if config exists, if not try to copy from example
-    if not os.path.exists(vg_config_path):
-        vf_example_path = os.path.join(os.path.dirname(__file__), 'config.example.json')
-        if os.path.exists(vf_example_path):
-            try:
-                import shutil
-                shutil.copy(vf_example_path, vg_config_path)
-                print(f"Created config.json from config.example.json")
-            except Exception as e:
-                print(f"Error creating config from example: {e}")
+    """Current configuration (the in-memory copy is authoritative)"""
+    return py_configstore.vf_get_config()
 
-    try:
-        with open(vg_config_path, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error loading config: {e}")
-        return None
-
-def vf_save_config(vf_config):
-    """Save configuration to file"""
-    try:
-        with open(vg_config_path, 'w') as f:
-            json.dump(vf_config, f, indent=2)
-        return True
-    except Exception as e:
-        print(f"Error saving config: {e}")
-        return False
-
-def vf_add_script(vf_script_path, vf_name=None, vf_args=None, vf_auto_restart=True, vf_interpreter=None, vf_group=None):
-    """Add a new script to the configuration"""
-    # Load current config
-    vf_config = vf_load_config()
-    if not vf_config:
-        return {"success": False, "error": "Failed to load configuration"}
+def vf_parse_args(vf_args):
+    """Split an argument string into a list"""
+    if vf_args and isinstance(vf_args, str):
+        try:
+            return shlex.split(vf_args)
+        except Exception:
+            return vf_args.split()
+    return vf_args
 
+def vf_build_script(vf_script_path, vf_name=None, vf_args=None, vf_auto_restart=True, vf_interpreter=None, vf_group=None):
+    """Validate a script path and build its configuration entry, returns (script, error)"""
     # Validate script path
     vf_abs_path = os.path.abspath(vf_script_path)
     if not os.path.exists(vf_abs_path):
-        return {"success": False, "error": f"Script not found: {vf_abs_path}"}
+        return None, f"Script not found: {vf_abs_path}"
 
     if not vf_abs_path.endswith('.py'):
-        return {"success": False, "error": "Only Python (.py) files are supported"}
-
-    # Process args
-    if vf_args and isinstance(vf_args, str):
-        try:
-            vf_args = shlex.split(vf_args)
-        except Exception:
-            vf_args = vf_args.split()
+        return None, "Only Python (.py) files are supported"
 
     # Generate script ID
     vf_script_id = f"script_{uuid.uuid4().hex[:8]}"
@@ -74,7 +45,7 @@ def vf_add_script(vf_script_path, vf_name=None, vf_args=None, vf_auto_restart=Tr
         "id": vf_script_id,
         "name": vf_name,
         "path": vf_abs_path,  # Use absolute path
-        "args": vf_args or [],
+        "args": vf_parse_args(vf_args) or [],
         "auto_restart": vf_auto_restart,
         "enabled": True,
         "max_memory_mb": 512,
@@ -85,76 +56,95 @@ def vf_add_script(vf_script_path, vf_name=None, vf_args=None, vf_auto_restart=Tr
     if vf_interpreter:
         vf_new_script["interpreter"] = vf_interpreter
 
-    # Add to config
-    vf_config['scripts'].append(vf_new_script)
-    
-    # Save config
-    if vf_save_config(vf_config):
-        return {"success": True, "script": vf_new_script}
-    else:
-        return {"success": False, "error": "Failed to save configuration"}
+    return vf_new_script, None
+
+def vf_add_script(vf_script_path, vf_name=None, vf_args=None, vf_auto_restart=True, vf_interpreter=None, vf_group=None):
+    """Add a new script to the configuration"""
+    vf_new_script, vf_error = vf_build_script(vf_script_path, vf_name, vf_args, vf_auto_restart, vf_interpreter, vf_group)
+    if vf_error:
+        return {"success": False, "error": vf_error}
+
+    vf_result = py_configstore.vf_commit([{'op': 'add', 'script': vf_new_script}])
+    if not vf_result['success']:
+        return vf_result
+    return {"success": True, "script": vf_new_script}
+
+def vf_add_scripts(ag_specs):
+    """Add many scripts in one configuration change
+
+    Each spec is a dict like the /api/scripts/add body. Invalid specs are
+    reported in errors by index, the valid ones are added.
+    """
+    ag_scripts = []
+    ag_errors = []
+    for vf_index, vf_spec in enumerate(ag_specs):
+        if not isinstance(vf_spec, dict) or not vf_spec.get('path'):
+            ag_errors.append({"index": vf_index, "error": "Script path is required"})
+            continue
+        vf_new_script, vf_error = vf_build_script(
+            vf_spec['path'],
+            vf_name=vf_spec.get('name'),
+            vf_args=vf_spec.get('args', []),
+            vf_auto_restart=vf_spec.get('auto_restart', True),
+            vf_interpreter=vf_spec.get('interpreter'),
+            vf_group=vf_spec.get('group', 'Default')
+        )
+        if vf_error:
+            ag_errors.append({"index": vf_index, "error": vf_error})
+        else:
+            ag_scripts.append(vf_new_script)
+
+    if not ag_scripts:
+        return {"success": False, "error": "No valid scripts to add", "errors": ag_errors}
+
+    vf_result = py_configstore.vf_commit([{'op': 'add', 'script': vf_script} for vf_script in ag_scripts])
+    if not vf_result['success']:
+        return dict(vf_result, errors=ag_errors)
+    return {"success": True, "scripts": ag_scripts, "errors": ag_errors}
+
+def vf_get_dependents(vf_script_id):
+    """IDs of scripts that list a script in depends_on"""
+    return [
+        vf_script['id'] for vf_script in py_registry.vf_list()
+        if vf_script_id in py_depgraph.vf_get_dependencies(vf_script)
+    ]
 
 def vf_remove_script(vf_script_id):
     """Remove a script from the configuration"""
-    vf_config = vf_load_config()
-    if not vf_config:
-        return {"success": False, "error": "Failed to load configuration"}
-    
-    # Find and remove script
-    vf_original_count = len(vf_config['scripts'])
-    vf_config['scripts'] = [s for s in vf_config['scripts'] if s['id'] != vf_script_id]
-    
-    if len(vf_config['scripts']) == vf_original_count:
+    if not py_registry.vf_exists(vf_script_id):
         return {"success": False, "error": "Script not found"}
-    
-    # Save config
-    if vf_save_config(vf_config):
-        return {"success": True}
-    else:
-        return {"success": False, "error": "Failed to save configuration"}
+
+    # A dangling depends_on would make every later update fail validation
+    ag_dependents = vf_get_dependents(vf_script_id)
+    if ag_dependents:
+        return {"success": False, "error": f"Script is required by {', '.join(ag_dependents)}"}
+
+    return py_configstore.vf_commit([{'op': 'remove', 'id': vf_script_id}], py_depgraph.vf_validate)
 
 def vf_update_script(vf_script_id, vf_updates):
     """Update script configuration"""
-    vf_config = vf_load_config()
-    if not vf_config:
-        return {"success": False, "error": "Failed to load configuration"}
-
-    # Find script
-    vf_script_found = False
-    for vf_script in vf_config['scripts']:
-        if vf_script['id'] == vf_script_id:
-            # Update allowed fields
-            if 'name' in vf_updates:
-                vf_script['name'] = vf_updates['name']
-            if 'args' in vf_updates:
-                vf_arg_update = vf_updates['args']
-                if vf_arg_update and isinstance(vf_arg_update, str):
-                    try:
-                        vf_arg_update = shlex.split(vf_arg_update)
-                    except Exception:
-                        vf_arg_update = vf_arg_update.split()
-                vf_script['args'] = vf_arg_update
-            if 'auto_restart' in vf_updates:
-                vf_script['auto_restart'] = vf_updates['auto_restart']
-            if 'enabled' in vf_updates:
-                vf_script['enabled'] = vf_updates['enabled']
-            if 'max_memory_mb' in vf_updates:
-                vf_script['max_memory_mb'] = vf_updates['max_memory_mb']
-            if 'interpreter' in vf_updates:
-                vf_script['interpreter'] = vf_updates['interpreter']
-            if 'group' in vf_updates:
-                vf_script['group'] = vf_updates['group']
-            vf_script_found = True
-            break
-    
-    if not vf_script_found:
+    if not py_registry.vf_exists(vf_script_id):
         return {"success": False, "error": "Script not found"}
-    
-    # Save config
-    if vf_save_config(vf_config):
-        return {"success": True}
-    else:
-        return {"success": False, "error": "Failed to save configuration"}
+
+    # Update allowed fields
+    vf_fields = {}
+    for vf_key in ('name', 'auto_restart', 'enabled', 'max_memory_mb', 'cpu_quota_percent',
+                   'max_pids', 'interpreter', 'group'):
+        if vf_key in vf_updates:
+            vf_fields[vf_key] = vf_updates[vf_key]
+    if 'args' in vf_updates:
+        vf_fields['args'] = vf_parse_args(vf_updates['args'])
+    if 'depends_on' in vf_updates:
+        vf_fields['depends_on'] = vf_updates['depends_on'] or []
+    if 'start_stage' in vf_updates:
+        vf_fields['start_stage'] = vf_updates['start_stage'] or 0
+    if 'ready_check' in vf_updates:
+        vf_fields['ready_check'] = vf_updates['ready_check'] or None
+
+    # Reject unknown dependencies, cycles and malformed ready checks
+    return py_configstore.vf_commit(
+        [{'op': 'update', 'id': vf_script_id, 'fields': vf_fields}], py_depgraph.vf_validate
+    )
 
 def vf_list_python_files(vf_directory):
     """List all Python files in a directory recursively"""
@@ -0,0 +1,89 @@
+"""Serving mode selection for the API server
+
+'threading' runs Flask-SocketIO on the Werkzeug development server with
+one OS thread per connection. 'gevent' and 'eventlet' run it on that
+library's WSGI server with cooperative green threads, which holds
+thousands of idle WebSocket clients and absorbs REST bursts. 'auto'
+picks gevent when it is installed and falls back to threading.
+
+Green-thread modes need the standard library monkey-patched before any
+other module is imported, so entry points call vf_patch() first thing.
+This module only uses the standard library for that reason.
+"""
+
+import importlib.util
+import json
+import os
+import signal
+
+# Global variables
+vg_async_mode = None   # Mode chosen by vf_patch(): 'threading', 'gevent' or 'eventlet'
+
+def vf_read_requested_mode():
+    """Read async_mode from api_config.json (defaults to threading)"""
+    vf_config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api_config.json')
+    try:
+        with open(vf_config_path, 'r') as vf_file:
+            return json.load(vf_file).get('api_settings', {}).get('async_mode', 'threading')
+    except (OSError, ValueError):
+        return 'threading'
+
+def vf_is_installed(vf_module):
+    """Check if a module can be imported without importing it"""
+    return importlib.util.find_spec(vf_module) is not None
+
+def vf_patch(vf_mode=None):
+    """Pick the serving mode and monkey-patch for it (idempotent), returns the mode"""
+    global vg_async_mode
+
+    if vg_async_mode is not None:
+        return vg_async_mode
+
+    vf_mode = vf_mode or os.environ.get('PY_MANAGER_ASYNC_MODE') or vf_read_requested_mode()
+
+    if vf_mode == 'auto':
+        vf_mode = 'gevent' if vf_is_installed('gevent') else 'threading'
+
+    if vf_mode in ('gevent', 'eventlet') and not vf_is_installed(vf_mode):
+        print(f"{vf_mode} is not installed, serving in threading mode")
+        vf_mode = 'threading'
+
+    if vf_mode == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+    elif vf_mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    else:
+        vf_mode = 'threading'
+
+    vg_async_mode = vf_mode
+    return vg_async_mode
+
+def vf_get_async_mode():
+    """Mode to pass to SocketIO(async_mode=...)"""
+    return vf_patch()
+
+def vf_set_signal_handler(vf_signum, vf_handler):
+    """Install a signal handler that is allowed to block
+
+    Under gevent, handlers installed with signal.signal() run inside the
+    event loop, where waiting on a lock or a child raises
+    BlockingSwitchOutError, so the handler gets its own greenlet instead.
+    """
+    if vg_async_mode == 'gevent':
+        import gevent
+        gevent.signal_handler(vf_signum, lambda: gevent.spawn(vf_handler, vf_signum, None))
+    else:
+        signal.signal(vf_signum, vf_handler)
+
+def vf_run(vf_socketio, vf_app, vf_host, vf_port, vf_debug=False, **vf_options):
+    """Run the app on the server matching the serving mode"""
+    if vf_get_async_mode() == 'threading':
+        # Werkzeug refuses to run outside development without this flag
+        vf_options.setdefault('allow_unsafe_werkzeug', True)
+    else:
+        vf_options.pop('allow_unsafe_werkzeug', None)
+
+    print(f"Serving in {vf_get_async_mode()} mode on {vf_host}:{vf_port}")
+    vf_socketio.run(vf_app, host=vf_host, port=vf_port, debug=vf_debug, **vf_options)
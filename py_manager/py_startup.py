@@ -0,0 +1,53 @@
+"""Startup timing for Python Manager
+
+Entry points wrap each import and init step in vf_phase() and print the
+breakdown with --profile-startup. The clock starts when this module is
+imported, so entry points import it first. Only the standard library is
+used, it is imported before gevent/eventlet patching.
+"""
+
+import contextlib
+import sys
+import time
+
+# Global variables
+vg_started = time.perf_counter()
+vg_finished = None
+
+# Global arrays
+ag_phases = []  # (name, seconds) in the order they ran
+
+@contextlib.contextmanager
+def vf_phase(vf_name):
+    """Time a startup step"""
+    vf_start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ag_phases.append((vf_name, time.perf_counter() - vf_start))
+
+def vf_finish():
+    """Mark startup as complete (before serving requests)"""
+    global vg_finished
+    vg_finished = time.perf_counter()
+
+def vf_get_report():
+    """Phases with their durations and the total so far"""
+    vf_total = (vg_finished or time.perf_counter()) - vg_started
+    return {
+        'total_ms': round(vf_total * 1000, 1),
+        'phases': [{'name': vf_name, 'ms': round(vf_seconds * 1000, 1)} for vf_name, vf_seconds in ag_phases],
+        'modules_loaded': len(sys.modules)
+    }
+
+def vf_print_report():
+    """Print the startup breakdown as a table"""
+    vf_report = vf_get_report()
+    vf_total = vf_report['total_ms'] or 1
+
+    print("\nStartup profile:")
+    for vf_phase_info in vf_report['phases']:
+        print(f"  {vf_phase_info['name']:<34} {vf_phase_info['ms']:>8.1f} ms  {vf_phase_info['ms'] * 100 / vf_total:5.1f}%")
+    vf_other = vf_total - sum(vf_phase_info['ms'] for vf_phase_info in vf_report['phases'])
+    print(f"  {'(other)':<34} {vf_other:>8.1f} ms  {vf_other * 100 / vf_total:5.1f}%")
+    print(f"  {'total':<34} {vf_total:>8.1f} ms  ({vf_report['modules_loaded']} modules loaded)\n")
@@ -0,0 +1,128 @@
+"""Versioned status snapshots with delta broadcasts
+
+The feed keeps the last status list it broadcast. Each refresh compares
+the new list against it and broadcasts only what changed: per-script
+changed fields, added scripts and removed script IDs. Every delta has a
+sequence number and names the sequence it applies on top of, so a
+client that missed one notices the gap and asks for a full snapshot.
+Nothing is sent when nothing changed, and with vf_refresh_if_changed the
+status list is not even built while its version stays the same.
+"""
+
+import threading
+
+# Global variables
+vg_emitter = None        # Called as emitter(event, payload) to broadcast
+vg_lock = threading.Lock()
+vg_seq = 0               # Sequence number of the current snapshot
+vg_snapshot = {}         # script_id -> status dict as last broadcast
+vg_order = []            # Script IDs in configuration order
+vg_float_digits = 1      # Rounding that hides sampling noise in floats
+vg_version = None        # Status version the snapshot was last refreshed at
+vg_stats = {
+    'refreshes': 0,
+    'skipped': 0,
+    'deltas': 0
+}
+
+def vf_set_emitter(callback):
+    """Set the function used to broadcast deltas"""
+    global vg_emitter
+    vg_emitter = callback
+
+def vf_normalize(vf_value):
+    """Round floats (also inside nested dicts) so noise is not a change"""
+    if isinstance(vf_value, float):
+        return round(vf_value, vg_float_digits)
+    if isinstance(vf_value, dict):
+        return {vf_key: vf_normalize(vf_item) for vf_key, vf_item in vf_value.items()}
+    return vf_value
+
+def vf_diff(vf_old, vf_new):
+    """Fields of vf_new that differ from vf_old; removed fields become None"""
+    vf_changed = {vf_key: vf_value for vf_key, vf_value in vf_new.items() if vf_old.get(vf_key) != vf_value}
+    for vf_key in vf_old:
+        if vf_key not in vf_new:
+            vf_changed[vf_key] = None
+    return vf_changed
+
+def vf_refresh(ag_status):
+    """Fold a fresh status list into the snapshot and broadcast the delta
+
+    Returns the delta, or None when nothing changed.
+    """
+    global vg_seq, vg_snapshot, vg_order
+
+    with vg_lock:
+        vg_stats['refreshes'] += 1
+        vf_new_snapshot = {vf_status['id']: vf_normalize(vf_status) for vf_status in ag_status}
+        ag_new_order = [vf_status['id'] for vf_status in ag_status]
+
+        vf_changed = {}
+        vf_added = {}
+        for vf_script_id, vf_status in vf_new_snapshot.items():
+            vf_old = vg_snapshot.get(vf_script_id)
+            if vf_old is None:
+                vf_added[vf_script_id] = vf_status
+                continue
+            vf_fields = vf_diff(vf_old, vf_status)
+            if vf_fields:
+                vf_changed[vf_script_id] = vf_fields
+
+        ag_removed = [vf_script_id for vf_script_id in vg_snapshot if vf_script_id not in vf_new_snapshot]
+
+        if not vf_changed and not vf_added and not ag_removed and ag_new_order == vg_order:
+            return None
+
+        vf_delta = {
+            'seq': vg_seq + 1,
+            'base': vg_seq,
+            'changed': vf_changed,
+            'added': vf_added,
+            'removed': ag_removed
+        }
+        if ag_new_order != vg_order:
+            vf_delta['order'] = ag_new_order
+
+        vg_seq += 1
+        vg_snapshot = vf_new_snapshot
+        vg_order = ag_new_order
+        vg_stats['deltas'] += 1
+
+        # Broadcast under the lock so deltas leave in sequence order
+        if vg_emitter is not None:
+            vg_emitter('status_delta', vf_delta)
+
+    return vf_delta
+
+def vf_refresh_if_changed(vf_version, vf_get_status):
+    """Refresh from vf_get_status() unless vf_version was already refreshed
+
+    vf_version must be read before the status is built, so a change
+    during the build shows up as a new version on the next call.
+    """
+    global vg_version
+    if vf_version == vg_version:
+        vg_stats['skipped'] += 1
+        return None
+    vf_delta = vf_refresh(vf_get_status())
+    vg_version = vf_version
+    return vf_delta
+
+def vf_get_full():
+    """Current snapshot as a full status list with its sequence number"""
+    with vg_lock:
+        return {
+            'seq': vg_seq,
+            'status': [vg_snapshot[vf_script_id] for vf_script_id in vg_order]
+        }
+
+def vf_get_stats():
+    """Get feed counters"""
+    return {
+        'seq': vg_seq,
+        'scripts': len(vg_snapshot),
+        'refreshes': vg_stats['refreshes'],
+        'skipped': vg_stats['skipped'],
+        'deltas': vg_stats['deltas']
+    }
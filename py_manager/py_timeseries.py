@@ -0,0 +1,231 @@
+"""Per-script metrics history for Python Manager
+
+Each script gets fixed-size ring buffers at three resolutions (1 s,
+1 min, 1 h). Every sample is folded into all three rings as it arrives,
+so range queries read pre-aggregated buckets instead of raw samples.
+Rings live in one flat buffer of doubles, either an in-memory bytearray
+or a memory-mapped file when persistence is enabled.
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+
+# Global variables
+vg_persist_dir = None    # Directory for memory-mapped stores, None = memory only
+vg_lock = threading.Lock()
+vg_stores = {}           # script_id -> store dict
+vg_magic = b'PYMTS001'
+vg_header = struct.Struct('<8sI')
+
+# Global arrays
+ag_resolutions = [       # (bucket seconds, slots kept)
+    (1, 900),            # 15 minutes of 1 s buckets
+    (60, 1440),          # 24 hours of 1 min buckets
+    (3600, 720)          # 30 days of 1 h buckets
+]
+ag_fields = ['bucket', 'count', 'cpu_sum', 'cpu_max', 'mem_sum', 'mem_max']
+
+vg_field_count = len(ag_fields)
+vg_total_slots = sum(vf_slots for _, vf_slots in ag_resolutions)
+vg_data_bytes = vg_total_slots * vg_field_count * 8
+
+def vf_configure(vf_persist_dir=None):
+    """Enable memory-mapped persistence under a directory (None disables)"""
+    global vg_persist_dir
+    vg_persist_dir = vf_persist_dir
+    if vf_persist_dir:
+        os.makedirs(vf_persist_dir, exist_ok=True)
+
+def vf_open_store(vf_script_id):
+    """Create or map the ring storage for a script"""
+    vf_size = vg_header.size + vg_data_bytes
+    vf_store = {'file': None, 'mmap': None}
+
+    if vg_persist_dir:
+        vf_path = vf_get_store_path(vf_script_id)
+        vf_file = open(vf_path, 'a+b')
+        vf_fresh = os.path.getsize(vf_path) != vf_size
+
+        if vf_fresh:
+            vf_file.truncate(0)
+            vf_file.truncate(vf_size)
+
+        vf_buffer = mmap.mmap(vf_file.fileno(), vf_size)
+
+        # Layout changed or file is new: start from an empty store
+        if vf_fresh or vf_buffer[:8] != vg_magic:
+            vf_buffer[:vf_size] = bytes(vf_size)
+            vg_header.pack_into(vf_buffer, 0, vg_magic, vg_total_slots)
+
+        vf_store['file'] = vf_file
+        vf_store['mmap'] = vf_buffer
+    else:
+        vf_buffer = bytearray(vf_size)
+
+    vf_store['data'] = memoryview(vf_buffer)[vg_header.size:].cast('d')
+
+    # Offset of each resolution's ring inside the flat buffer
+    vf_store['offsets'] = []
+    vf_offset = 0
+    for _, vf_slots in ag_resolutions:
+        vf_store['offsets'].append(vf_offset)
+        vf_offset += vf_slots * vg_field_count
+
+    return vf_store
+
+def vf_get_store_path(vf_script_id):
+    """Path of a script's memory-mapped store"""
+    return os.path.join(vg_persist_dir, f"{vf_script_id}.ts")
+
+def vf_has_persisted(vf_script_id):
+    """Check if a script has a persisted store on disk"""
+    return bool(vg_persist_dir) and os.path.exists(vf_get_store_path(vf_script_id))
+
+def vf_get_store(vf_script_id, vf_create=False):
+    """Get a script's store, optionally creating it"""
+    vf_store = vg_stores.get(vf_script_id)
+    if vf_store is None and vf_create:
+        vf_store = vf_open_store(vf_script_id)
+        vg_stores[vf_script_id] = vf_store
+    return vf_store
+
+def vf_record(vf_script_id, vf_timestamp, vf_cpu, vf_mem):
+    """Fold one sample into every resolution ring"""
+    with vg_lock:
+        vf_store = vf_get_store(vf_script_id, vf_create=True)
+        vf_data = vf_store['data']
+
+        for vf_idx, (vf_step, vf_slots) in enumerate(ag_resolutions):
+            vf_bucket = int(vf_timestamp // vf_step)
+            vf_pos = vf_store['offsets'][vf_idx] + (vf_bucket % vf_slots) * vg_field_count
+
+            # Slot still holds an older bucket: the ring wrapped, reset it
+            if vf_data[vf_pos] != vf_bucket:
+                vf_data[vf_pos] = vf_bucket
+                vf_data[vf_pos + 1] = 0
+                vf_data[vf_pos + 2] = 0
+                vf_data[vf_pos + 3] = 0
+                vf_data[vf_pos + 4] = 0
+                vf_data[vf_pos + 5] = 0
+
+            vf_data[vf_pos + 1] += 1
+            vf_data[vf_pos + 2] += vf_cpu
+            vf_data[vf_pos + 3] = max(vf_data[vf_pos + 3], vf_cpu)
+            vf_data[vf_pos + 4] += vf_mem
+            vf_data[vf_pos + 5] = max(vf_data[vf_pos + 5], vf_mem)
+
+def vf_record_snapshots(vf_snapshots):
+    """Sampler callback: record a pass of {script_id: snapshot}"""
+    for vf_script_id, vf_snapshot in vf_snapshots.items():
+        vf_record(
+            vf_script_id,
+            vf_snapshot['sampled_at'],
+            vf_snapshot['cpu_percent'],
+            vf_snapshot['memory_mb']
+        )
+
+def vf_pick_resolution(vf_from, vf_step, vf_now):
+    """Choose the ring that covers the range at the closest step"""
+    vf_covering = [
+        vf_idx for vf_idx, (vf_res_step, vf_slots) in enumerate(ag_resolutions)
+        if vf_now - vf_res_step * vf_slots <= vf_from
+    ]
+    if not vf_covering:
+        return len(ag_resolutions) - 1
+
+    vf_fitting = [vf_idx for vf_idx in vf_covering if ag_resolutions[vf_idx][0] <= vf_step]
+    if vf_fitting:
+        return vf_fitting[-1]
+    return vf_covering[0]
+
+def vf_query(vf_script_id, vf_from=None, vf_to=None, vf_step=None):
+    """Get aggregated points for a time range"""
+    vf_now = time.time()
+    vf_to = vf_now if vf_to is None else min(vf_to, vf_now)  # Nothing is stored ahead of now
+    vf_from = vf_to - 3600 if vf_from is None else vf_from
+
+    if vf_step is None:
+        # Aim for at most ~500 points
+        vf_step = max(1, (vf_to - vf_from) / 500)
+
+    vf_res_idx = vf_pick_resolution(vf_from, vf_step, vf_now)
+    vf_res_step, vf_slots = ag_resolutions[vf_res_idx]
+
+    # Nothing older than the ring's retention can still be in it
+    vf_from = max(vf_from, vf_now - vf_res_step * vf_slots)
+
+    # Output step is a whole multiple of the ring's bucket size
+    vf_out_step = max(1, int(round(vf_step / vf_res_step))) * vf_res_step
+
+    ag_points = []
+
+    with vg_lock:
+        # Map a persisted store on first read after a manager restart
+        vf_store = vf_get_store(vf_script_id, vf_create=vf_has_persisted(vf_script_id))
+        if vf_store is None:
+            return {'step': vf_out_step, 'resolution': vf_res_step, 'points': ag_points}
+
+        vf_data = vf_store['data']
+        vf_offset = vf_store['offsets'][vf_res_idx]
+        vf_current = None
+
+        # A ring holds vf_slots buckets, never scan more than that
+        vf_last = int(vf_to // vf_res_step)
+        vf_first = max(int(vf_from // vf_res_step), vf_last - vf_slots + 1)
+
+        for vf_bucket in range(vf_first, vf_last + 1):
+            vf_pos = vf_offset + (vf_bucket % vf_slots) * vg_field_count
+            if vf_data[vf_pos] != vf_bucket or vf_data[vf_pos + 1] == 0:
+                continue
+
+            vf_out_time = (vf_bucket * vf_res_step // vf_out_step) * vf_out_step
+            if vf_current is None or vf_current['t'] != vf_out_time:
+                vf_current = {'t': vf_out_time, 'count': 0, 'cpu_sum': 0.0, 'cpu_max': 0.0,
+                              'mem_sum': 0.0, 'mem_max': 0.0}
+                ag_points.append(vf_current)
+
+            vf_current['count'] += vf_data[vf_pos + 1]
+            vf_current['cpu_sum'] += vf_data[vf_pos + 2]
+            vf_current['cpu_max'] = max(vf_current['cpu_max'], vf_data[vf_pos + 3])
+            vf_current['mem_sum'] += vf_data[vf_pos + 4]
+            vf_current['mem_max'] = max(vf_current['mem_max'], vf_data[vf_pos + 5])
+
+    return {
+        'step': vf_out_step,
+        'resolution': vf_res_step,
+        'points': [{
+            't': vf_point['t'],
+            'cpu_avg': round(vf_point['cpu_sum'] / vf_point['count'], 2),
+            'cpu_max': round(vf_point['cpu_max'], 2),
+            'memory_avg_mb': round(vf_point['mem_sum'] / vf_point['count'], 2),
+            'memory_max_mb': round(vf_point['mem_max'], 2)
+        } for vf_point in ag_points]
+    }
+
+def vf_close_store(vf_store):
+    """Flush and release a store's mapping"""
+    vf_store['data'].release()
+    if vf_store['mmap'] is not None:
+        vf_store['mmap'].flush()
+        vf_store['mmap'].close()
+        vf_store['file'].close()
+
+def vf_drop(vf_script_id):
+    """Forget a script's history and delete its persisted file"""
+    with vg_lock:
+        vf_store = vg_stores.pop(vf_script_id, None)
+        if vf_store:
+            vf_close_store(vf_store)
+
+    if vf_has_persisted(vf_script_id):
+        os.remove(vf_get_store_path(vf_script_id))
+
+def vf_flush():
+    """Flush all memory-mapped stores to disk"""
+    with vg_lock:
+        for vf_store in vg_stores.values():
+            if vf_store['mmap'] is not None:
+                vf_store['mmap'].flush()
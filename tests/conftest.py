@@ -0,0 +1,28 @@
+"""Shared fixtures: py_manager modules are imported by plain name"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'py_manager'))
+
+import py_configstore
+import py_registry
+
+@pytest.fixture
+def config_store(tmp_path, monkeypatch):
+    """Config store on a temporary config.json, returns a function writing the scripts"""
+    monkeypatch.setattr(py_configstore, 'vg_config_path', str(tmp_path / 'config.json'))
+    monkeypatch.setattr(py_configstore, 'vg_journal_path', str(tmp_path / 'config.journal'))
+    monkeypatch.setattr(py_configstore, 'vg_write_delay', 0)
+    monkeypatch.setattr(py_configstore, 'vg_listener', lambda vf_config: py_registry.vf_load(vf_config['scripts']))
+
+    def vf_setup(ag_scripts):
+        with open(py_configstore.vg_config_path, 'w') as vf_file:
+            json.dump({'manager_settings': {}, 'scripts': ag_scripts}, vf_file)
+        return py_configstore.vf_load()
+
+    yield vf_setup
+    py_configstore.vf_flush()
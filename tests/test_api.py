@@ -0,0 +1,91 @@
+import gzip
+import json
+import time
+
+import pytest
+
+import py_api
+import py_bulk
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(py_api, 'vg_config', {'api_settings': {'auth_enabled': False, 'auth_token': 'secret'}})
+    return py_api.vg_app.test_client()
+
+@pytest.mark.parametrize('vf_body', [
+    {'parallelism': 0},
+    {'parallelism': -3},
+    {'parallelism': 2.5},
+    {'parallelism': '8'},
+    {'parallelism': True},
+    {'parallelism': 10 ** 9},
+])
+def test_bulk_start_rejects_bad_parallelism(client, monkeypatch, vf_body):
+    monkeypatch.setattr(py_bulk, 'vf_submit', lambda *ag_args, **af_kwargs: pytest.fail('job submitted'))
+    vf_response = client.post('/api/scripts/start-all', json=vf_body)
+    assert vf_response.status_code == 400
+    assert vf_response.get_json()['success'] is False
+    assert 'parallelism' in vf_response.get_json()['error']
+
+@pytest.mark.parametrize('vf_timeout', [0, -1, 'soon', 1e9, None])
+def test_bulk_stop_validates_timeout(client, monkeypatch, vf_timeout):
+    ag_submitted = []
+    monkeypatch.setattr(py_bulk, 'vf_submit', lambda *ag_args, **af_kwargs: ag_submitted.append(af_kwargs) or py_bulk.vf_new_job('stop', []))
+    monkeypatch.setattr(py_bulk, 'vf_wait', lambda vf_job: True)
+    vf_response = client.post('/api/scripts/stop-all', json={'timeout': vf_timeout})
+
+    if vf_timeout is None:
+        assert vf_response.status_code == 200
+        assert ag_submitted[0]['vf_timeout'] is None
+    else:
+        assert vf_response.status_code == 400
+        assert 'timeout' in vf_response.get_json()['error']
+        assert not ag_submitted
+
+def test_cached_response_gets_serve_time_timestamp(client, monkeypatch):
+    monkeypatch.setattr(py_api.py_process, 'vg_config', {'scripts': [{'id': 'app', 'name': 'x' * 2000}]})
+    monkeypatch.setattr(py_api.py_process, 'vg_config_version', -1)
+    py_api.py_respcache.vf_clear()
+
+    vf_first = client.get('/api/scripts')
+    time.sleep(0.01)
+    vf_second = client.get('/api/scripts', headers={'Accept-Encoding': 'gzip'})
+    assert vf_second.headers['Content-Encoding'] == 'gzip'
+    vf_body = json.loads(gzip.decompress(vf_second.data))
+
+    assert vf_body['data'] == vf_first.get_json()['data']
+    assert vf_body['timestamp'] > vf_first.get_json()['timestamp']
+    assert vf_second.headers['ETag'].startswith(vf_first.headers['ETag'][:-1])
+
+    vf_third = client.get('/api/scripts', headers={'Accept-Encoding': 'gzip'})
+    assert json.loads(gzip.decompress(vf_third.data))['data'] == vf_body['data']
+
+    vf_again = client.get('/api/scripts', headers={'If-None-Match': vf_first.headers['ETag']})
+    assert vf_again.status_code == 304
+
+def test_log_stats_snapshot_bumps_status_version(monkeypatch):
+    monkeypatch.setattr(py_api.py_process, 'vg_log_stats', {})
+    monkeypatch.setattr(py_api.py_process, 'vg_log_stats_pass', 0)
+    monkeypatch.setattr(py_api.py_process.py_timeseries, 'vf_record_snapshots', lambda vf_snapshots: None)
+    monkeypatch.setattr(py_api.py_process.py_logpipe, 'vf_get_stats', lambda: {'app': {'lines': 1}})
+    vf_before = py_api.py_process.vf_get_status_version()
+    py_api.py_process.vf_handle_sample({})
+    assert py_api.py_process.vf_get_status_version() != vf_before
+    assert py_api.py_process.vg_log_stats == {'app': {'lines': 1}}
+
+def test_stream_accepts_short_lived_token(client, monkeypatch):
+    monkeypatch.setitem(py_api.vg_config['api_settings'], 'auth_enabled', True)
+    monkeypatch.setattr(py_api.py_httpstream, 'vf_stream', lambda vf_session: iter([b': ok\n\n']))
+
+    assert client.get('/api/stream?topics=status').status_code == 401
+    assert client.post('/api/stream/token').status_code == 401
+
+    vf_token = client.post('/api/stream/token', headers={'Authorization': 'Bearer secret'}).get_json()['data']['token']
+    assert client.get(f"/api/stream?topics=status&token={vf_token}").status_code == 200
+
+    vf_expires, _, vf_signature = vf_token.partition('.')
+    assert client.get(f"/api/stream?topics=status&token={vf_expires}.{'0' * len(vf_signature)}").status_code == 401
+    assert client.get(f"/api/stream?topics=status&token={int(vf_expires) + 3600}.{vf_signature}").status_code == 401
+
+    monkeypatch.setattr(py_api.time, 'time', lambda: int(vf_expires) + 1)
+    assert client.get(f"/api/stream?topics=status&token={vf_token}").status_code == 401
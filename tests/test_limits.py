@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+import py_limits
+
+@pytest.fixture
+def cgroup_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(py_limits, 'vg_mode', 'cgroup')
+    monkeypatch.setattr(py_limits, 'vg_cgroup_root', str(tmp_path))
+    monkeypatch.setattr(py_limits, 'vg_attach_paths', {})
+    vf_group = tmp_path / 'app'
+    vf_group.mkdir()
+    for vf_name in ('memory.max', 'cpu.max', 'pids.max', 'cgroup.procs'):
+        (vf_group / vf_name).write_text('')
+    return vf_group
+
+def test_child_joins_cgroup_from_the_parent(cgroup_root):
+    assert py_limits.vf_prepare('app', {'max_memory_mb': 64}) is None
+    assert (cgroup_root / 'cgroup.procs').read_text() == ''
+
+    assert py_limits.vf_attach('app', 4242)
+    assert (cgroup_root / 'cgroup.procs').read_text() == '4242'
+    assert (cgroup_root / 'memory.max').read_text() == str(64 * 1024 * 1024)
+
+def test_attach_failure_reported(cgroup_root):
+    py_limits.vf_prepare('app', {})
+    os.remove(cgroup_root / 'cgroup.procs')
+    os.mkdir(cgroup_root / 'cgroup.procs')
+    assert not py_limits.vf_attach('app', 4242)
+
+def test_reused_group_drops_old_cpu_quota(cgroup_root):
+    py_limits.vf_prepare('app', {'cpu_quota_percent': 50})
+    assert (cgroup_root / 'cpu.max').read_text() == '50000 100000'
+
+    py_limits.vf_prepare('app', {})
+    assert (cgroup_root / 'cpu.max').read_text() == 'max'
+
+def test_rlimit_mode_reports_unenforced_limits(monkeypatch, capsys):
+    monkeypatch.setattr(py_limits, 'vg_mode', 'rlimit')
+    py_limits.vf_prepare('app', {'max_memory_mb': 64, 'cpu_quota_percent': 50, 'max_pids': 10})
+    assert 'cpu_quota_percent, max_pids' in capsys.readouterr().out
@@ -0,0 +1,18 @@
+import py_logfanout
+
+def test_regex_filters_rejected():
+    vf_filter, vf_error = py_logfanout.vf_build_filter(vf_regex='(a+)+$')
+    assert vf_filter is None
+    assert 'match' in vf_error
+
+def test_match_filter_is_case_insensitive_substring_with_alternatives():
+    vf_filter, vf_error = py_logfanout.vf_build_filter('warning', 'timeout|refused')
+    assert vf_error is None
+    assert py_logfanout.vf_matches(vf_filter, 'ERROR Connection REFUSED by db')
+    assert not py_logfanout.vf_matches(vf_filter, 'ERROR disk full')
+    assert not py_logfanout.vf_matches(vf_filter, 'INFO request timeout retried')
+
+def test_match_filter_takes_patterns_literally():
+    vf_filter, _ = py_logfanout.vf_build_filter(vf_match='(a+)+$')
+    assert not py_logfanout.vf_matches(vf_filter, 'a' * 50000 + '!')
+    assert py_logfanout.vf_matches(vf_filter, 'literal (a+)+$ text')
@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+import py_logrotate
+import py_logsearch
+
+@pytest.fixture
+def log_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(py_logrotate, 'vg_compress', False)
+    monkeypatch.setattr(py_logsearch, 'vg_block_bytes', 256)
+    monkeypatch.setattr(py_logsearch, 'vg_units', {})
+    monkeypatch.setattr(py_logsearch, 'vg_loaded', py_logsearch.collections.OrderedDict())
+    monkeypatch.setattr(py_logsearch, 'vg_loaded_tokens', 0)
+    monkeypatch.setattr(py_logsearch, 'vg_stats', {'saved': 0, 'loaded': 0, 'evicted': 0})
+    return str(tmp_path / 'app.log')
+
+def vf_write(vf_log_path, vf_first, vf_count):
+    py_logrotate.vf_current_started(vf_log_path)
+    with open(vf_log_path, 'a') as vf_file:
+        for vf_number in range(vf_first, vf_first + vf_count):
+            vf_file.write(f"request id{vf_number} served\n")
+
+def vf_rotate(vf_log_path):
+    vf_segment_path = py_logrotate.vf_rotate(vf_log_path)
+    py_logsearch.vf_note_rotated(vf_log_path, vf_segment_path)
+    return vf_segment_path
+
+def vf_texts(vf_page):
+    return [vf_match['text'] for vf_match in vf_page['results']]
+
+def test_segment_index_saved_and_loaded_instead_of_rebuilt(log_path, monkeypatch):
+    vf_write(log_path, 0, 200)
+    py_logsearch.vf_refresh_log(log_path)
+    vf_segment_path = vf_rotate(log_path)
+    py_logsearch.vf_refresh_log(log_path)
+    assert os.path.exists(vf_segment_path + py_logsearch.vg_index_suffix)
+
+    # A restart: nothing in memory, and closed segments must not be read again
+    py_logsearch.vg_units.clear()
+    monkeypatch.setattr(py_logsearch, 'vf_index_unit', lambda *ag_args: pytest.fail('segment re-indexed'))
+    py_logsearch.vf_refresh_log(log_path)
+    vf_page = py_logsearch.vf_search([('app', log_path)], 'id123')
+    assert vf_texts(vf_page) == ['request id123 served']
+    assert py_logsearch.vg_stats['loaded'] == 1
+
+def test_cursor_survives_rotation(log_path):
+    vf_write(log_path, 0, 50)
+    vf_page = py_logsearch.vf_search([('app', log_path)], 'served', vf_limit=10)
+    assert vf_texts(vf_page)[0] == 'request id49 served'
+
+    vf_rotate(log_path)
+    vf_write(log_path, 50, 5)
+    vf_next = py_logsearch.vf_search([('app', log_path)], 'served', vf_cursor=vf_page['next_cursor'], vf_limit=10)
+    assert vf_texts(vf_next)[0] == 'request id39 served'
+
+def test_segment_indexes_evicted_and_reloaded(log_path, monkeypatch):
+    for vf_first in (0, 1000, 2000):
+        vf_write(log_path, vf_first, 100)
+        vf_rotate(log_path)
+    py_logsearch.vf_refresh_log(log_path)
+    monkeypatch.setattr(py_logsearch, 'vg_max_tokens', 150)
+
+    for vf_number in (50, 1050, 2050, 50):
+        vf_page = py_logsearch.vf_search([('app', log_path)], f"id{vf_number}")
+        assert vf_texts(vf_page) == [f"request id{vf_number} served"]
+        assert py_logsearch.vg_loaded_tokens <= 150 or len(py_logsearch.vg_loaded) == 1
+
+    assert py_logsearch.vg_stats['evicted'] > 0
+    assert py_logsearch.vf_get_stats()['segment_tokens'] == py_logsearch.vg_loaded_tokens
@@ -0,0 +1,28 @@
+import py_configstore
+import py_registry
+import py_script_manager
+
+def vf_script(vf_script_id, ag_depends_on=()):
+    return {'id': vf_script_id, 'name': vf_script_id, 'path': '/tmp/x.py', 'enabled': True,
+            'log_file': f"{vf_script_id}.log", 'depends_on': list(ag_depends_on)}
+
+def test_remove_refused_while_dependents_exist(config_store):
+    config_store([vf_script('db'), vf_script('api', ['db'])])
+
+    vf_result = py_script_manager.vf_remove_script('db')
+    assert not vf_result['success']
+    assert 'api' in vf_result['error']
+    assert py_registry.vf_exists('db')
+
+def test_update_after_remove(config_store):
+    config_store([vf_script('db'), vf_script('api', ['db']), vf_script('worker')])
+
+    assert py_script_manager.vf_remove_script('worker')['success']
+    assert py_script_manager.vf_update_script('api', {'name': 'API'})['success']
+
+    # Dropping the dependency first makes the remove possible
+    assert py_script_manager.vf_update_script('api', {'depends_on': []})['success']
+    assert py_script_manager.vf_remove_script('db')['success']
+    assert py_script_manager.vf_update_script('api', {'name': 'API v2'})['success']
+    assert py_registry.vf_get('api')['name'] == 'API v2'
+    assert [vf_entry['id'] for vf_entry in py_configstore.vf_get_config()['scripts']] == ['api']
@@ -0,0 +1,19 @@
+import py_statusfeed
+
+def test_refresh_skipped_while_version_unchanged(monkeypatch):
+    monkeypatch.setattr(py_statusfeed, 'vg_version', None)
+    monkeypatch.setattr(py_statusfeed, 'vg_emitter', None)
+    monkeypatch.setattr(py_statusfeed, 'vg_snapshot', {})
+    monkeypatch.setattr(py_statusfeed, 'vg_order', [])
+    ag_builds = []
+
+    def vf_get_status():
+        ag_builds.append(1)
+        return [{'id': 'app', 'status': 'running', 'cpu_percent': 1.0}]
+
+    assert py_statusfeed.vf_refresh_if_changed((1, 7), vf_get_status) is not None
+    assert py_statusfeed.vf_refresh_if_changed((1, 7), vf_get_status) is None
+    assert len(ag_builds) == 1
+
+    py_statusfeed.vf_refresh_if_changed((1, 8), vf_get_status)
+    assert len(ag_builds) == 2